@@ -1,20 +1,40 @@
 import asyncio
+import codecs
+import csv
+import html
+import io
 import logging
+import multiprocessing
 import os
-import threading  # <-- থ্রেডিং আবার যোগ করা হয়েছে
-from flask import Flask  # <-- Flask আবার যোগ করা হয়েছে
+import re
+import secrets
+import signal
+import time
+from aiohttp import ClientTimeout, web
 from aiogram import Bot, Dispatcher, types, F
 from aiogram.filters import Command, StateFilter
 from aiogram.filters.callback_data import CallbackData
 from aiogram.client.default import DefaultBotProperties
 from aiogram.types import (
     Message, ReplyKeyboardMarkup, KeyboardButton,
-    InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Document
+    InlineKeyboardMarkup, InlineKeyboardButton, CallbackQuery, Document, BufferedInputFile
 )
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import BaseEventIsolation, BaseStorage
 from aiogram.utils.keyboard import InlineKeyboardBuilder
-from typing import Dict, List, Optional
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from typing import AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from buckets import RedisBuckets
+from cache import LRUCache
+from catalog import Catalog
+from fsm_storage import CompactFSMStorage
+from inventory import Inventory, PoolReport, RedisInventory, format_duration
+from metrics import MetricsMiddleware, Registry, watch_event_loop_lag
+from number_index import ImportResult
+from scheduler import RenewingRedisIsolation, UpdateScheduler
+from storage import Storage, create_storage
+from throttling import RateGovernor, ThrottlingMiddleware
 
 # --- Environment Variables থেকে টোকেন লোড করা ---
 BOT_TOKEN = os.environ.get("BOT_TOKEN")
@@ -22,6 +42,53 @@ ADMIN_ID_STR = os.environ.get("ADMIN_ID")
 ADMIN_USERNAME = os.environ.get("ADMIN_USERNAME")
 # --- ⚠️ নতুন: Render-এর দেওয়া PORT লোড করা ---
 RENDER_PORT = int(os.environ.get('PORT', 10000)) # ডিফল্ট 10000
+# --- ফাইল ইমপোর্ট: প্রতি চাঙ্কে কত বাইট ডাউনলোড হবে, প্রগ্রেস মেসেজ কত সেকেন্ড পরপর আপডেট হবে ---
+IMPORT_CHUNK_SIZE = int(os.environ.get("IMPORT_CHUNK_SIZE", 256 * 1024))
+IMPORT_PROGRESS_INTERVAL = float(os.environ.get("IMPORT_PROGRESS_INTERVAL", 2.0))
+# --- ফাইল ডাউনলোডে মোট সময়ের সীমা নেই (ইমপোর্ট চাঙ্কের মাঝে চলে); শুধু একটি চাঙ্ক পড়তে এর বেশি সেকেন্ড লাগলে থামবে ---
+IMPORT_READ_TIMEOUT = float(os.environ.get("IMPORT_READ_TIMEOUT", 60))
+# --- স্টোরেজ ব্যাকএন্ড: "memory" (ডিফল্ট), "sqlite" অথবা "redis" (একাধিক ওয়ার্কারের জন্য) ---
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "memory")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", "numbers.db")
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+# --- webhook মোডে কতগুলো ওয়ার্কার প্রসেস একই PORT-এ চলবে (>1 হলে STORAGE_BACKEND=redis লাগবে) ---
+WORKERS = int(os.environ.get("WORKERS", 1))
+WORKER_INDEX = 0  # প্রতিটি ওয়ার্কার প্রসেসে run_workers() সেট করে
+WORKER_STOP_TIMEOUT = float(os.environ.get("WORKER_STOP_TIMEOUT", 20))  # SIGTERM-এর পর এত সেকেন্ডে না থামলে ওয়ার্কার kill
+# --- রান মোড: "polling" (লোকাল ডেভেলপমেন্ট, ডিফল্ট) অথবা "webhook" ---
+RUN_MODE = os.environ.get("RUN_MODE", "polling")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "").rstrip("/")  # যেমন: https://my-bot.onrender.com
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+# সেট না থাকলে প্রতি স্টার্টে নতুন সিক্রেট তৈরি হয়, কারণ set_webhook আমরাই প্রতিবার কল করি
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+# --- কতগুলো ইনলাইন কীবোর্ড ক্যাশে রাখা হবে; অন্য ওয়ার্কারের ক্যাটালগ পরিবর্তন দেখতে কত সেকেন্ড পরপর catalog_version পড়া হবে ---
+KEYBOARD_CACHE_SIZE = int(os.environ.get("KEYBOARD_CACHE_SIZE", 256))
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CATALOG_CHECK_INTERVAL", 1.0))
+# --- আপডেট প্রসেসিং: একসাথে সর্বোচ্চ কতটি হ্যান্ডলার, পোলিংয়ে সর্বোচ্চ কতটি আপডেট লাইনে; স্টার্টে জমে থাকা আপডেট ফেলে দেওয়া হবে কিনা ---
+UPDATE_CONCURRENCY = int(os.environ.get("UPDATE_CONCURRENCY", 64))
+UPDATE_QUEUE_LIMIT = int(os.environ.get("UPDATE_QUEUE_LIMIT", 1024))
+DROP_PENDING_UPDATES = os.environ.get("DROP_PENDING_UPDATES", "0").lower() in ("1", "true", "yes")
+# --- বাল্ক অ্যালোকেশন: এর বেশি নম্বর হলে (বা মেসেজ টেলিগ্রামের ৪০৯৬ অক্ষরে না ধরলে) .txt/.csv ফাইলে পাঠানো হয়; অ্যাডমিন সর্বোচ্চ কত লিমিট দিতে পারবে ---
+BULK_THRESHOLD = int(os.environ.get("BULK_THRESHOLD", 25))
+BULK_FORMAT = os.environ.get("BULK_FORMAT", "txt")  # "txt" (প্রতি লাইনে একটি নম্বর) অথবা "csv" (service,country,number)
+MAX_NUM_LIMIT = int(os.environ.get("MAX_NUM_LIMIT", 10_000))
+# --- FSM: কত সেকেন্ড নিষ্ক্রিয় থাকলে ইউজারের স্টেট মুছে যাবে, মেমরিতে সর্বোচ্চ কতজনের স্টেট থাকবে ---
+FSM_TTL = int(os.environ.get("FSM_TTL", 3600))
+FSM_MAX_RECORDS = int(os.environ.get("FSM_MAX_RECORDS", 200_000))
+FSM_COUNT_INTERVAL = float(os.environ.get("FSM_COUNT_INTERVAL", 60))  # redis ব্যাকএন্ডে কত সেকেন্ড পরপর FSM রেকর্ড গোনা হবে (SCAN)
+# --- সার্ভিস/দেশ পিকারে প্রতি পেজে কতটি বাটন, প্রতি সারিতে কতটি ---
+PICKER_PAGE_SIZE = int(os.environ.get("PICKER_PAGE_SIZE", 20))
+PICKER_COLUMNS = int(os.environ.get("PICKER_COLUMNS", 2))
+# --- স্টক রিপোর্ট: কোন স্টকের নিচে নামলে অ্যাডমিনকে সতর্ক করা হবে (0 = বন্ধ), সতর্কতা কত সেকেন্ড জমিয়ে একসাথে পাঠানো হবে, হারের সময়-জানালা ---
+LOW_STOCK_THRESHOLD = int(os.environ.get("LOW_STOCK_THRESHOLD", 50))
+LOW_STOCK_DEBOUNCE = float(os.environ.get("LOW_STOCK_DEBOUNCE", 60))
+STATS_RATE_WINDOW = float(os.environ.get("STATS_RATE_WINDOW", 3600))
+# --- ফ্লাড কন্ট্রোল: প্রতি ইউজার প্রতি অ্যাকশনে সেকেন্ডে কতবার (burst পর্যন্ত জমা থাকে) ---
+THROTTLE_RATE = float(os.environ.get("THROTTLE_RATE", 1.0))
+THROTTLE_BURST = float(os.environ.get("THROTTLE_BURST", 3))
+# --- টেলিগ্রামে পাঠানোর সীমা: সব চ্যাট মিলিয়ে এবং প্রতি চ্যাটে সেকেন্ডে কতটি অনুরোধ ---
+TELEGRAM_GLOBAL_RATE = float(os.environ.get("TELEGRAM_GLOBAL_RATE", 30))
+TELEGRAM_CHAT_RATE = float(os.environ.get("TELEGRAM_CHAT_RATE", 1))
 
 # চেক করা হচ্ছে
 if not BOT_TOKEN or not ADMIN_ID_STR or not ADMIN_USERNAME:
@@ -33,6 +100,14 @@ try:
 except ValueError:
     logging.critical("CRITICAL ERROR: ADMIN_ID is not a valid integer!")
     exit()
+
+if RUN_MODE == "webhook" and not WEBHOOK_URL:
+    logging.critical("CRITICAL ERROR: RUN_MODE=webhook requires WEBHOOK_URL!")
+    exit()
+
+if WORKERS > 1 and (RUN_MODE != "webhook" or STORAGE_BACKEND != "redis"):
+    logging.critical("CRITICAL ERROR: WORKERS > 1 requires RUN_MODE=webhook and STORAGE_BACKEND=redis!")
+    exit()
 # -----------------------------------------------------------------
 
 # --- ইন-মেমরি ডাটাবেস ---
@@ -42,6 +117,35 @@ mock_db: Dict = {
         "num_limit": 7
     }
 }
+# হ্যান্ডলাররা সরাসরি mock_db না ছুঁয়ে db-এর মাধ্যমে কাজ করে; memory ব্যাকএন্ডে db মানে এই mock_db-ই
+db: Storage = create_storage(STORAGE_BACKEND, SQLITE_PATH, mock_db, REDIS_URL)
+
+def create_fsm_storage() -> BaseStorage:
+    """redis ব্যাকএন্ডে FSM স্টেটও Redis-এ থাকে, যাতে যেকোনো ওয়ার্কার যেকোনো ইউজারের আপডেট নিতে পারে।
+
+    দুই ক্ষেত্রেই FSM_TTL সেকেন্ড নিষ্ক্রিয় থাকলে স্টেট মুছে যায়; মেমরিতে FSM_MAX_RECORDS-এর বেশি হলে LRU বাদ পড়ে।
+    """
+    if STORAGE_BACKEND == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage as RedisFSMStorage
+        return RedisFSMStorage.from_url(REDIS_URL, state_ttl=FSM_TTL, data_ttl=FSM_TTL)
+    return CompactFSMStorage(ttl=FSM_TTL, max_records=FSM_MAX_RECORDS)
+
+def create_inventory() -> Inventory:
+    """redis ব্যাকএন্ডে কাউন্টারও Redis-এ, যাতে যেকোনো ওয়ার্কারের দেওয়া নম্বর /stats ও সতর্কতায় আসে।"""
+    if STORAGE_BACKEND == "redis": return RedisInventory(db.client, db.prefix, threshold=LOW_STOCK_THRESHOLD, window=STATS_RATE_WINDOW)
+    return Inventory(threshold=LOW_STOCK_THRESHOLD, window=STATS_RATE_WINDOW)
+
+def create_shared_buckets() -> Optional[RedisBuckets]:
+    """redis ব্যাকএন্ডে ফ্লাড কন্ট্রোল ও আউটবাউন্ড সীমার বাকেটও Redis-এ, যাতে WORKERS টি প্রসেস মিলিয়ে একবারই গোনা হয়।"""
+    return RedisBuckets(db.client, db.prefix) if STORAGE_BACKEND == "redis" else None
+
+def create_shared_isolation(storage: BaseStorage) -> Optional[BaseEventIsolation]:
+    """redis ব্যাকএন্ডে একই চ্যাটের দুটি আপডেট দুই প্রসেসে গেলেও যেন একসাথে FSM না বদলায়, তার জন্য Redis লক।
+
+    লকের মেয়াদ 60 সেকেন্ড, হ্যান্ডলার চলাকালীন বারবার বাড়ানো হয়, তাই লম্বা ফাইল ইমপোর্টেও লক হাতছাড়া হয় না।
+    """
+    if STORAGE_BACKEND != "redis": return None
+    return RenewingRedisIsolation(storage.redis, timeout=60, sleep=0.01)
 
 # --- FSM স্টেটস (States) ---
 class AdminStates(StatesGroup):
@@ -64,20 +168,64 @@ class UserStates(StatesGroup):
     get_number_display = State()
 
 # --- কলব্যাক ডেটা ফ্যাক্টরি ---
+# নামের বদলে Catalog-এর ছোট আইডি যায় (কলব্যাক ডেটা সর্বোচ্চ ৬৪ বাইট); আইডি শুধু ওই catalog_version-এ বৈধ
 class ServiceCallback(CallbackData, prefix="svc"):
     action: str  
-    service_name: str
+    version: int
+    service_id: int
 class CountryCallback(CallbackData, prefix="ctry"):
     action: str  
-    service_name: str
-    country_name: str
+    version: int
+    service_id: int
+    country_id: int
+class PageCallback(CallbackData, prefix="pg"):
+    page: int
+    search: bool = False  # True হলে FSM ডেটার picker_query দিয়ে ফিল্টার করা তালিকার পেজ (যে পিকারে সার্চ হয়েছিল শুধু সেখানেই)
 class NavCallback(CallbackData, prefix="nav"):
     action: str 
     current_state: Optional[str] = None
 
 # --- বট এবং ডিসপ্যাচার সেটআপ ---
 bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode="HTML"))
-dp = Dispatcher()
+fsm_storage = create_fsm_storage()
+# প্রতিটি আপডেট: একই চ্যাটের আপডেট ক্রমানুসারে (FSM স্টেট পড়ার আগেই লাইনে দাঁড়ায়), সব মিলিয়ে সর্বোচ্চ UPDATE_CONCURRENCY টি একসাথে
+def report_backlog_drained(count: int, seconds: float):
+    BACKLOG_DRAIN_SECONDS.set(seconds); logging.info(f"Startup backlog of {count} updates drained in {seconds:.2f}s")
+scheduler = UpdateScheduler(concurrency=UPDATE_CONCURRENCY, on_drained=report_backlog_drained, shared=create_shared_isolation(fsm_storage))
+dp = Dispatcher(storage=fsm_storage, events_isolation=scheduler)
+dp.update.outer_middleware(scheduler.track)  # FSM কী ছাড়া আপডেটও সেমাফোরে দাঁড়ায় ও ব্যাকলগে গোনা হয়
+
+# --- মেট্রিক্স (/metrics, Prometheus টেক্সট ফরম্যাট) ---
+# সব মান যেখানে ঘটনা ঘটে সেখানেই আপডেট হয় (O(1)); স্ক্র্যাপের সময় পুল স্ক্যান করা হয় না
+metrics = Registry()
+HANDLER_SECONDS = metrics.histogram("nbot_handler_seconds", "Handler latency in seconds.", ["handler"])
+HANDLER_ERRORS = metrics.counter("nbot_handler_errors_total", "Exceptions raised out of handlers.", ["handler"])
+NUMBERS_REMAINING = metrics.gauge("nbot_numbers_remaining", "Numbers left in stock.", ["service", "country"])
+NUMBERS_ALLOCATED = metrics.counter("nbot_numbers_allocated_total", "Numbers handed out to users.", ["service", "country"])
+NUMBERS_IMPORTED = metrics.counter("nbot_numbers_imported_total", "New numbers added by imports.", ["service", "country"])
+IMPORT_REJECTED = metrics.counter("nbot_import_rejected_total", "Import lines rejected, by reason (in_stock, issued, invalid).", ["service", "country", "reason"])
+IMPORT_SECONDS = metrics.histogram("nbot_import_seconds", "Duration of a whole text or file import.", ["source"], buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+EVENT_LOOP_LAG = metrics.gauge("nbot_event_loop_lag_seconds", "How late the event loop woke up from a 1s sleep.")
+FSM_RECORDS = metrics.gauge("nbot_fsm_records", "Users with FSM state (in memory, or in Redis counted every FSM_COUNT_INTERVAL seconds).")
+FSM_DROPPED = metrics.counter("nbot_fsm_dropped_total", "FSM records dropped from memory, by reason (expired, evicted).", ["reason"])
+KEYBOARD_CACHE = metrics.counter("nbot_keyboard_cache_total", "Keyboard cache lookups and evictions.", ["result"])
+THROTTLED = metrics.counter("nbot_throttled_total", "Updates dropped by per-user flood control.", ["action"])
+OUTBOUND = metrics.counter("nbot_outbound_requests_total", "Outgoing Telegram requests delayed or retried by the rate governor.", ["result"])
+UPDATES_IN_PROGRESS = metrics.gauge("nbot_updates_in_progress", "Updates being handled or waiting for their chat/concurrency slot.", ["status"])
+STARTUP_BACKLOG = metrics.gauge("nbot_startup_backlog_updates", "Updates pending at Telegram when the bot started.")
+BACKLOG_DRAIN_SECONDS = metrics.gauge("nbot_startup_backlog_drain_seconds", "Time to process the startup backlog.")
+background_tasks = set()
+# প্রতি পুলের স্টক/আজ দেওয়া/হার; হ্যান্ডলাররা ঘটনার সাথেই আপডেট করে
+inventory = create_inventory()
+
+# ইনবাউন্ড: flags={"throttle": ...} দেওয়া হ্যান্ডলারে প্রতি ইউজার টোকেন বাকেট; আউটবাউন্ড: টেলিগ্রামের গ্লোবাল/চ্যাট সীমা মেনে পাঠানো
+shared_buckets = create_shared_buckets()
+throttling = ThrottlingMiddleware(rate=THROTTLE_RATE, burst=THROTTLE_BURST, shared=shared_buckets)
+dp.message.middleware(throttling); dp.callback_query.middleware(throttling)
+# মেট্রিক্স থ্রটলিংয়ের পরে (ভেতরে) বসে, তাই থ্রটলে বাদ পড়া আপডেট হ্যান্ডলার লেটেন্সিতে গোনা হয় না (সেগুলো nbot_throttled_total-এ)
+dp.message.middleware(MetricsMiddleware(HANDLER_SECONDS, HANDLER_ERRORS)); dp.callback_query.middleware(MetricsMiddleware(HANDLER_SECONDS, HANDLER_ERRORS))
+rate_governor = RateGovernor(global_rate=TELEGRAM_GLOBAL_RATE, chat_rate=TELEGRAM_CHAT_RATE, shared=shared_buckets)
+bot.session.middleware(rate_governor)
 logging.basicConfig(level=logging.INFO)
 
 # --- রিপ্লাই কীবোর্ড (প্রধান মেনু) ---
@@ -87,7 +235,7 @@ admin_buttons = [
     [KeyboardButton(text="🗑️ Remove Service"), KeyboardButton(text="🌍 Add country")],
     [KeyboardButton(text="❌ Remove country"), KeyboardButton(text="Num Limit")],
     [KeyboardButton(text="🔢 Get Number"), KeyboardButton(text="🆘 Support")],
-    [KeyboardButton(text="🔙 Cancel Operation")]
+    [KeyboardButton(text="📊 Stats"), KeyboardButton(text="🔙 Cancel Operation")]
 ]
 admin_keyboard = ReplyKeyboardMarkup(keyboard=admin_buttons, resize_keyboard=True, input_field_placeholder="Select an option...")
 user_buttons = [
@@ -97,34 +245,112 @@ user_buttons = [
 user_keyboard = ReplyKeyboardMarkup(keyboard=user_buttons, resize_keyboard=True, input_field_placeholder="Select an option...")
 
 
+# --- কীবোর্ড ক্যাশ: key = (kind, service, action_prefix, catalog_version, page) ---
+# ইনভ্যালিডেশন বলে আলাদা কিছু নেই: ক্যাটালগ বদলালে ভার্সন বাড়ে, নতুন কী-তে নতুন কীবোর্ড তৈরি হয়, পুরনোগুলো LRU-তে সরে যায়।
+# তাই অন্য ওয়ার্কারের করা পরিবর্তনেও পুরনো কীবোর্ড আর ব্যবহার হয় না।
+keyboard_cache = LRUCache(KEYBOARD_CACHE_SIZE)
+
+# --- ক্যাটালগ স্ন্যাপশট: catalog_version বদলালেই আবার লোড হয় ---
+# ভার্সন প্রতি রেন্ডারে নয়, CATALOG_CHECK_INTERVAL সেকেন্ডে একবার পড়া হয় (redis-এ প্রতিটি একটি রাউন্ড-ট্রিপ)। এই প্রসেসের
+# পরিবর্তন catalog_changed() দিয়ে সাথে সাথে ধরা পড়ে; অন্য ওয়ার্কারেরটা সর্বোচ্চ ততক্ষণ দেরিতে, আর সেই ফাঁকে নতুন
+# কীবোর্ডের ট্যাপ এলে কলব্যাকের ভার্সন না মেলায় picked_* আবার পড়ে নেয়।
+catalog: Optional[Catalog] = None; catalog_checked = float("-inf")
+async def get_catalog(fresh: bool = False) -> Catalog:
+    global catalog, catalog_checked
+    now = time.monotonic()
+    if catalog is None or fresh or now - catalog_checked >= CATALOG_CHECK_INTERVAL:
+        version = await db.catalog_version(); catalog_checked = now
+        if catalog is None or catalog.version != version: catalog = await Catalog.load(db)
+    return catalog
+def catalog_changed():
+    """এই প্রসেসে সার্ভিস/দেশ যোগ বা মোছার পর: পরের get_catalog() অপেক্ষা না করে নতুন ভার্সন পড়ে।"""
+    global catalog_checked
+    catalog_checked = float("-inf")
+
+# পিকার স্টেট -> (তালিকার ধরন, অ্যাকশন); এই স্টেটগুলোতে টেক্সট পাঠালে সেটা নামের প্রিফিক্স সার্চ
+PICKERS = {
+    AdminStates.add_country_select_service.state: ("services", "select_for_add_country"),
+    AdminStates.add_number_select_service.state: ("services", "select_for_add_num"),
+    AdminStates.remove_service_select.state: ("services", "remove_service"),
+    AdminStates.remove_country_select_service.state: ("services", "select_for_remove_country"),
+    UserStates.get_number_select_service.state: ("services", "select_for_get"),
+    AdminStates.add_number_select_country.state: ("countries", "select_for_add_num"),
+    AdminStates.remove_country_select.state: ("countries", "remove_country"),
+    UserStates.get_number_select_country.state: ("countries", "select_for_get"),
+}
+
+def add_picker_page(builder: InlineKeyboardBuilder, ids: Sequence[int], label: Callable[[int], str], callback: Callable[[int], str], page: int, search: bool = False):
+    """ids-এর একটি পেজ PICKER_COLUMNS কলামে বসায়; একাধিক পেজ হলে ◀️ n/m ▶️ সারি যোগ করে (শেষ পেজের পর আবার প্রথমটি)।"""
+    pages = max(1, -(-len(ids) // PICKER_PAGE_SIZE)); page = min(max(page, 0), pages - 1)
+    builder.row(*(InlineKeyboardButton(text=label(i), callback_data=callback(i)) for i in ids[page * PICKER_PAGE_SIZE:(page + 1) * PICKER_PAGE_SIZE]), width=PICKER_COLUMNS)
+    if pages > 1:
+        builder.row(InlineKeyboardButton(text="◀️", callback_data=PageCallback(page=(page - 1) % pages, search=search).pack()),
+                    InlineKeyboardButton(text=f"{page + 1}/{pages} 🔍", callback_data="picker_hint"),
+                    InlineKeyboardButton(text="▶️", callback_data=PageCallback(page=(page + 1) % pages, search=search).pack()))
+
 # --- Helper Function: সার্ভিস কীবোর্ড ---
-def get_services_keyboard(action_prefix: str) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
-    services = mock_db["services"].keys()
-    if not services:
-        builder.row(InlineKeyboardButton(text="🚫 কোনো সার্ভিস পাওয়া যায়নি", callback_data="none"))
+async def get_services_keyboard(action_prefix: str, page: int = 0) -> InlineKeyboardMarkup:
+    current = await get_catalog(); key = ("services", None, action_prefix, current.version, page); markup = keyboard_cache.get(key)
+    if markup is None: markup = build_services_keyboard(current, action_prefix, page); keyboard_cache.put(key, markup)
+    return markup
+def build_services_keyboard(current: Catalog, action_prefix: str, page: int = 0, matches: Optional[List[int]] = None) -> InlineKeyboardMarkup:
+    """matches দিলে (প্রিফিক্স সার্চের ফল) শুধু সেই সার্ভিসগুলো।"""
+    builder = InlineKeyboardBuilder(); ids = range(len(current.services)) if matches is None else matches
+    if not ids:
+        builder.row(InlineKeyboardButton(text="🚫 কোনো সার্ভিস পাওয়া যায়নি", callback_data="none"))
     else:
-        for service in services:
-            builder.row(InlineKeyboardButton(text=service, callback_data=ServiceCallback(action=action_prefix, service_name=service).pack()))
+        add_picker_page(builder, ids, current.services.__getitem__, lambda sid: ServiceCallback(action=action_prefix, version=current.version, service_id=sid).pack(), page, matches is not None)
     builder.row(InlineKeyboardButton(text="🔙 Cancel", callback_data="cancel_fsm"))
     return builder.as_markup()
 
 # --- Helper Function: দেশ কীবোর্ড ---
-def get_countries_keyboard(service_name: str, action_prefix: str) -> InlineKeyboardMarkup:
-    builder = InlineKeyboardBuilder()
-    if service_name not in mock_db["services"]:
-        builder.row(InlineKeyboardButton(text="🚫 সার্ভিস খুঁজে পাওয়া যায়নি", callback_data="none"))
+async def get_countries_keyboard(service_name: str, action_prefix: str, page: int = 0) -> InlineKeyboardMarkup:
+    current = await get_catalog(); key = ("countries", service_name, action_prefix, current.version, page); markup = keyboard_cache.get(key)
+    if markup is None: markup = build_countries_keyboard(current, service_name, action_prefix, page); keyboard_cache.put(key, markup)
+    return markup
+def build_countries_keyboard(current: Catalog, service_name: str, action_prefix: str, page: int = 0, matches: Optional[List[int]] = None) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder(); sid = current.service_id(service_name)
+    if sid is None:
+        builder.row(InlineKeyboardButton(text="🚫 সার্ভিস খুঁজে পাওয়া যায়নি", callback_data="none"))
         builder.row(InlineKeyboardButton(text="🔙 Back to Services", callback_data=NavCallback(action="back").pack()))
         return builder.as_markup()
-    countries = mock_db["services"].get(service_name, {}).keys()
-    if not countries:
-        builder.row(InlineKeyboardButton(text="🚫 কোনো দেশ পাওয়া যায়নি", callback_data="none"))
+    countries = current.countries[sid]; ids = range(len(countries)) if matches is None else matches
+    if not ids:
+        builder.row(InlineKeyboardButton(text="🚫 কোনো দেশ পাওয়া যায়নি", callback_data="none"))
     else:
-        for country in countries:
-            builder.row(InlineKeyboardButton(text=country, callback_data=CountryCallback(action=action_prefix, service_name=service_name, country_name=country).pack()))
+        add_picker_page(builder, ids, countries.__getitem__, lambda cid: CountryCallback(action=action_prefix, version=current.version, service_id=sid, country_id=cid).pack(), page, matches is not None)
     builder.row(InlineKeyboardButton(text="🔙 Back to Services", callback_data=NavCallback(action="back").pack()))
     return builder.as_markup()
 
+async def picker_keyboard(state_name: Optional[str], data: Dict, page: int = 0, query: Optional[str] = None) -> Optional[InlineKeyboardMarkup]:
+    """বর্তমান পিকার স্টেটের একটি পেজ; query দিলে trie থেকে শুধু সেই প্রিফিক্সের নামগুলো (এগুলো ক্যাশ হয় না)।"""
+    picker = PICKERS.get(state_name)
+    if picker is None: return None
+    kind, action = picker; service_name = data.get("service_name")
+    if query is None: return await get_services_keyboard(action, page) if kind == "services" else await get_countries_keyboard(service_name, action, page)
+    current = await get_catalog()
+    if kind == "services": return build_services_keyboard(current, action, page, current.search_services(query))
+    sid = current.service_id(service_name)
+    return build_countries_keyboard(current, service_name, action, page, [] if sid is None else current.search_countries(sid, query))
+
+# --- কলব্যাকের আইডি থেকে নাম: পুরনো ক্যাটালগের কীবোর্ড হলে নতুন তালিকা দেখিয়ে None ---
+async def picked_service(query: CallbackQuery, callback_data: ServiceCallback) -> Optional[str]:
+    current = await get_catalog()
+    if callback_data.version != current.version: current = await get_catalog(fresh=True)  # এই প্রসেসের স্ন্যাপশট হয়তো পিছিয়ে
+    service_name = current.service(callback_data.service_id) if callback_data.version == current.version else None
+    if service_name is None: await refresh_stale_picker(query, await get_services_keyboard(callback_data.action))
+    return service_name
+async def picked_country(query: CallbackQuery, callback_data: CountryCallback, state: FSMContext) -> Optional[Tuple[str, str]]:
+    current = await get_catalog(); service_name = country_name = None
+    if callback_data.version != current.version: current = await get_catalog(fresh=True)
+    if callback_data.version == current.version: service_name = current.service(callback_data.service_id); country_name = current.country(callback_data.service_id, callback_data.country_id)
+    if country_name is None: await refresh_stale_picker(query, await get_countries_keyboard((await state.get_data()).get("service_name"), callback_data.action)); return None
+    return service_name, country_name
+async def refresh_stale_picker(query: CallbackQuery, markup: InlineKeyboardMarkup):
+    await query.answer("তালিকাটি আপডেট হয়েছে, অনুগ্রহ করে আবার বেছে নিন।", show_alert=True)
+    try: await query.message.edit_reply_markup(reply_markup=markup)
+    except Exception as e: logging.warning(f"Could not refresh picker: {e}")
+
 # --- প্রধান কমান্ড হ্যান্ডলার (/start) ---
 @dp.message(Command("start"))
 async def send_welcome(message: Message, state: FSMContext):
@@ -138,7 +364,7 @@ async def send_welcome(message: Message, state: FSMContext):
 # --- FSM ক্যানসেল হ্যান্ডলার ---
 @dp.callback_query(F.data == "cancel_fsm")
 async def cancel_fsm_handler(query: CallbackQuery, state: FSMContext):
-    await state.clear(); await query.message.edit_text("অপারেশন বাতিল করা হয়েছে।"); await query.answer()
+    await state.clear(); await edit_or_send(query.message, "অপারেশন বাতিল করা হয়েছে।"); await query.answer()
 @dp.message(F.text == "🔙 Cancel Operation", StateFilter("*"))
 async def handle_cancel_operation(message: Message, state: FSMContext):
     current_state = await state.get_state()
@@ -156,48 +382,54 @@ async def admin_add_service_start(message: Message, state: FSMContext):
 @dp.message(AdminStates.add_service_name, F.text)
 async def admin_add_service_name_input(message: Message, state: FSMContext):
     service_name = message.text.strip()
-    if service_name in mock_db["services"]:
+    if not await db.add_service(service_name):
         await message.answer(f"'{service_name}' নামে সার্ভিস আগে থেকেই আছে। অন্য নাম দিন:", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Cancel", callback_data="cancel_fsm")]]))
     else:
-        mock_db["services"][service_name] = {}; await state.clear(); await message.answer(f"✅ সার্ভিস '{service_name}' সফলভাবে যোগ করা হয়েছে।"); logging.info(f"Admin added service: {service_name}.")
+        catalog_changed(); await state.clear(); await message.answer(f"✅ সার্ভিস '{service_name}' সফলভাবে যোগ করা হয়েছে।"); logging.info(f"Admin added service: {service_name}.")
 
 # --- ২. ADMIN: Add Country ---
 @dp.message(F.text == "🌍 Add country", StateFilter(None))
 async def admin_add_country_start(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID: return
     await state.set_state(AdminStates.add_country_select_service)
-    await message.answer("কোন সার্ভিসের অধীনে দেশ যোগ করতে চান?", reply_markup=get_services_keyboard(action_prefix="select_for_add_country"))
+    await message.answer("কোন সার্ভিসের অধীনে দেশ যোগ করতে চান?", reply_markup=await get_services_keyboard(action_prefix="select_for_add_country"))
 @dp.callback_query(ServiceCallback.filter(F.action == "select_for_add_country"), AdminStates.add_country_select_service)
 async def admin_add_country_service_selected(query: CallbackQuery, callback_data: ServiceCallback, state: FSMContext):
-    service_name = callback_data.service_name; await state.update_data(service_name=service_name); await state.set_state(AdminStates.add_country_name)
+    service_name = await picked_service(query, callback_data)
+    if service_name is None: return
+    await state.update_data(service_name=service_name); await state.set_state(AdminStates.add_country_name)
     await query.message.edit_text(f"<b>সার্ভিস: {service_name}</b>\n\nএই সার্ভিসে দেশ যোগ করতে, নিচে দেশের নাম টাইপ করে সেন্ড করুন।", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Back to Services", callback_data=NavCallback(action="back").pack())]]))
     await query.answer()
 @dp.message(AdminStates.add_country_name, F.text)
 async def admin_add_country_name_input(message: Message, state: FSMContext):
     country_name = message.text.strip(); data = await state.get_data(); service_name = data.get("service_name")
-    if not service_name or service_name not in mock_db["services"]:
+    if not service_name or not await db.has_service(service_name):
         await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"); return
-    if country_name in mock_db["services"][service_name]:
+    if not await db.add_country(service_name, country_name):
         await message.answer(f"'{country_name}' দেশটি '{service_name}' সার্ভিসে আগে থেকেই আছে। অন্য নাম দিন:", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Back to Services", callback_data=NavCallback(action="back").pack())]]))
     else:
-        mock_db["services"][service_name][country_name] = []; await state.clear(); await message.answer(f"✅ দেশ '{country_name}' সফলভাবে '{service_name}' সার্ভিসে যোগ করা হয়েছে।"); logging.info(f"Admin added country: {country_name} to {service_name}.")
+        catalog_changed(); await inventory.set_stock(service_name, country_name, 0); await state.clear(); await message.answer(f"✅ দেশ '{country_name}' সফলভাবে '{service_name}' সার্ভিসে যোগ করা হয়েছে।"); logging.info(f"Admin added country: {country_name} to {service_name}.")
 
 # --- ৩. ADMIN: Add Number ---
 @dp.message(F.text == "➕ Add Number", StateFilter(None))
 async def admin_add_number_start(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID: return
     await state.set_state(AdminStates.add_number_select_service)
-    await message.answer("কোন সার্ভিসে নম্বর যোগ করতে চান?", reply_markup=get_services_keyboard(action_prefix="select_for_add_num"))
+    await message.answer("কোন সার্ভিসে নম্বর যোগ করতে চান?", reply_markup=await get_services_keyboard(action_prefix="select_for_add_num"))
 @dp.callback_query(ServiceCallback.filter(F.action == "select_for_add_num"), AdminStates.add_number_select_service)
 async def admin_add_number_service_selected(query: CallbackQuery, callback_data: ServiceCallback, state: FSMContext):
-    service_name = callback_data.service_name; await state.update_data(service_name=service_name); await state.set_state(AdminStates.add_number_select_country)
-    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশে নম্বর যোগ করতে চান?", reply_markup=get_countries_keyboard(service_name, action_prefix="select_for_add_num"))
+    service_name = await picked_service(query, callback_data)
+    if service_name is None: return
+    await state.update_data(service_name=service_name); await state.set_state(AdminStates.add_number_select_country)
+    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশে নম্বর যোগ করতে চান?", reply_markup=await get_countries_keyboard(service_name, action_prefix="select_for_add_num"))
     await query.answer()
 @dp.callback_query(CountryCallback.filter(F.action == "select_for_add_num"), AdminStates.add_number_select_country)
 async def admin_add_number_country_selected(query: CallbackQuery, callback_data: CountryCallback, state: FSMContext):
-    await state.update_data(service_name=callback_data.service_name, country_name=callback_data.country_name); await state.set_state(AdminStates.add_number_method_choice)
+    picked = await picked_country(query, callback_data, state)
+    if picked is None: return
+    service_name, country_name = picked; await state.update_data(service_name=service_name, country_name=country_name); await state.set_state(AdminStates.add_number_method_choice)
     method_keyboard = InlineKeyboardBuilder(); method_keyboard.row(InlineKeyboardButton(text="✍️ Add via Text", callback_data="add_num:text")); method_keyboard.row(InlineKeyboardButton(text="📄 Add via Text File", callback_data="add_num:file")); method_keyboard.row(InlineKeyboardButton(text="🔙 Back to Countries", callback_data=NavCallback(action="back").pack()))
-    await query.message.edit_text(f"<b>সার্ভিস: {callback_data.service_name}</b>\n<b>দেশ: {callback_data.country_name}</b>\n\nআপনি কিভাবে নম্বর যোগ করতে চান? (টেক্সট বা ফাইল)", reply_markup=method_keyboard.as_markup())
+    await query.message.edit_text(f"<b>সার্ভিস: {service_name}</b>\n<b>দেশ: {country_name}</b>\n\nআপনি কিভাবে নম্বর যোগ করতে চান? (টেক্সট বা ফাইল)", reply_markup=method_keyboard.as_markup())
     await query.answer()
 @dp.callback_query(F.data == "add_num:text", AdminStates.add_number_method_choice)
 async def handle_add_num_text_choice(query: CallbackQuery, state: FSMContext):
@@ -207,25 +439,75 @@ async def handle_add_num_text_choice(query: CallbackQuery, state: FSMContext):
 async def handle_add_num_file_choice(query: CallbackQuery, state: FSMContext):
     await state.set_state(AdminStates.add_number_input_file); keyboard = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Back to Method Choice", callback_data=NavCallback(action="back").pack())]])
     await query.message.edit_text("<b>নির্দেশনা:</b>\nঅনুগ্রহ করে একটি <b>.txt</b> ফাইল আপলোড করুন। ফাইলের প্রতিটি নম্বর একটি নতুন লাইনে থাকতে হবে:", reply_markup=keyboard); await query.answer()
-async def process_numbers(text_data: str, service_name: str, country_name: str) -> int:
-    numbers = [num.strip() for num in text_data.splitlines() if num.strip()]; count = 0
-    if country_name not in mock_db["services"][service_name]: mock_db["services"][service_name][country_name] = []
-    for num in numbers:
-        if num not in mock_db["services"][service_name][country_name]: mock_db["services"][service_name][country_name].append(num); count += 1
-    return count
+def describe_rejected(result: ImportResult) -> str:
+    """বাদ পড়া নম্বরগুলোর কারণসহ সারাংশ, অ্যাডমিনের মেসেজে দেখানোর জন্য।"""
+    return f"স্টকে আগে থেকেই আছে: {result.in_stock}, আগে দেওয়া হয়েছে: {result.issued}, অবৈধ: {result.invalid}"
+async def import_lines(lines: List[str], service_name: str, country_name: str) -> ImportResult:
+    """এক ব্যাচ লাইন পুলে যোগ করে; কতগুলো নতুন আর কতগুলো কোন কারণে বাদ গেল তা ফেরত দেয়।"""
+    result = await db.add_numbers(service_name, country_name, [num for num in map(str.strip, lines) if num])
+    NUMBERS_IMPORTED.inc(result.added, service_name, country_name)
+    for reason in ("in_stock", "issued", "invalid"):
+        if getattr(result, reason): IMPORT_REJECTED.inc(getattr(result, reason), service_name, country_name, reason)
+    stock = await db.count(service_name, country_name); NUMBERS_REMAINING.set(stock, service_name, country_name); await inventory.imported(service_name, country_name, result.added, stock)
+    return result
+async def process_numbers(text_data: str, service_name: str, country_name: str) -> ImportResult:
+    start = time.perf_counter(); result = await import_lines(text_data.splitlines(), service_name, country_name)
+    IMPORT_SECONDS.observe(time.perf_counter() - start, "text"); return result
+async def stream_file_lines(file_path: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> AsyncIterator[List[str]]:
+    """টেলিগ্রাম থেকে ফাইল চাঙ্কে চাঙ্কে নামিয়ে লাইনের ব্যাচ দেয়; চাঙ্কের সীমানায় ভাঙা লাইন পরের চাঙ্কের সাথে জোড়া লাগে।"""
+    url = bot.session.api.file_url(bot.token, file_path); decoder = codecs.getincrementaldecoder("utf-8")(); tail = ""
+    # aiogram timeout-কে int লিখলেও সরাসরি aiohttp-র session.get-এ দেয়, আর সেখানে সংখ্যা মানে ClientTimeout(total=...)
+    # — বড় ফাইলের পুরো ডাউনলোডেই সীমা পড়ত। তাই ClientTimeout নিজেই দেওয়া হয়: মোট সীমা নেই, শুধু প্রতি রিড।
+    timeout = ClientTimeout(total=None, sock_read=IMPORT_READ_TIMEOUT)
+    async for chunk in bot.session.stream_content(url=url, timeout=timeout, chunk_size=chunk_size, raise_for_status=True):
+        text = tail + decoder.decode(chunk); lines = text.splitlines(); tail = ""
+        if lines and not text.endswith(("\n", "\r")): tail = lines.pop()
+        elif text.endswith("\r"): tail = lines.pop() + "\r"  # "\r\n" চাঙ্কের সীমানায় ভাঙলে পরের "\n" যেন ফাঁকা লাইন না বানায়
+        if lines: yield lines
+    text = tail + decoder.decode(b"", final=True)
+    if text: yield text.splitlines()
+class ImportAborted(Exception):
+    """ফাইল ইমপোর্ট মাঝপথে থেমে গেছে; result-এ থামার আগ পর্যন্ত যা যোগ বা বাদ হয়েছে।"""
+    def __init__(self, result: ImportResult, error: Exception):
+        super().__init__(str(error) or type(error).__name__); self.result = result
+async def process_number_stream(batches: AsyncIterator[List[str]], service_name: str, country_name: str, progress: Optional[Message] = None) -> ImportResult:
+    """ব্যাচগুলো ইমপোর্ট করে; প্রতি ব্যাচের পর ইভেন্ট লুপকে ছেড়ে দেয় এবং একটি প্রগ্রেস মেসেজ এডিট করে।"""
+    total = ImportResult(); start = last_edit = time.monotonic()
+    try:
+        async for lines in batches:
+            total = total.merge(await import_lines(lines, service_name, country_name))
+            if progress and time.monotonic() - last_edit >= IMPORT_PROGRESS_INTERVAL:
+                last_edit = time.monotonic()
+                try: await progress.edit_text(f"⏳ ইমপোর্ট চলছে... নতুন: {total.added}, বাদ: {total.rejected}")
+                except Exception as e: logging.warning(f"Could not edit progress message: {e}")
+            await asyncio.sleep(0)
+    except Exception as e: raise ImportAborted(total, e) from e
+    IMPORT_SECONDS.observe(time.monotonic() - start, "file")
+    return total
 @dp.message(AdminStates.add_number_input_text, F.text)
 async def admin_add_number_text_input(message: Message, state: FSMContext):
     data = await state.get_data(); service = data.get("service_name"); country = data.get("country_name")
-    if not service or not country or service not in mock_db["services"]: await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"); return
-    count = await process_numbers(message.text, service, country); await state.clear(); await message.answer(f"✅ সফলভাবে {count} টি নতুন নম্বর '{country}' ({service}) তে যোগ করা হয়েছে।"); logging.info(f"Admin added {count} numbers via text.")
+    if not service or not country or not await db.has_service(service): await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"); return
+    result = await process_numbers(message.text, service, country); await state.clear()
+    text = f"✅ সফলভাবে {result.added} টি নতুন নম্বর '{country}' ({service}) তে যোগ করা হয়েছে।"
+    if result.rejected: text += f"\n🚫 {result.rejected} টি বাদ দেওয়া হয়েছে ({describe_rejected(result)})"
+    await message.answer(text); logging.info(f"Admin added {result.added} numbers via text ({result}).")
 @dp.message(AdminStates.add_number_input_file, F.document)
 async def admin_add_number_file_input(message: Message, state: FSMContext):
     if not message.document.mime_type == "text/plain": await message.answer("অনুগ্রহ করে একটি .txt ফাইল আপলোড করুন।"); return
     data = await state.get_data(); service = data.get("service_name"); country = data.get("country_name")
-    if not service or not country or service not in mock_db["services"]: await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"); return
+    if not service or not country or not await db.has_service(service): await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।"); return
     try:
-        file = await bot.get_file(message.document.file_id); file_content = await bot.download_file(file.file_path); text_data = file_content.read().decode('utf-8')
-        count = await process_numbers(text_data, service, country); await state.clear(); await message.answer(f"✅ ফাইল থেকে সফলভাবে {count} টি নতুন নম্বর '{country}' ({service}) তে যোগ করা হয়েছে।"); logging.info(f"Admin added {count} numbers via file.")
+        file = await bot.get_file(message.document.file_id); progress = await message.answer("⏳ ফাইল ইমপোর্ট শুরু হচ্ছে...")
+        result = await process_number_stream(stream_file_lines(file.file_path), service, country, progress); await state.clear()
+        await progress.edit_text(f"✅ ফাইল থেকে সফলভাবে {result.added} টি নতুন নম্বর '{country}' ({service}) তে যোগ করা হয়েছে। ({result.rejected} টি বাদ দেওয়া হয়েছে — {describe_rejected(result)})"); logging.info(f"Admin added {result.added} numbers via file ({result}).")
+    except ImportAborted as e:
+        # যা ইতিমধ্যে যোগ হয়েছে তা স্টকেই থাকে, তাই আংশিক ফলটা জানানো হয় আর প্রগ্রেস মেসেজ "⏳"-এ আটকে থাকে না
+        await state.clear(); result = e.result
+        text = f"⚠️ ফাইল ইমপোর্ট মাঝপথে থেমে গেছে: {e}\nথামার আগে {result.added} টি নতুন নম্বর '{country}' ({service}) তে যোগ হয়েছে। ({result.rejected} টি বাদ দেওয়া হয়েছে — {describe_rejected(result)})"
+        try: await progress.edit_text(text)
+        except Exception: await message.answer(text)
+        logging.warning(f"File import aborted after adding {result.added} numbers ({result}): {e}")
     except Exception as e: await message.answer(f"ফাইল প্রসেস করতে সমস্যা হয়েছে: {e}")
 
 # --- ৪. ADMIN: Remove Service ---
@@ -233,161 +515,365 @@ async def admin_add_number_file_input(message: Message, state: FSMContext):
 async def admin_remove_service_start(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID: return
     await state.set_state(AdminStates.remove_service_select)
-    await message.answer("আপনি কোন সার্ভিসটি মুছে ফেলতে চান?", reply_markup=get_services_keyboard(action_prefix="remove_service"))
+    await message.answer("আপনি কোন সার্ভিসটি মুছে ফেলতে চান?", reply_markup=await get_services_keyboard(action_prefix="remove_service"))
 @dp.callback_query(ServiceCallback.filter(F.action == "remove_service"), AdminStates.remove_service_select)
 async def admin_remove_service_selected(query: CallbackQuery, callback_data: ServiceCallback, state: FSMContext):
-    service_name = callback_data.service_name
-    try: del mock_db["services"][service_name]; await state.clear(); await query.message.edit_text(f"✅ সার্ভিস '{service_name}' সফলভাবে মুছে ফেলা হয়েছে।"); logging.info(f"Admin removed service: {service_name}.")
-    except KeyError: await state.clear(); await query.message.edit_text("❌ ত্রুটি: সার্ভিসটি খুঁজে পাওয়া যায়নি।"); await query.answer()
+    service_name = await picked_service(query, callback_data)
+    if service_name is None: return
+    if await db.remove_service(service_name): catalog_changed(); NUMBERS_REMAINING.remove_matching(lambda labels: labels[0] == service_name); await inventory.remove_service(service_name); await state.clear(); await query.message.edit_text(f"✅ সার্ভিস '{service_name}' সফলভাবে মুছে ফেলা হয়েছে।"); logging.info(f"Admin removed service: {service_name}.")
+    else: await state.clear(); await query.message.edit_text("❌ ত্রুটি: সার্ভিসটি খুঁজে পাওয়া যায়নি।"); await query.answer()
 
 # --- ৫. ADMIN: Remove Country ---
 @dp.message(F.text == "❌ Remove country", StateFilter(None))
 async def admin_remove_country_start(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID: return
     await state.set_state(AdminStates.remove_country_select_service)
-    await message.answer("কোন সার্ভিস থেকে দেশ মুছতে চান?", reply_markup=get_services_keyboard(action_prefix="select_for_remove_country"))
+    await message.answer("কোন সার্ভিস থেকে দেশ মুছতে চান?", reply_markup=await get_services_keyboard(action_prefix="select_for_remove_country"))
 @dp.callback_query(ServiceCallback.filter(F.action == "select_for_remove_country"), AdminStates.remove_country_select_service)
 async def admin_remove_country_service_selected(query: CallbackQuery, callback_data: ServiceCallback, state: FSMContext):
-    service_name = callback_data.service_name; await state.update_data(service_name=service_name); await state.set_state(AdminStates.remove_country_select)
-    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nআপনি কোন দেশটি মুছে ফেলতে চান?", reply_markup=get_countries_keyboard(service_name, action_prefix="remove_country")); await query.answer()
+    service_name = await picked_service(query, callback_data)
+    if service_name is None: return
+    await state.update_data(service_name=service_name); await state.set_state(AdminStates.remove_country_select)
+    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nআপনি কোন দেশটি মুছে ফেলতে চান?", reply_markup=await get_countries_keyboard(service_name, action_prefix="remove_country")); await query.answer()
 @dp.callback_query(CountryCallback.filter(F.action == "remove_country"), AdminStates.remove_country_select)
 async def admin_remove_country_selected(query: CallbackQuery, callback_data: CountryCallback, state: FSMContext):
-    service_name = callback_data.service_name; country_name = callback_data.country_name
-    try: del mock_db["services"][service_name][country_name]; await state.clear(); await query.message.edit_text(f"✅ দেশ '{country_name}' ({service_name}) সফলভাবে মুছে ফেলা হয়েছে।"); logging.info(f"Admin removed country: {country_name} from {service_name}.")
-    except KeyError: await state.clear(); await query.message.edit_text("❌ ত্রুটি: দেশটি খুঁজে পাওয়া যায়নি।"); await query.answer()
+    picked = await picked_country(query, callback_data, state)
+    if picked is None: return
+    service_name, country_name = picked
+    if await db.remove_country(service_name, country_name): catalog_changed(); NUMBERS_REMAINING.remove(service_name, country_name); await inventory.remove_country(service_name, country_name); await state.clear(); await query.message.edit_text(f"✅ দেশ '{country_name}' ({service_name}) সফলভাবে মুছে ফেলা হয়েছে।"); logging.info(f"Admin removed country: {country_name} from {service_name}.")
+    else: await state.clear(); await query.message.edit_text("❌ ত্রুটি: দেশটি খুঁজে পাওয়া যায়নি।"); await query.answer()
 
 # --- ৬. ADMIN: Set Num Limit ---
 @dp.message(F.text == "Num Limit", StateFilter(None))
 async def handle_num_limit_start(message: Message, state: FSMContext):
     if message.from_user.id != ADMIN_ID: return
-    await state.set_state(AdminStates.set_num_limit); current_limit = mock_db["settings"]["num_limit"]
+    await state.set_state(AdminStates.set_num_limit); current_limit = await db.get_num_limit()
     await message.answer(f"বর্তমান নম্বর লিমিট <b>{current_limit}</b> টি।\nনতুন লিমিট সংখ্যায় লিখুন (যেমন: 5):", reply_markup=InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="🔙 Cancel", callback_data="cancel_fsm")]]))
 @dp.message(AdminStates.set_num_limit, F.text)
 async def handle_num_limit_input(message: Message, state: FSMContext):
     try:
         new_limit = int(message.text.strip());
         if new_limit <= 0: await message.answer("লিমিট অবশ্যই 0-এর বেশি হতে হবে।"); return
-        mock_db["settings"]["num_limit"] = new_limit; await state.clear(); await message.answer(f"✅ নম্বর লিমিট সফলভাবে <b>{new_limit}</b> টি সেট করা হয়েছে।"); logging.info(f"Num limit set to {new_limit}")
+        if new_limit > MAX_NUM_LIMIT: await message.answer(f"লিমিট সর্বোচ্চ {MAX_NUM_LIMIT} হতে পারে।"); return
+        await db.set_num_limit(new_limit); await state.clear(); await message.answer(f"✅ নম্বর লিমিট সফলভাবে <b>{new_limit}</b> টি সেট করা হয়েছে।"); logging.info(f"Num limit set to {new_limit}")
     except ValueError: await message.answer("ত্রুটি: অনুগ্রহ করে শুধু সংখ্যা টাইপ করুন।")
     except Exception as e: await message.answer(f"একটি ত্রুটি ঘটেছে: {e}")
 
-# --- ৭. USER/ADMIN: Get Number ---
-@dp.message(F.text == "🔢 Get Number", StateFilter(None))
+# --- ৭. ADMIN: Stats ---
+def format_pool_line(row: PoolReport) -> str:
+    mark = "⚠️" if row.stock < LOW_STOCK_THRESHOLD else "•"; eta = f"শেষ হবে ~{format_duration(row.eta)}" if row.stock else "শেষ"
+    return f"{mark} {html.escape(row.country)}: স্টক <b>{row.stock}</b> | আজ দেওয়া {row.issued_today} | ইমপোর্ট {row.import_rate:.0f}/ঘণ্টা | {eta}"
+def format_stock_report(rows: List[PoolReport]) -> str:
+    """পুলগুলো সার্ভিস অনুযায়ী, প্রতিটির মধ্যে কম স্টক আগে।"""
+    lines = [f"<b>📊 স্টক রিপোর্ট</b> ({len(rows)} টি পুল, মোট স্টক {sum(row.stock for row in rows)}, আজ দেওয়া {sum(row.issued_today for row in rows)})"]
+    service = None
+    for row in sorted(rows, key=lambda row: (row.service, row.stock, row.country)):
+        if row.service != service: service = row.service; lines.append(f"\n<b>{html.escape(service)}</b>")
+        lines.append(format_pool_line(row))
+    return "\n".join(lines)
+@dp.message(F.text == "📊 Stats", StateFilter(None))
+@dp.message(Command("stats"))
+async def handle_stats(message: Message, state: FSMContext):
+    if message.from_user.id != ADMIN_ID: return
+    rows = await inventory.report()
+    if not rows: await message.answer("কোনো পুল নেই।"); return
+    text = format_stock_report(rows)
+    if len(text) <= 4096: await message.answer(text); return
+    # অনেক পুল হলে মেসেজের সীমা ছাড়ায়; তখন পুরো রিপোর্ট CSV ফাইলে
+    buffer = io.StringIO(); writer = csv.writer(buffer); writer.writerow(["service", "country", "stock", "issued_today", "imports_per_hour", "issues_per_hour", "eta_seconds"])
+    writer.writerows((row.service, row.country, row.stock, row.issued_today, f"{row.import_rate:.1f}", f"{row.issue_rate:.1f}", "" if row.eta is None else int(row.eta)) for row in rows)
+    await message.answer_document(BufferedInputFile(buffer.getvalue().encode(), filename="stock_report.csv"), caption=f"📊 স্টক রিপোর্ট: {len(rows)} টি পুল")
+
+# --- ৮. USER/ADMIN: Get Number ---
+@dp.message(F.text == "🔢 Get Number", StateFilter(None), flags={"throttle": "get_number"})
 async def user_get_number_start(message: Message, state: FSMContext):
     await state.set_state(UserStates.get_number_select_service)
-    await message.answer("আপনি কোন সার্ভিসের জন্য নম্বর চান?", reply_markup=get_services_keyboard(action_prefix="select_for_get"))
-@dp.callback_query(ServiceCallback.filter(F.action == "select_for_get"), UserStates.get_number_select_service)
+    await message.answer("আপনি কোন সার্ভিসের জন্য নম্বর চান?", reply_markup=await get_services_keyboard(action_prefix="select_for_get"))
+@dp.callback_query(ServiceCallback.filter(F.action == "select_for_get"), UserStates.get_number_select_service, flags={"throttle": "menu"})
 async def user_get_number_service_selected(query: CallbackQuery, callback_data: ServiceCallback, state: FSMContext):
-    service_name = callback_data.service_name; await state.update_data(service_name=service_name); await state.set_state(UserStates.get_number_select_country)
-    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশের নম্বর চান?", reply_markup=get_countries_keyboard(service_name, action_prefix="select_for_get")); await query.answer()
-@dp.callback_query(CountryCallback.filter(F.action == "select_for_get"), UserStates.get_number_select_country)
+    service_name = await picked_service(query, callback_data)
+    if service_name is None: return
+    await state.update_data(service_name=service_name); await state.set_state(UserStates.get_number_select_country)
+    await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশের নম্বর চান?", reply_markup=await get_countries_keyboard(service_name, action_prefix="select_for_get")); await query.answer()
+@dp.callback_query(CountryCallback.filter(F.action == "select_for_get"), UserStates.get_number_select_country, flags={"throttle": "get_number"})
 async def user_get_number_country_selected(query: CallbackQuery, callback_data: CountryCallback, state: FSMContext):
-    await state.update_data(service_name=callback_data.service_name, country_name=callback_data.country_name); await state.set_state(UserStates.get_number_display)
+    picked = await picked_country(query, callback_data, state)
+    if picked is None: return
+    await state.update_data(service_name=picked[0], country_name=picked[1]); await state.set_state(UserStates.get_number_display)
     await show_numbers_page(query.message, state, edit=False); await query.answer()
+TELEGRAM_TEXT_LIMIT = 4096
+HTML_TAGS = re.compile(r"<[^>]*>")
+def rendered_length(html_text: str) -> int:
+    """টেলিগ্রাম মেসেজের দৈর্ঘ্য যেভাবে গোনে: ট্যাগ বাদ দিয়ে, এন্টিটি খুলে, UTF-16 কোড ইউনিটে (ইমোজি = 2)।"""
+    return len(html.unescape(HTML_TAGS.sub("", html_text)).encode("utf-16-le")) // 2
+def build_numbers_document(numbers: List[str], service: str, country: str) -> BufferedInputFile:
+    """নম্বরগুলো একটি বাফারে লাইন ধরে লিখে ফাইল বানায় (স্ট্রিং জোড়া লাগিয়ে নয়), যাতে হাজার নম্বরেও খরচ লিনিয়ার থাকে।"""
+    buffer = io.StringIO()
+    if BULK_FORMAT == "csv": writer = csv.writer(buffer); writer.writerow(("service", "country", "number")); writer.writerows((service, country, num) for num in numbers)
+    else: buffer.writelines(f"{num}\n" for num in numbers)
+    name = "".join(char if char.isalnum() else "_" for char in f"{service}_{country}")
+    return BufferedInputFile(buffer.getvalue().encode(), filename=f"{name}_{len(numbers)}.{'csv' if BULK_FORMAT == 'csv' else 'txt'}")
+async def edit_or_send(message: Message, text: str, reply_markup: Optional[InlineKeyboardMarkup] = None):
+    """ডকুমেন্ট মেসেজের টেক্সট এডিট করা যায় না; তখন তার বাটনগুলো সরিয়ে নতুন মেসেজ পাঠায়।"""
+    if message.document is None: return await message.edit_text(text, reply_markup=reply_markup)
+    try: await message.edit_reply_markup(reply_markup=None)
+    except Exception as e: logging.warning(f"Could not clear document buttons: {e}")
+    return await message.answer(text, reply_markup=reply_markup)
 async def show_numbers_page(message: Message, state: FSMContext, edit: bool = True):
     data = await state.get_data(); service = data.get("service_name"); country = data.get("country_name")
     if not service or not country: await state.clear(); await message.answer("কিছু একটা ভুল হয়েছে। /start দিন।"); return
     try:
-        per_page = mock_db["settings"]["num_limit"]; all_numbers = mock_db["services"].get(service, {}).get(country, []); numbers_to_show = all_numbers[:per_page]
-        text = f"<b>সার্ভিস: {service}</b>\n"
-        if not numbers_to_show: text += f"\n<b>দেশ: {country}</b>\n\n🚫 এই দেশের জন্য আর কোনো নম্বর নেই।"
-        else:
-            text += f"<b>দেশ: {country}</b> ({len(numbers_to_show)} টি নম্বর)\n\n"
-            for num in numbers_to_show: text += f"📞 <b>{country} WS Number Assigned:</b>\n<code>{num}</code>\nWaiting for OTP...\n\n"
-            mock_db["services"][service][country] = all_numbers[per_page:]; logging.info(f"Gave {len(numbers_to_show)} numbers. {len(mock_db['services'][service][country])} remain.")
+        per_page = await db.get_num_limit(); allocated = await db.allocate(service, country, per_page)
+        numbers_to_show, remaining = allocated or ([], 0)
+        # মুছে ফেলা পুলের পুরনো স্ক্রিনে Refresh চাপলে (allocated None) মেট্রিক সিরিজ বা স্টক রিপোর্টে পুলটি আবার তৈরি হয় না, সতর্কতাও যায় না
+        if allocated is not None:
+            NUMBERS_ALLOCATED.inc(len(numbers_to_show), service, country); NUMBERS_REMAINING.set(remaining, service, country)
+            await inventory.issued(service, country, len(numbers_to_show), remaining)
+        # BULK_THRESHOLD-এর কম নম্বরও লম্বা দেশের নামে ৪০৯৬ অক্ষর ছাড়াতে পারে; তখনও ফাইল
+        bulk = len(numbers_to_show) > BULK_THRESHOLD
+        if not numbers_to_show: text = f"<b>সার্ভিস: {service}</b>\n\n<b>দেশ: {country}</b>\n\n🚫 এই দেশের জন্য আর কোনো নম্বর নেই।"
+        elif not bulk:
+            text = f"<b>সার্ভিস: {service}</b>\n<b>দেশ: {country}</b> ({len(numbers_to_show)} টি নম্বর)\n\n" + "".join(f"📞 <b>{country} WS Number Assigned:</b>\n<code>{num}</code>\nWaiting for OTP...\n\n" for num in numbers_to_show)
+            bulk = rendered_length(text) > TELEGRAM_TEXT_LIMIT
+        if bulk: text = f"<b>সার্ভিস: {service}</b>\n<b>দেশ: {country}</b> ({len(numbers_to_show)} টি নম্বর)\n\n📄 নম্বরগুলো এই ফাইলে দেওয়া হলো।"
+        if numbers_to_show: logging.info(f"Gave {len(numbers_to_show)} numbers{' as a document' if bulk else ''}. {remaining} remain.")
         builder = InlineKeyboardBuilder()
-        if len(mock_db["services"][service][country]) > 0: builder.row(InlineKeyboardButton(text=f"🔄 Refresh (Get Next {per_page})", callback_data=NavCallback(action="refresh").pack()))
+        if remaining > 0: builder.row(InlineKeyboardButton(text=f"🔄 Refresh (Get Next {per_page})", callback_data=NavCallback(action="refresh").pack()))
         else:
             if len(numbers_to_show) > 0: builder.row(InlineKeyboardButton(text="🚫 আর নম্বর নেই", callback_data="none"))
-            elif len(all_numbers) == 0: builder.row(InlineKeyboardButton(text="🚫 কোনো নম্বর নেই", callback_data="none"))
+            else: builder.row(InlineKeyboardButton(text="🚫 কোনো নম্বর নেই", callback_data="none"))
         builder.row(InlineKeyboardButton(text="🌍 Change Country", callback_data=NavCallback(action="change_country").pack()), InlineKeyboardButton(text="⚙️ Change Service", callback_data=NavCallback(action="change_service").pack()))
         builder.row(InlineKeyboardButton(text="🔙 Back to Main Menu", callback_data="cancel_fsm"))
-        if edit:
+        if edit and not bulk and message.document is None:
             try: await message.edit_text(text, reply_markup=builder.as_markup())
             except Exception as e: logging.warning(f"Could not edit message: {e}")
         else:
-            try: await message.delete() 
-            except Exception: pass 
-            await message.answer(text, reply_markup=builder.as_markup())
+            # আগে দেওয়া নম্বরসহ মেসেজ (রিফ্রেশ বা ফাইল) মোছা হয় না, শুধু তার বাটন সরানো হয়; বাল্কে সারাংশ ও বাটন ফাইলের ক্যাপশনে
+            try:
+                if edit or message.document: await message.edit_reply_markup(reply_markup=None)
+                else: await message.delete()
+            except Exception: pass
+            if bulk: await message.answer_document(build_numbers_document(numbers_to_show, service, country), caption=text, reply_markup=builder.as_markup())
+            else: await message.answer(text, reply_markup=builder.as_markup())
     except Exception as e: logging.error(f"Error in show_numbers_page: {e}"); await message.answer(f"একটি ত্রুটি ঘটেছে: {e}")
-@dp.callback_query(NavCallback.filter(F.action == "refresh"), UserStates.get_number_display)
+@dp.callback_query(NavCallback.filter(F.action == "refresh"), UserStates.get_number_display, flags={"throttle": "refresh"})
 async def handle_refresh_numbers(query: CallbackQuery, state: FSMContext):
     await show_numbers_page(query.message, state, edit=True); await query.answer()
-@dp.callback_query(NavCallback.filter(F.action == "change_country"), UserStates.get_number_display)
+@dp.callback_query(NavCallback.filter(F.action == "change_country"), UserStates.get_number_display, flags={"throttle": "menu"})
 async def handle_change_country(query: CallbackQuery, state: FSMContext):
     data = await state.get_data(); service_name = data.get("service_name")
     if not service_name: await state.clear(); await query.message.edit_text("ত্রুটি। /start দিন।"); return
-    await state.set_state(UserStates.get_number_select_country); await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশের নম্বর চান?", reply_markup=get_countries_keyboard(service_name, action_prefix="select_for_get")); await query.answer()
-@dp.callback_query(NavCallback.filter(F.action == "change_service"), UserStates.get_number_display)
+    await state.set_state(UserStates.get_number_select_country); await edit_or_send(query.message, f"সার্ভিস: {service_name}\n\nকোন দেশের নম্বর চান?", reply_markup=await get_countries_keyboard(service_name, action_prefix="select_for_get")); await query.answer()
+@dp.callback_query(NavCallback.filter(F.action == "change_service"), UserStates.get_number_display, flags={"throttle": "menu"})
 async def handle_change_service(query: CallbackQuery, state: FSMContext):
-    await state.set_state(UserStates.get_number_select_service); await query.message.edit_text("আপনি কোন সার্ভিসের জন্য নম্বর চান?", reply_markup=get_services_keyboard(action_prefix="select_for_get")); await query.answer()
+    await state.set_state(UserStates.get_number_select_service); await edit_or_send(query.message, "আপনি কোন সার্ভিসের জন্য নম্বর চান?", reply_markup=await get_services_keyboard(action_prefix="select_for_get")); await query.answer()
 
-# --- ৮. USER/ADMIN: Support ---
+# --- ৯. USER/ADMIN: Support ---
 @dp.message(F.text == "🆘 Support", StateFilter(None))
 async def handle_support(message: Message, state: FSMContext):
     support_keyboard = InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="👨‍💻 Admin-এর সাথে যোগাযোগ করুন", url=f"t.me/{ADMIN_USERNAME}")]])
     await message.answer("সাপোর্টের জন্য, অনুগ্রহ করে নিচের বাটনে ক্লিক করে অ্যাডমিনের সাথে যোগাযোগ করুন:", reply_markup=support_keyboard)
 
 # --- ব্যাক বাটন হ্যান্ডলার ---
-@dp.callback_query(NavCallback.filter(F.action == "back"))
+@dp.callback_query(NavCallback.filter(F.action == "back"), flags={"throttle": "menu"})
 async def handle_back_button(query: CallbackQuery, callback_data: NavCallback, state: FSMContext):
     current_state_str = await state.get_state()
-    if not current_state_str: await query.answer("কিছু করার নেই।", show_alert=True); return
+    if not current_state_str: await handle_expired_session(query); return
     data = await state.get_data(); service_name = data.get("service_name"); country_name = data.get("country_name") 
     if current_state_str in [AdminStates.add_number_input_text.state, AdminStates.add_number_input_file.state]:
         await state.set_state(AdminStates.add_number_method_choice); method_keyboard = InlineKeyboardBuilder(); method_keyboard.row(InlineKeyboardButton(text="✍️ Add via Text", callback_data="add_num:text")); method_keyboard.row(InlineKeyboardButton(text="📄 Add via Text File", callback_data="add_num:file")); method_keyboard.row(InlineKeyboardButton(text="🔙 Back to Countries", callback_data=NavCallback(action="back").pack()))
         await query.message.edit_text(f"<b>সার্ভিস: {service_name}</b>\n<b>দেশ: {country_name}</b>\n\nআপনি কিভাবে নম্বর যোগ করতে চান? (টেক্সট বা ফাইল)", reply_markup=method_keyboard.as_markup())
     elif current_state_str == AdminStates.add_number_method_choice.state:
-        await state.set_state(AdminStates.add_number_select_country); await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশে নম্বর যোগ করতে চান?", reply_markup=get_countries_keyboard(service_name, action_prefix="select_for_add_num"))
+        await state.set_state(AdminStates.add_number_select_country); await query.message.edit_text(f"সার্ভিস: {service_name}\n\nকোন দেশে নম্বর যোগ করতে চান?", reply_markup=await get_countries_keyboard(service_name, action_prefix="select_for_add_num"))
     elif current_state_str in [AdminStates.add_country_name.state, AdminStates.add_number_select_country.state, UserStates.get_number_select_country.state, AdminStates.remove_country_select.state]:
         if current_state_str == UserStates.get_number_select_country.state: new_state, action = UserStates.get_number_select_service, "select_for_get"
         elif current_state_str == AdminStates.add_country_name.state: new_state, action = AdminStates.add_country_select_service, "select_for_add_country"
         elif current_state_str == AdminStates.remove_country_select.state: new_state, action = AdminStates.remove_country_select_service, "select_for_remove_country"
         else: new_state, action = AdminStates.add_number_select_service, "select_for_add_num"
-        await state.set_state(new_state); await query.message.edit_text("কোন সার্ভিসে কাজ করতে চান?", reply_markup=get_services_keyboard(action_prefix=action))
+        await state.set_state(new_state); await query.message.edit_text("কোন সার্ভিসে কাজ করতে চান?", reply_markup=await get_services_keyboard(action_prefix=action))
     else: await state.clear(); await query.message.edit_text("অপারেশন বাতিল করা হয়েছে।")
     await query.answer()
 
+# --- পিকার: পেজ বদল এবং নামের প্রিফিক্স দিয়ে সার্চ ---
+MENU_TEXTS = {button.text for row in admin_buttons + user_buttons for button in row}
+@dp.callback_query(PageCallback.filter(), flags={"throttle": "menu"})
+async def handle_picker_page(query: CallbackQuery, callback_data: PageCallback, state: FSMContext):
+    data = await state.get_data(); state_name = await state.get_state()
+    markup = await picker_keyboard(state_name, data, callback_data.page, picker_query(data, state_name) if callback_data.search else None)
+    if markup is None: await query.answer("কিছু করার নেই।", show_alert=True); return
+    try: await query.message.edit_reply_markup(reply_markup=markup)
+    except Exception as e: logging.warning(f"Could not change picker page: {e}")
+    await query.answer()
+@dp.callback_query(F.data == "picker_hint")
+async def handle_picker_hint(query: CallbackQuery):
+    await query.answer("🔍 নামের প্রথম কয়েকটি অক্ষর লিখে পাঠালে শুধু মিলে যাওয়া নামগুলো দেখানো হবে।", show_alert=True)
+def picker_query(data: Dict, state_name: Optional[str]) -> Optional[str]:
+    """শেষ সার্চের প্রিফিক্স, তবে শুধু যে পিকারে সার্চ হয়েছিল সেখানে; অন্য পিকারে গেলে আর খাটে না।"""
+    return data.get("picker_query") if data.get("picker_state") == state_name else None
+# মেনু বাটন বা কমান্ড (/...) সার্চ নয়; বাকি যেকোনো টেক্সট বর্তমান পিকারের নামের প্রিফিক্স
+@dp.message(StateFilter(*PICKERS), F.text, ~F.text.in_(MENU_TEXTS), ~F.text.startswith("/"), flags={"throttle": "menu"})
+async def handle_picker_search(message: Message, state: FSMContext):
+    prefix = message.text.strip()[:64]; state_name = await state.get_state(); await state.update_data(picker_query=prefix, picker_state=state_name)
+    markup = await picker_keyboard(state_name, await state.get_data(), 0, prefix)
+    await message.answer(f"🔍 '{html.escape(prefix)}' দিয়ে শুরু হওয়া নাম:", reply_markup=markup)
+
 # --- জেনেরিক বাটন হ্যান্ডলার (none) ---
 @dp.callback_query(F.data == "none")
 async def handle_none_callback(query: CallbackQuery):
     await query.answer("এই বাটনে কোনো কাজ নেই।")
 
+# --- মেয়াদোত্তীর্ণ সেশন: স্টেট নেই অথচ পুরনো মেনুর বাটন চাপা হয়েছে (FSM_TTL পেরিয়ে গেছে বা রেকর্ড বাদ পড়েছে) ---
+@dp.callback_query(StateFilter(None))
+async def handle_expired_session(query: CallbackQuery):
+    await query.answer("⌛ সেশনের মেয়াদ শেষ হয়েছে।")
+    try: await query.message.edit_text("⌛ অনেকক্ষণ কোনো কাজ না হওয়ায় সেশনের মেয়াদ শেষ হয়েছে। প্রধান মেনু থেকে আবার শুরু করুন।")
+    except Exception as e: logging.warning(f"Could not edit expired menu: {e}")
+    await query.message.answer("প্রধান মেনু:", reply_markup=admin_keyboard if query.from_user.id == ADMIN_ID else user_keyboard)
+
+
+# --- স্ক্র্যাপের সময় O(1) মানগুলো মেট্রিক্সে কপি করা ---
+def collect_runtime_metrics():
+    if isinstance(dp.storage, CompactFSMStorage):
+        fsm = dp.storage.stats(); FSM_RECORDS.set(fsm["records"]); FSM_DROPPED.set(fsm["expired"], "expired"); FSM_DROPPED.set(fsm["evicted"], "evicted")
+    for result, value in keyboard_cache.stats().items():
+        if result != "size": KEYBOARD_CACHE.set(value, result)
+    for action, value in throttling.stats().items(): THROTTLED.set(value, action)
+    for result, value in rate_governor.stats().items(): OUTBOUND.set(value, result)
+    updates = scheduler.stats(); UPDATES_IN_PROGRESS.set(updates["running"], "running"); UPDATES_IN_PROGRESS.set(updates["waiting"], "waiting")
+metrics.add_collector(collect_runtime_metrics)
+
+async def count_fsm_records(storage: BaseStorage):
+    """redis ব্যাকএন্ডে FSM রেকর্ড গোনা। SCAN কী-সংখ্যার সমানুপাতিক, তাই স্ক্র্যাপে নয়, প্রতি FSM_COUNT_INTERVAL সেকেন্ডে একবার।"""
+    builder = storage.key_builder; pattern = f"{builder.prefix}{builder.separator}*{builder.separator}state"
+    while True:
+        try:
+            records = 0
+            async for _ in storage.redis.scan_iter(match=pattern, count=1000): records += 1
+            FSM_RECORDS.set(records)
+        except Exception as e: logging.warning(f"Could not count FSM records: {e}")
+        await asyncio.sleep(FSM_COUNT_INTERVAL)
+
+async def load_stock_metrics():
+    """স্টার্টআপে একবার (O(pools)) স্থায়ী ব্যাকএন্ডের স্টক গেজ ও ইনভেন্টরিতে তোলা; এরপর শুধু ইনক্রিমেন্টাল আপডেট।"""
+    for service in await db.list_services():
+        for country in await db.list_countries(service) or []:
+            stock = await db.count(service, country); NUMBERS_REMAINING.set(stock, service, country); await inventory.set_stock(service, country, stock)
 
-# --- ⚠️ নতুন: Flask সার্ভারকে থ্রেডে চালু করা ---
-app = Flask(__name__)
+async def watch_low_stock():
+    """প্রতি LOW_STOCK_DEBOUNCE সেকেন্ডে জমে থাকা সতর্কতা নেয়; এর মধ্যে যত পুল কমে যায় সব মিলিয়ে অ্যাডমিনকে একটি মেসেজ।
 
-@app.route('/')
-def index():
+    redis ব্যাকএন্ডে সব ওয়ার্কারের সতর্কতা একই Redis সেটে জমে, তাই শুধু প্রথম ওয়ার্কারের ওয়াচারই যথেষ্ট।
+    """
+    while True:
+        await asyncio.sleep(LOW_STOCK_DEBOUNCE)
+        alerts = await inventory.take_alerts()
+        if not alerts: continue
+        text = f"⚠️ <b>কম স্টক</b> ({LOW_STOCK_THRESHOLD} এর নিচে):\n" + "\n".join(f"{format_pool_line(row)} ({html.escape(row.service)})" for row in alerts)
+        try: await bot.send_message(ADMIN_ID, text[:4096])
+        except Exception as e: logging.warning(f"Could not send low-stock alert: {e}")
+
+# --- স্টার্টআপ / শাটডাউন ---
+@dp.startup()
+async def on_startup():
+    await load_stock_metrics()
+    task = asyncio.create_task(watch_event_loop_lag(EVENT_LOOP_LAG)); background_tasks.add(task); task.add_done_callback(background_tasks.discard)
+    if not isinstance(dp.storage, CompactFSMStorage):
+        task = asyncio.create_task(count_fsm_records(dp.storage)); background_tasks.add(task); task.add_done_callback(background_tasks.discard)
+    # একাধিক ওয়ার্কারে শুধু প্রথমটি সতর্কতা পাঠায়, যাতে অ্যাডমিন একই পুলের জন্য একাধিক মেসেজ না পান
+    if LOW_STOCK_THRESHOLD > 0 and WORKER_INDEX == 0:
+        task = asyncio.create_task(watch_low_stock()); background_tasks.add(task); task.add_done_callback(background_tasks.discard)
+    if RUN_MODE == "webhook":
+        if WORKER_INDEX != 0: return  # webhook শুধু প্রথম ওয়ার্কার সেট করে
+        await bot.set_webhook(f"{WEBHOOK_URL}{WEBHOOK_PATH}", secret_token=WEBHOOK_SECRET, allowed_updates=dp.resolve_used_update_types(), drop_pending_updates=DROP_PENDING_UPDATES)
+        logging.info(f"Webhook সেট করা হয়েছে: {WEBHOOK_URL}{WEBHOOK_PATH}")
+    else:
+        await bot.delete_webhook(drop_pending_updates=DROP_PENDING_UPDATES)
+    await track_startup_backlog()
+async def track_startup_backlog():
+    """রিস্টার্টের সময় টেলিগ্রামে জমে থাকা আপডেটগুলো ফেলে না দিয়ে প্রসেস করা হয়; কতগুলো ছিল ও শেষ হতে কত সময় লাগল তা জানায়।"""
+    try: pending = (await bot.get_webhook_info()).pending_update_count
+    except Exception as e: logging.warning(f"Could not read pending update count: {e}"); return
+    STARTUP_BACKLOG.set(pending); logging.info(f"Startup backlog: {pending} pending updates")
+    # একাধিক ওয়ার্কারে প্রতিটি প্রসেস ব্যাকলগের একটি অংশ পায়, তাই ড্রেইন সময় শুধু একক প্রসেসে মাপা হয়
+    if WORKERS == 1: scheduler.expect_backlog(pending)
+@dp.shutdown()
+async def on_shutdown():
+    for task in list(background_tasks): task.cancel()
+    await db.close(); await dp.storage.close()
+
+# --- একটি aiohttp সার্ভার: হেলথ চেক + (webhook মোডে) টেলিগ্রাম আপডেট ---
+async def index(request: web.Request) -> web.Response:
     """Render-এর হেলথ চেকের জন্য একটি সিম্পল রুট।"""
-    return "Bot is alive!"
+    return web.Response(text="Bot is alive!")
+
+async def metrics_view(request: web.Request) -> web.Response:
+    """Prometheus স্ক্র্যাপের জন্য; একাধিক ওয়ার্কারে প্রতিটি প্রসেস নিজের মান দেখায়।"""
+    return web.Response(body=metrics.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+def build_web_app(webhook: bool) -> web.Application:
+    """হেলথ রুটসহ aiohttp অ্যাপ; webhook=True হলে আপডেট রিসিভ করার রুটও যোগ হয়।"""
+    app = web.Application(); app.router.add_get("/", index); app.router.add_get("/metrics", metrics_view)
+    if webhook:
+        # secret_token না মিললে হ্যান্ডলার 401 দেয়; handle_in_background=True হলে প্রতিটি আপডেট আলাদা টাস্কে চলে
+        SimpleRequestHandler(dispatcher=dp, bot=bot, secret_token=WEBHOOK_SECRET, handle_in_background=True).register(app, path=WEBHOOK_PATH)
+        setup_application(app, dp, bot=bot)
+    return app
 
-def run_flask():
-    """Flask সার্ভারকে একটি আলাদা থ্রেডে চালানোর জন্য।"""
-    # Gunicorn-এর বদলে Flask-এর নিজস্ব সার্ভার ব্যবহার করা হচ্ছে
-    # এটি Render-এর দেওয়া $PORT-এ চলবে
-    app.run(host='0.0.0.0', port=RENDER_PORT)
+async def start_web_app(app: web.Application) -> web.AppRunner:
+    """অ্যাপটিকে Render-এর দেওয়া $PORT-এ চালু করে।"""
+    runner = web.AppRunner(app); await runner.setup()
+    # reuse_port: একাধিক ওয়ার্কার প্রসেস একই পোর্টে শোনে, কার্নেল কানেকশন ভাগ করে দেয়
+    await web.TCPSite(runner, host="0.0.0.0", port=RENDER_PORT, reuse_port=WORKERS > 1).start()
+    return runner
+
+async def main_webhook():
+    """webhook মোড: একটি aiohttp সার্ভারই আপডেট নেয় এবং হেলথ রুট সার্ভ করে।"""
+    logging.info("বট webhook মোডে শুরু হচ্ছে...")
+    runner = await start_web_app(build_web_app(webhook=True))
+    # SIGTERM (ডিপ্লয়/run_workers) বা SIGINT এলে লুপ থেকে বেরিয়ে runner.cleanup() চলে, যা on_shutdown (db.close ইত্যাদি) কল করে
+    stop = asyncio.Event(); loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT): loop.add_signal_handler(sig, stop.set)
+    try: await stop.wait(); logging.info("সিগন্যাল পাওয়া গেছে, webhook সার্ভার বন্ধ হচ্ছে...")
+    finally: await runner.cleanup()
 
-# --- ⚠️ নতুন: বটকে Main Thread-এ চালু করা ---
 async def main_polling():
-    """বটের পোলিং শুরু করার প্রধান async ফাংশন।"""
+    """polling মোড (লোকাল ডেভেলপমেন্ট): হেলথ রুট একই ইভেন্ট লুপে চলে, আলাদা থ্রেড লাগে না।"""
     logging.info("বট পোলিং শুরু হচ্ছে...")
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, drop_pending_updates=True)
+    runner = await start_web_app(build_web_app(webhook=False))
+    try: await dp.start_polling(bot, tasks_concurrency_limit=UPDATE_QUEUE_LIMIT)
+    finally: await runner.cleanup()
 
-if __name__ == "__main__":
-    # Flask সার্ভারকে একটি আলাদা থ্রেডে চালু করা
-    flask_thread = threading.Thread(target=run_flask)
-    flask_thread.daemon = True
-    flask_thread.start()
-    
-    # টেলিগ্রাম বটকে প্রধান থ্রেডে (Main Thread) চালু করা
-    # এটি 'set_wakeup_fd' error-এর সমাধান করবে
+def run(worker_index: int = 0):
+    """একটি প্রসেসে বট চালায়।"""
+    global WORKER_INDEX
+    WORKER_INDEX = worker_index
     try:
-        logging.info("Flask সার্ভার একটি আলাদা থ্রেডে চালু হয়েছে...")
-        asyncio.run(main_polling())
+        asyncio.run(main_webhook() if RUN_MODE == "webhook" else main_polling())
     except (KeyboardInterrupt, SystemExit):
         logging.info("বট বন্ধ করা হলো।")
     except Exception as e:
         logging.critical(f"বট ক্র্যাশ করেছে: {e}", exc_info=True)
 
+def run_workers(count: int):
+    """count টি ওয়ার্কার প্রসেস fork করে; সবাই একই WEBHOOK_SECRET, Redis পুল ও FSM স্টোরেজ শেয়ার করে।"""
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=run, args=(index,), name=f"worker-{index}") for index in range(count)]
+    for worker in workers: worker.start()
+    logging.info(f"{count} টি ওয়ার্কার প্রসেস চালু হয়েছে।")
+    # ডিপ্লয়ের সময় প্ল্যাটফর্ম (যেমন Render) শুধু প্যারেন্টকে SIGTERM দেয়; তা ওয়ার্কারদের কাছে পাঠানো হয় যাতে
+    # তারা on_shutdown চালিয়ে থামে, প্যারেন্ট ছাড়া চলতে না থাকে। হ্যান্ডলার fork-এর পরে বসানো, তাই ওয়ার্কারে এটা নেই।
+    stopping: List[float] = []
+    def stop(signum, frame):
+        if not stopping: stopping.append(time.monotonic()); logging.info(f"সিগন্যাল {signal.Signals(signum).name}: ওয়ার্কারদের থামানো হচ্ছে...")
+        for worker in workers:
+            if worker.is_alive(): worker.terminate()
+    signal.signal(signal.SIGTERM, stop); signal.signal(signal.SIGINT, stop)
+    while any(worker.is_alive() for worker in workers):
+        for worker in workers: worker.join(timeout=0.5)
+        if stopping and time.monotonic() - stopping[0] > WORKER_STOP_TIMEOUT:
+            for worker in workers:
+                if worker.is_alive(): logging.warning(f"{worker.name} সময়মতো থামেনি, kill করা হচ্ছে।"); worker.kill()
+
+if __name__ == "__main__":
+    if WORKERS > 1: run_workers(WORKERS)
+    else: run()
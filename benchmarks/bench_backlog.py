@@ -0,0 +1,80 @@
+"""স্টার্টআপ ব্যাকলগ বেঞ্চমার্ক: রিস্টার্টের সময় জমে থাকা আপডেটগুলো কত দ্রুত ও কোন ক্রমে শেষ হয়।
+
+--users জন ইউজারের পুরো ফ্লো (/start -> Get Number -> সার্ভিস -> দেশ -> Refresh) ইউজারদের মধ্যে
+পালাক্রমে সাজিয়ে একটি ব্যাকলগ বানানো হয়, যেমন টেলিগ্রাম update_id ক্রমে দেয়। তারপর পোলিংয়ের মতো
+সবগুলো একসাথে টাস্ক হিসেবে dp.feed_update-এ যায়; UpdateScheduler-এর concurrency 1 বনাম অনেক
+দিয়ে ড্রেইন সময় তুলনা করা হয়। প্রতিটি চ্যাটে হ্যান্ডলার update_id-এর ক্রমেই চলেছে কিনা, আর শেষে সব ইউজার
+নম্বরের স্ক্রিনে (get_number_display) পৌঁছেছে কিনা — অর্থাৎ কোনো আপডেট পুরনো স্টেট দেখে ভুল হ্যান্ডলারে যায়নি — যাচাই হয়।
+
+চালানো: python benchmarks/bench_backlog.py --users 500 --api-latency 0.02
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from aiogram.fsm.storage.base import StorageKey
+from loadtest import Recorder, StubSession, admin_flow, callback_update, country_button, message_update, service_button
+
+import Nbot
+
+
+class OrderCheck:
+    """হ্যান্ডলারের ঠিক আগে (চ্যাট লক নেওয়ার পরে, ইনার মিডলওয়্যার) প্রতিটি চ্যাটের update_id ক্রম লিখে রাখে।"""
+
+    def __init__(self):
+        self.seen = defaultdict(list)
+
+    async def __call__(self, handler, event, data):
+        chat = data.get("event_chat")
+        if chat is not None: self.seen[chat.id].append(data["event_update"].update_id)
+        return await handler(event, data)
+
+    def violations(self) -> int:
+        return sum(ids != sorted(ids) for ids in self.seen.values())
+
+
+async def build_backlog(users: int, refreshes: int) -> list:
+    flows = []
+    for uid in range(10_000, 10_000 + users):
+        flow = [message_update(uid, "/start"), message_update(uid, "🔢 Get Number"), callback_update(uid, await service_button("select_for_get")), callback_update(uid, await country_button("select_for_get"))]
+        flows.append(flow + [callback_update(uid, Nbot.NavCallback(action="refresh").pack()) for _ in range(refreshes)])
+    return [flow[step] for step in range(len(flows[0])) for flow in flows]
+
+
+async def drain(concurrency: int, options, check: OrderCheck) -> float:
+    backlog = await build_backlog(options.users, options.refreshes)
+    scheduler = Nbot.scheduler; scheduler.semaphore = asyncio.Semaphore(concurrency); check.seen.clear()
+    finished = asyncio.get_running_loop().create_future()
+    scheduler.on_drained = lambda count, seconds: finished.done() or finished.set_result(seconds)
+    scheduler.expect_backlog(len(backlog))
+    tasks = [asyncio.create_task(Nbot.dp.feed_update(Nbot.bot, update)) for update in backlog]
+    seconds = await finished; await asyncio.gather(*tasks)
+    wrong = 0
+    for uid in range(10_000, 10_000 + options.users):
+        key = StorageKey(bot_id=Nbot.bot.id, chat_id=uid, user_id=uid)
+        wrong += await Nbot.dp.storage.get_state(key) != Nbot.UserStates.get_number_display.state
+    print(f"{concurrency:>12} {len(backlog):>10,} {seconds:>10.2f} {len(backlog) / seconds:>12,.0f} {check.violations():>12} {wrong:>12}")
+    return seconds
+
+
+async def main(options) -> None:
+    session = StubSession(); Nbot.bot.session = session
+    await admin_flow(Recorder(), session, text_lines=options.users * options.refreshes * 2, file_lines=0)
+    session.api_latency = options.api_latency
+    check = OrderCheck(); Nbot.dp.message.middleware(check); Nbot.dp.callback_query.middleware(check)
+    print(f"{'concurrency':>12} {'updates':>10} {'seconds':>10} {'updates/s':>12} {'out of order':>12} {'wrong state':>12}")
+    for concurrency in (1, options.concurrency): await drain(concurrency, options, check)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=500, help="ব্যাকলগে কতজন ইউজারের ফ্লো")
+    parser.add_argument("--refreshes", type=int, default=2, help="প্রতি ইউজার কতবার Refresh চাপবে")
+    parser.add_argument("--concurrency", type=int, default=Nbot.UPDATE_CONCURRENCY, help="তুলনার জন্য শিডিউলারের সীমা")
+    parser.add_argument("--api-latency", type=float, default=0.02, help="প্রতি API কলে নকল নেটওয়ার্ক দেরি (সেকেন্ড)")
+    logging.disable(logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
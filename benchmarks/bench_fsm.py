@@ -0,0 +1,50 @@
+"""FSM স্টোরেজের মেমরি বেঞ্চমার্ক: N জন ইউজার "Get Number" পর্যন্ত গেলে কত মেমরি লাগে।
+
+প্রতিটি ইউজারের জন্য বট যা করে তাই করা হয়: set_state(get_number_display) আর update_data(service_name,
+country_name), নামগুলো ক্যাটালগের মতো ১০ সার্ভিস × ৫০ দেশ থেকে। tracemalloc দিয়ে স্টোরেজে থাকা
+মোট বাইট মাপা হয় (aiogram-এর MemoryStorage বনাম CompactFSMStorage), সাথে প্রতি ইউজারে সময়।
+
+চালানো: python benchmarks/bench_fsm.py [ইউজার সংখ্যা, ডিফল্ট 1000000]
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from fsm_storage import CompactFSMStorage
+
+BOT_ID = 123456
+STATE = "UserStates:get_number_display"
+SERVICES = [f"Service {i}" for i in range(10)]
+COUNTRIES = [f"Country {i}" for i in range(50)]
+
+
+async def fill(storage, users: int) -> None:
+    for uid in range(1, users + 1):
+        key = StorageKey(bot_id=BOT_ID, chat_id=uid, user_id=uid)
+        await storage.set_state(key, STATE)
+        await storage.update_data(key, {"service_name": SERVICES[uid % 10], "country_name": COUNTRIES[uid % 50]})
+
+
+async def measure(name: str, factory, users: int) -> None:
+    gc.collect(); tracemalloc.start(); storage = factory()
+    start = time.perf_counter(); await fill(storage, users); elapsed = time.perf_counter() - start
+    gc.collect(); size, _ = tracemalloc.get_traced_memory(); tracemalloc.stop()
+    print(f"{name:<20} {users:>10,} {size / 2**20:>10.1f} {size / users:>10.0f} {elapsed / users * 1e6:>10.2f}")
+    del storage; gc.collect()
+
+
+async def main(users: int) -> None:
+    print(f"{'storage':<20} {'users':>10} {'MiB':>10} {'B/user':>10} {'µs/user':>10}")
+    await measure("aiogram MemoryStorage", MemoryStorage, users)
+    await measure("CompactFSMStorage", lambda: CompactFSMStorage(ttl=3600, max_records=users), users)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000))
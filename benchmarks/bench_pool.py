@@ -0,0 +1,36 @@
+"""মেমরি ব্যাকএন্ডের পুল মাইক্রো-বেঞ্চমার্ক: পুল বড় হলেও ইমপোর্ট ও অ্যালোকেশনের সময় স্থির থাকে কিনা দেখায়।
+
+ইমপোর্ট MemoryStorage-এর মতো: গ্লোবাল NumberIndex.admit() দিয়ে ডুপ্লিকেট বাদ, তারপর NumberPool.extend()।
+
+চালানো: python benchmarks/bench_pool.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from number_index import NumberIndex
+from number_pool import NumberPool
+
+BATCH = 20_000   # প্রতি রাউন্ডে কতগুলো নতুন নম্বর ইমপোর্ট হবে
+TAKE = 7         # প্রতি "Get Number"-এ কতগুলো নম্বর দেওয়া হবে
+ROUNDS = 500     # প্রতি সাইজে কতবার অ্যালোকেশন মাপা হবে
+
+
+def main() -> None:
+    print(f"{'pool size':>12} {'import µs/line':>16} {'alloc µs/call':>15}")
+    for size in (10_000, 100_000, 500_000, 1_000_000):
+        index = NumberIndex(); pool = NumberPool(num for num in (f"+1{i:010d}" for i in range(size)) if index.admit(num) == "added")
+        fresh = [f"+2{i:010d}" for i in range(BATCH)]
+        dupes = fresh[: BATCH // 2]
+        start = time.perf_counter()
+        for batch in (fresh, dupes): pool.extend([num for num in batch if index.admit(num) == "added"])
+        import_us = (time.perf_counter() - start) / (BATCH + len(dupes)) * 1e6
+        start = time.perf_counter()
+        for _ in range(ROUNDS): index.mark_issued(pool.pop(TAKE))
+        alloc_us = (time.perf_counter() - start) / ROUNDS * 1e6
+        print(f"{size:>12,} {import_us:>16.3f} {alloc_us:>15.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""স্টোরেজ ব্যাকএন্ড বেঞ্চমার্ক: বাল্ক ইমপোর্ট ও অ্যালোকেশন।
+
+চালানো: python benchmarks/bench_storage.py [memory|sqlite] [নম্বরের সংখ্যা]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import create_storage
+
+BATCH = 50_000   # একবারে কতগুলো লাইন ইমপোর্ট হবে (ফাইল ইমপোর্টের একটি চাঙ্কের মতো)
+TAKE = 7
+ROUNDS = 1_000
+
+
+async def run(backend: str, total: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = create_storage(backend, os.path.join(tmp, "bench.db"))
+        await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD")
+        start = time.perf_counter(); added = 0
+        for offset in range(0, total, BATCH):
+            added += (await db.add_numbers("WhatsApp", "BD", [f"+880{i:09d}" for i in range(offset, min(offset + BATCH, total))])).added
+        import_s = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(ROUNDS): await db.allocate("WhatsApp", "BD", TAKE)
+        alloc_us = (time.perf_counter() - start) / ROUNDS * 1e6
+        print(f"{backend}: imported {added:,} numbers in {import_s:.2f}s, allocate({TAKE}) {alloc_us:.1f} µs/call, {await db.count('WhatsApp', 'BD'):,} left")
+        await db.close()
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else "sqlite"
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    asyncio.run(run(backend, total))
@@ -0,0 +1,103 @@
+"""মাল্টি-ওয়ার্কার বেঞ্চমার্ক: কয়েকটি প্রসেস একই Redis পুল থেকে নম্বর নেয়।
+
+local_redis স্টান্ড-ইন আলাদা প্রসেসে চালু হয় (REDIS_URL দিলে আসল Redis ব্যবহার হয়)। প্রতিটি ওয়ার্কার
+RedisStorage.allocate() দিয়ে পুল খালি না হওয়া পর্যন্ত নম্বর নেয়; প্রতি অনুরোধে হ্যান্ডলারের কাজের
+(আপডেট পার্স, মেসেজ বানানো) বদলে HANDLER_CPU সেকেন্ড CPU খরচ করে আর টেলিগ্রাম API কলের জায়গায়
+HANDLER_LATENCY সেকেন্ড অপেক্ষা করে। মোট একসাথে চলা অনুরোধ সব রাউন্ডে IN_FLIGHT, ওয়ার্কারদের মধ্যে ভাগ
+করা, তাই থ্রুপুটের পার্থক্য শুধু ওয়ার্কার সংখ্যার ফল: একটি প্রসেস এক কোরেই আটকে থাকে, তাই থ্রুপুট
+বাড়ে কেবল ফাঁকা CPU কোর থাকলে (os.cpu_count() পর্যন্ত), এক-কোরের মেশিনে বাড়ে না। "প্রতিটি নম্বর ঠিক
+একবার" যাচাই এখানেও হয়, তবে নিয়মিত চলে tests/test_workers.py-তে (pytest)।
+
+চালানো: python benchmarks/bench_workers.py   (redis প্যাকেজ requirements.txt-এ আছে)
+"""
+import asyncio
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from redis.asyncio import Redis
+
+from storage import RedisStorage
+
+TOTAL = 20_000
+TAKE = 7
+HANDLER_CPU = 0.002
+HANDLER_LATENCY = 0.005
+IN_FLIGHT = 32  # সব ওয়ার্কার মিলিয়ে
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0)); return sock.getsockname()[1]
+
+
+async def seed(url: str, prefix: str) -> None:
+    db = RedisStorage(Redis.from_url(url, decode_responses=True), prefix)
+    await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD")
+    for offset in range(0, TOTAL, 5_000):
+        await db.add_numbers("WhatsApp", "BD", [f"+880{i:09d}" for i in range(offset, min(offset + 5_000, TOTAL))])
+    await db.close()
+
+
+def busy(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end: pass
+
+
+async def drain(url: str, prefix: str, in_flight: int) -> list:
+    db = RedisStorage(Redis.from_url(url, decode_responses=True), prefix); issued = []
+
+    async def handler():
+        while True:
+            numbers, _ = await db.allocate("WhatsApp", "BD", TAKE)
+            if not numbers: return
+            issued.extend(numbers); busy(HANDLER_CPU); await asyncio.sleep(HANDLER_LATENCY)
+
+    await asyncio.gather(*(handler() for _ in range(in_flight)))
+    await db.close()
+    return issued
+
+
+def worker(url: str, prefix: str, in_flight: int, start, results) -> None:
+    start.wait(); results.put(asyncio.run(drain(url, prefix, in_flight)))
+
+
+def run_round(url: str, workers: int) -> None:
+    prefix = f"bench{workers}"; asyncio.run(seed(url, prefix))
+    context = multiprocessing.get_context("spawn"); start = context.Event(); results = context.Queue()
+    procs = [context.Process(target=worker, args=(url, prefix, IN_FLIGHT // workers, start, results)) for _ in range(workers)]
+    for proc in procs: proc.start()
+    began = time.perf_counter(); start.set()
+    issued = [num for _ in procs for num in results.get()]
+    elapsed = time.perf_counter() - began
+    for proc in procs: proc.join()
+    unique = len(set(issued))
+    status = "OK" if unique == len(issued) == TOTAL else "FAIL"
+    print(f"{workers:>8} {len(issued):>8,} {unique:>8,} {TOTAL / elapsed:>12,.0f} {status:>6}")
+    if status != "OK": raise SystemExit(1)
+
+
+def main() -> None:
+    url = os.environ.get("REDIS_URL"); server = None
+    if not url:
+        port = free_port(); url = f"redis://127.0.0.1:{port}/0?protocol=2"
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "local_redis.py"), "--port", str(port)], stderr=subprocess.DEVNULL)
+        for _ in range(100):
+            try: socket.create_connection(("127.0.0.1", port), timeout=0.1).close(); break
+            except OSError: time.sleep(0.05)
+    try:
+        print(f"{os.cpu_count()} CPU cores, {IN_FLIGHT} requests in flight across all workers")
+        print(f"{'workers':>8} {'issued':>8} {'unique':>8} {'numbers/s':>12} {'check':>6}")
+        for workers in WORKER_COUNTS: run_round(url, workers)
+    finally:
+        if server: server.terminate()
+
+
+if __name__ == "__main__":
+    main()
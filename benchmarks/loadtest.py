@@ -0,0 +1,204 @@
+"""অফলাইন লোড টেস্ট: সিন্থেটিক Update দিয়ে dp.feed_update চালায়, নেটওয়ার্ক লাগে না।
+
+বটের সেশনের জায়গায় StubSession বসে, যা প্রতিটি API কলের একটি নকল উত্তর দেয় (--api-latency দিলে
+ততটুকু অপেক্ষা করে)। বটের আউটবাউন্ড RateGovernor StubSession-এও বসানো হয়, তাই প্রতিটি কলের বাকেট
+হিসাবও মাপা হয়; তবে এর হার ডিফল্টে প্রায় সীমাহীন, নইলে ৩০ মেসেজ/সেকেন্ডে রানটাই মিনিট ধরে চলত।
+আসল টেলিগ্রাম-গতি দেখতে TELEGRAM_GLOBAL_RATE=30 TELEGRAM_CHAT_RATE=1 দিয়ে চালান। যে ফ্লোগুলো চলে:
+  - admin: সার্ভিস/দেশ তৈরি, টেক্সট ইমপোর্ট ও .txt ফাইল ইমপোর্ট (process_numbers / স্ট্রিমিং পাথ)
+  - user:  /start -> Get Number -> সার্ভিস -> দেশ (show_numbers_page) -> কয়েকবার Refresh
+কোনো ফ্লো বটের ত্রুটি-উত্তর (ERROR_REPLIES) পেলে রান ব্যর্থ হয় এবং ফলাফল লেখা হয় না, যাতে ত্রুটির পথ
+বেঞ্চমার্ক হিসেবে জমা না হয়। --users টি ইউজার একসাথে চলে। প্রতি ফ্লো ধাপে p50/p95/p99 লেটেন্সি, updates/s ও পিক RSS দেখায়
+এবং ফলাফল JSON লাইন হিসেবে --output ফাইলে যোগ করে; আগের রানের সাথে তুলনাও দেখায়।
+
+চালানো: python benchmarks/loadtest.py --users 2000 --refreshes 3
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Nbot ইমপোর্টের আগে: নকল টোকেন, আর ইনবাউন্ড থ্রটলিং ও আউটবাউন্ড গতিসীমা কার্যত বন্ধ যাতে সিন্থেটিক ইউজাররা বাদ না পড়ে বা অপেক্ষায় না থাকে
+os.environ.setdefault("BOT_TOKEN", "123456:LOADTEST")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.setdefault("ADMIN_USERNAME", "loadtest")
+os.environ.setdefault("THROTTLE_RATE", "1000000")
+os.environ.setdefault("THROTTLE_BURST", "1000000")
+os.environ.setdefault("TELEGRAM_GLOBAL_RATE", "1000000")
+os.environ.setdefault("TELEGRAM_CHAT_RATE", "1000000")
+
+from aiogram import methods
+from aiogram.client.session.base import BaseSession
+from aiogram.types import CallbackQuery, Chat, Document, File, Message, Update, User
+
+import Nbot
+
+ADMIN_ID = int(os.environ["ADMIN_ID"])
+SERVICE, COUNTRY = "WhatsApp", "Bangladesh"
+_ids = itertools.count(1)
+# হ্যান্ডলারগুলো ব্যর্থ হলে যে উত্তর পাঠায় তার শুরু
+ERROR_REPLIES = ("ফাইল প্রসেস করতে সমস্যা হয়েছে", "⚠️ ফাইল ইমপোর্ট মাঝপথে থেমে গেছে", "কিছু একটা ভুল হয়েছে")
+
+
+class StubSession(BaseSession):
+    """টেলিগ্রামে না গিয়ে প্রতিটি মেথডের ন্যূনতম বৈধ উত্তর দেয়।"""
+
+    def __init__(self, api_latency: float = 0.0):
+        super().__init__()
+        self.api_latency = api_latency; self.files: Dict[str, bytes] = {}; self.calls: Dict[str, int] = defaultdict(int)
+        self.errors: List[str] = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if self.api_latency: await asyncio.sleep(self.api_latency)
+        text = getattr(method, "text", None)
+        if text and text.startswith(ERROR_REPLIES): self.errors.append(text)
+        if isinstance(method, (methods.SendMessage, methods.SendDocument)):
+            # bot-এ মাউন্ট করা, যাতে হ্যান্ডলার পাঠানো মেসেজেই পরে edit_text() ইত্যাদি ডাকতে পারে
+            return Message(message_id=next(_ids), date=datetime.datetime.now(), chat=Chat(id=method.chat_id, type="private"), text=text).as_(bot)
+        if isinstance(method, methods.GetFile):
+            return File(file_id=method.file_id, file_unique_id=method.file_id, file_path=method.file_id)
+        return True
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30, chunk_size: int = 65536, raise_for_status: bool = True):
+        data = self.files[url.rsplit("/", 1)[-1]]
+        for offset in range(0, len(data), chunk_size): yield data[offset:offset + chunk_size]
+
+    async def close(self) -> None:
+        pass
+
+
+def _user(uid: int) -> User:
+    return User(id=uid, is_bot=False, first_name=f"user{uid}")
+
+
+def message_update(uid: int, text: str = None, document: Document = None) -> Update:
+    return Update(update_id=next(_ids), message=Message(message_id=next(_ids), date=datetime.datetime.now(), chat=Chat(id=uid, type="private"), from_user=_user(uid), text=text, document=document))
+
+
+def callback_update(uid: int, data: str) -> Update:
+    message = Message(message_id=next(_ids), date=datetime.datetime.now(), chat=Chat(id=uid, type="private"), text="…")
+    return Update(update_id=next(_ids), callback_query=CallbackQuery(id=str(next(_ids)), from_user=_user(uid), chat_instance="loadtest", message=message, data=data))
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list); self.updates = 0
+
+    async def feed(self, flow: str, update: Update) -> None:
+        start = time.perf_counter(); await Nbot.dp.feed_update(Nbot.bot, update)
+        self.latencies[flow].append(time.perf_counter() - start); self.updates += 1
+
+
+async def service_button(action: str) -> str:
+    """SERVICE-এর বাটনের কলব্যাক ডেটা (বর্তমান ক্যাটালগের আইডি দিয়ে), যেন ইউজার কীবোর্ডে ট্যাপ করেছে।"""
+    current = await Nbot.get_catalog()
+    return Nbot.ServiceCallback(action=action, version=current.version, service_id=current.service_id(SERVICE)).pack()
+
+
+async def country_button(action: str) -> str:
+    current = await Nbot.get_catalog(); sid = current.service_id(SERVICE)
+    return Nbot.CountryCallback(action=action, version=current.version, service_id=sid, country_id=current.countries[sid].index(COUNTRY)).pack()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values); return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def admin_flow(rec: Recorder, session: StubSession, text_lines: int, file_lines: int) -> None:
+    await rec.feed("start", message_update(ADMIN_ID, "/start"))
+    await rec.feed("admin_menu", message_update(ADMIN_ID, "⚙️ Add Service")); await rec.feed("admin_menu", message_update(ADMIN_ID, SERVICE))
+    await rec.feed("admin_menu", message_update(ADMIN_ID, "🌍 Add country"))
+    await rec.feed("admin_menu", callback_update(ADMIN_ID, await service_button("select_for_add_country")))
+    await rec.feed("admin_menu", message_update(ADMIN_ID, COUNTRY))
+
+    async def open_import(method: str) -> None:
+        await rec.feed("admin_menu", message_update(ADMIN_ID, "➕ Add Number"))
+        await rec.feed("admin_menu", callback_update(ADMIN_ID, await service_button("select_for_add_num")))
+        await rec.feed("admin_menu", callback_update(ADMIN_ID, await country_button("select_for_add_num")))
+        await rec.feed("admin_menu", callback_update(ADMIN_ID, f"add_num:{method}"))
+
+    await open_import("text")
+    await rec.feed("import_text", message_update(ADMIN_ID, "\n".join(f"+8801{i:09d}" for i in range(text_lines))))
+    await open_import("file")
+    session.files["numbers.txt"] = "\n".join(f"+8802{i:09d}" for i in range(file_lines)).encode()
+    document = Document(file_id="numbers.txt", file_unique_id="numbers.txt", file_name="numbers.txt", mime_type="text/plain")
+    await rec.feed("import_file", message_update(ADMIN_ID, document=document))
+
+
+async def user_flow(rec: Recorder, uid: int, refreshes: int) -> None:
+    await rec.feed("start", message_update(uid, "/start"))
+    await rec.feed("get_number", message_update(uid, "🔢 Get Number"))
+    await rec.feed("select_service", callback_update(uid, await service_button("select_for_get")))
+    await rec.feed("select_country", callback_update(uid, await country_button("select_for_get")))
+    for _ in range(refreshes): await rec.feed("refresh", callback_update(uid, Nbot.NavCallback(action="refresh").pack()))
+
+
+def git_commit() -> str:
+    try: return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError): return "unknown"
+
+
+async def run(options) -> Dict:
+    # সেশন বদলালে আগের সেশনের মিডলওয়্যার হারায়, তাই গভর্নর নতুন সেশনে আবার বসাতে হয়
+    session = StubSession(options.api_latency); session.middleware(Nbot.rate_governor); Nbot.bot.session = session; rec = Recorder()
+    began = time.perf_counter()
+    await admin_flow(rec, session, options.text_lines, options.file_lines)
+    await asyncio.gather(*(user_flow(rec, 10_000 + uid, options.refreshes) for uid in range(options.users)))
+    elapsed = time.perf_counter() - began
+    flows = {flow: {"count": len(values), "p50_ms": percentile(values, 50) * 1e3, "p95_ms": percentile(values, 95) * 1e3, "p99_ms": percentile(values, 99) * 1e3} for flow, values in rec.latencies.items()}
+    return {
+        "commit": git_commit(), "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "config": {"users": options.users, "refreshes": options.refreshes, "text_lines": options.text_lines, "file_lines": options.file_lines, "api_latency": options.api_latency, "storage": Nbot.STORAGE_BACKEND},
+        "updates": rec.updates, "seconds": elapsed, "updates_per_sec": rec.updates / elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, "flows": flows, "api_calls": dict(session.calls),
+        "outbound": Nbot.rate_governor.stats(), "errors": session.errors,
+    }
+
+
+def previous_result(path: str, config: Dict):
+    if not os.path.exists(path): return None
+    with open(path) as fh: matches = [entry for entry in map(json.loads, filter(str.strip, fh)) if entry.get("config") == config]
+    return matches[-1] if matches else None
+
+
+def report(result: Dict, previous) -> None:
+    print(f"commit {result['commit']}: {result['updates']:,} updates in {result['seconds']:.2f}s = {result['updates_per_sec']:,.0f} updates/s, peak RSS {result['peak_rss_mb']:.1f} MB")
+    print(f"{'flow':<16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for flow, stats in result["flows"].items():
+        delta = ""
+        if previous and flow in previous["flows"]: delta = f"  (p95 {stats['p95_ms'] - previous['flows'][flow]['p95_ms']:+.2f} ms vs {previous['commit']})"
+        print(f"{flow:<16} {stats['count']:>7,} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}{delta}")
+    if previous: print(f"updates/s vs {previous['commit']}: {result['updates_per_sec'] - previous['updates_per_sec']:+,.0f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=2000, help="একসাথে কতজন সিন্থেটিক ইউজার")
+    parser.add_argument("--refreshes", type=int, default=3, help="প্রতি ইউজার কতবার Refresh চাপবে")
+    parser.add_argument("--text-lines", type=int, default=10_000, help="অ্যাডমিন টেক্সট ইমপোর্টে কত লাইন")
+    parser.add_argument("--file-lines", type=int, default=200_000, help="অ্যাডমিন ফাইল ইমপোর্টে কত লাইন")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="প্রতি API কলে নকল নেটওয়ার্ক দেরি (সেকেন্ড)")
+    parser.add_argument("--output", default=os.path.join(ROOT, "benchmarks", "results.jsonl"), help="ফলাফল যে JSONL ফাইলে যোগ হবে")
+    options = parser.parse_args()
+    logging.disable(logging.WARNING)
+    result = asyncio.run(run(options))
+    report(result, previous_result(options.output, result["config"]))
+    if result["errors"]:
+        for text in result["errors"][:5]: print(f"error reply: {text}", file=sys.stderr)
+        sys.exit(f"{len(result['errors'])} flow(s) ended in an error reply; result not written to {options.output}")
+    with open(options.output, "a") as fh: fh.write(json.dumps(result) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import time
+from typing import Sequence, Tuple
+
+
+class TokenBucket:
+    """rate টোকেন/সেকেন্ড হারে ভরে, সর্বোচ্চ capacity টি জমা থাকে।"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate; self.capacity = capacity; self.tokens = capacity; self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic(); self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate); self.updated = now
+
+    def try_acquire(self) -> bool:
+        """টোকেন থাকলে একটি খরচ করে True, না থাকলে False।"""
+        self._refill()
+        if self.tokens < 1: return False
+        self.tokens -= 1; return True
+
+    def reserve(self) -> float:
+        """একটি টোকেন আগাম বুক করে; কত সেকেন্ড অপেক্ষা করলে সেটা পাওয়া যাবে তা ফেরত দেয়।"""
+        self._refill(); self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+# Redis-এ টোকেন বাকেট: প্রতি কী একটি HASH {tokens, updated}; সময় সার্ভারের TIME, যাতে সব প্রসেস একই ঘড়ি দেখে।
+# KEYS = বাকেটগুলো; ARGV = mode, তারপর প্রতি কী-র rate, capacity।
+# mode "acquire": সব বাকেটে টোকেন থাকলে একটি করে খরচ করে 1, নাহলে কিছু না বদলে 0।
+# mode "reserve": সব বাকেট থেকে একটি করে আগাম বুক করে; সবচেয়ে বেশি অপেক্ষা মাইক্রোসেকেন্ডে ফেরত।
+BUCKET_LUA = """
+local t = redis.call('TIME'); local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local reserve = ARGV[1] == 'reserve'; local levels, wait = {}, 0
+for i, key in ipairs(KEYS) do
+  local rate, capacity = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  local state = redis.call('HMGET', key, 'tokens', 'updated')
+  local tokens = tonumber(state[1]) or capacity
+  tokens = math.min(capacity, tokens + math.max(0, now - (tonumber(state[2]) or now)) * rate)
+  if tokens < 1 and not reserve then return 0 end
+  levels[i] = tokens - 1
+  if levels[i] < 0 then wait = math.max(wait, -levels[i] / rate) end
+end
+for i, key in ipairs(KEYS) do
+  local rate, capacity = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+  redis.call('HSET', key, 'tokens', tostring(levels[i]), 'updated', tostring(now))
+  redis.call('EXPIRE', key, math.ceil((capacity - levels[i]) / rate) + 1)
+end
+if reserve then return math.ceil(wait * 1000000) end
+return 1
+"""
+
+
+class RedisBuckets:
+    """TokenBucket-এর মতোই, কিন্তু বাকেট Redis-এ (redis ব্যাকএন্ড, WORKERS > 1)।
+
+    সব ওয়ার্কার প্রসেস একই বাকেট থেকে টোকেন নেয়, তাই ইউজারের সীমা ও টেলিগ্রামের গ্লোবাল সীমা
+    ওয়ার্কার সংখ্যা যা-ই হোক একবারই গোনা হয়। বাকেট ভরে গেলে কী নিজে থেকেই মুছে যায় (EXPIRE)।
+    """
+
+    def __init__(self, client, prefix: str = "nb"):
+        self.client = client; self.prefix = prefix; self._script = client.register_script(BUCKET_LUA)
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}:bucket:{name}"
+
+    async def _call(self, mode: str, buckets: Sequence[Tuple[str, float, float]]) -> int:
+        return int(await self._script(keys=[self._key(name) for name, _, _ in buckets], args=[mode, *(value for _, rate, capacity in buckets for value in (rate, capacity))]))
+
+    async def try_acquire(self, name: str, rate: float, capacity: float) -> bool:
+        return await self._call("acquire", [(name, rate, capacity)]) == 1
+
+    async def reserve(self, buckets: Sequence[Tuple[str, float, float]]) -> float:
+        """(নাম, rate, capacity) বাকেটগুলোর প্রতিটি থেকে একটি টোকেন বুক করে; কত সেকেন্ড অপেক্ষা লাগবে তা ফেরত।"""
+        return await self._call("reserve", buckets) / 1e6
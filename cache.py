@@ -0,0 +1,29 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """সাইজ-সীমিত LRU ক্যাশ, হিট/মিস/ইভিকশন কাউন্টারসহ।"""
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """না থাকলে None; None মান রাখা থাকলেও সেটা মিস (ক্রমও বদলায় না), তাই ক্যাশে None রাখার মানে হয় না।"""
+        value = self._data.get(key)
+        if value is None: self.misses += 1; return None
+        self._data.move_to_end(key); self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value; self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False); self.evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
@@ -0,0 +1,75 @@
+"""সার্ভিস/দেশ ক্যাটালগের স্ন্যাপশট: ছোট সংখ্যার আইডি আর নামের প্রিফিক্স সার্চ।
+
+কলব্যাক ডেটায় (টেলিগ্রামে সর্বোচ্চ ৬৪ বাইট) পুরো নামের বদলে তালিকায় অবস্থান (আইডি) যায়। আইডি
+একটি catalog_version-এর জন্যই অর্থবহ, তাই কলব্যাকে ভার্সনও থাকে; পুরনো কীবোর্ডের ট্যাপ ধরা পড়ে।
+সব ওয়ার্কার একই স্টোরেজ থেকে একই ক্রমে তালিকা পড়ে, তাই একই ভার্সনে সবার আইডি একই।
+"""
+from typing import Dict, List, Optional
+
+from storage import Storage
+
+
+class PrefixIndex:
+    """নামের প্রতিটি শব্দের শুরু থেকে ছোট হাতের অক্ষরের trie; প্রতিটি নোডে তার নিচের আইডিগুলো ক্রমানুসারে।
+
+    খোঁজা O(len(prefix)), ফলাফল আগে থেকেই সাজানো — তাই পেজিনেশনের জন্য শুধু স্লাইস লাগে।
+    """
+    __slots__ = ("root",)
+
+    def __init__(self, names: List[str] = ()):
+        self.root: list = [{}, []]
+        for item_id, name in enumerate(names): self.add(item_id, name)
+
+    def add(self, item_id: int, name: str) -> None:
+        """আইডিগুলো বাড়তি ক্রমে যোগ করতে হয়।"""
+        name = name.casefold()
+        for start in range(len(name)):
+            if start and name[start - 1].isalnum(): continue
+            node = self.root
+            for char in name[start:]:
+                node = node[0].setdefault(char, [{}, []])
+                if not node[1] or node[1][-1] != item_id: node[1].append(item_id)
+
+    def search(self, prefix: str) -> List[int]:
+        node = self.root
+        for char in prefix.casefold():
+            node = node[0].get(char)
+            if node is None: return []
+        return node[1]
+
+
+class Catalog:
+    """একটি catalog_version-এর সার্ভিস ও দেশের তালিকা; আইডি = তালিকায় অবস্থান।"""
+    __slots__ = ("version", "services", "countries", "_service_ids", "_service_index", "_country_index")
+
+    def __init__(self, version: int, services: List[str], countries: List[List[str]]):
+        self.version = version; self.services = services; self.countries = countries
+        self._service_ids: Dict[str, int] = {name: sid for sid, name in enumerate(services)}
+        self._service_index = PrefixIndex(services); self._country_index: Dict[int, PrefixIndex] = {}
+
+    @classmethod
+    async def load(cls, db: Storage) -> "Catalog":
+        """পড়ার মাঝে অন্য প্রসেস ক্যাটালগ বদলালে ভার্সন মিলবে না; তখন আবার পড়া হয়।"""
+        while True:
+            version = await db.catalog_version(); services = await db.list_services()
+            countries = [await db.list_countries(service) or [] for service in services]
+            if await db.catalog_version() == version: return cls(version, services, countries)
+
+    def service_id(self, service: str) -> Optional[int]:
+        return self._service_ids.get(service)
+
+    def service(self, sid: int) -> Optional[str]:
+        return self.services[sid] if 0 <= sid < len(self.services) else None
+
+    def country(self, sid: int, cid: int) -> Optional[str]:
+        countries = self.countries[sid] if 0 <= sid < len(self.countries) else []
+        return countries[cid] if 0 <= cid < len(countries) else None
+
+    def search_services(self, prefix: str) -> List[int]:
+        return self._service_index.search(prefix)
+
+    def search_countries(self, sid: int, prefix: str) -> List[int]:
+        """দেশের trie প্রথম সার্চেই তৈরি হয়; বেশিরভাগ সার্ভিসে কেউ কখনো সার্চ করে না।"""
+        index = self._country_index.get(sid)
+        if index is None: index = self._country_index[sid] = PrefixIndex(self.countries[sid])
+        return index.search(prefix)
@@ -0,0 +1,125 @@
+"""সীমিত ইন-মেমরি FSM স্টোরেজ: নিষ্ক্রিয়তার TTL পেরোলে বা সাইজ সীমা ছাড়ালে (LRU) রেকর্ড মুছে যায়।
+
+aiogram-এর MemoryStorage প্রতিটি ইউজারের জন্য StorageKey + dataclass + dict রাখে এবং শুধু পড়লেও
+(get_state) এন্ট্রি তৈরি করে; কেউ /start না দিলে সেটা আর কখনো মোছে না। এখানে:
+  - কী: প্রাইভেট চ্যাটে শুধু user_id (int), অন্য ক্ষেত্রে পুরো StorageKey
+  - রেকর্ড: __slots__ অবজেক্ট; state আর সার্ভিস/দেশের নাম ইন্টার্ন করা (সবার মধ্যে একটিই str অবজেক্ট)।
+    state-এর নাম কোডে বাঁধা, তাই সেই টেবিল ছোটই থাকে; নামের টেবিল max_names-এ সীমিত LRU, যাতে মুছে ফেলা
+    সার্ভিস/দেশের নাম চিরকাল জমে না থাকে। বাকি ডেটা (যেমন picker_query-র মতো ফ্রি-টেক্সট) ইন্টার্ন হয় না।
+  - খালি রেকর্ড (state None, data খালি) রাখা হয় না, পড়লে কিছু তৈরি হয় না
+  - OrderedDict-এর ক্রম = শেষ ব্যবহারের ক্রম, তাই মেয়াদোত্তীর্ণ ও LRU রেকর্ড সবসময় সামনে থাকে;
+    প্রতি লেখায় সামনে থেকে কয়েকটি মুছলেই চলে (অ্যামর্টাইজড O(1))
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, BaseStorage, StateType, StorageKey
+
+from cache import LRUCache
+
+
+class FSMRecord:
+    """একজন ইউজারের FSM অবস্থা; বট যে দুটি মান সবসময় রাখে সেগুলো আলাদা স্লটে, বাকিগুলো extra dict-এ।"""
+    __slots__ = ("state", "service_name", "country_name", "extra", "touched")
+
+    def __init__(self, touched: int):
+        self.state = self.service_name = self.country_name = self.extra = None; self.touched = touched
+
+    def is_empty(self) -> bool:
+        return self.state is None and self.service_name is None and self.country_name is None and not self.extra
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = dict(self.extra) if self.extra else {}
+        if self.service_name is not None: data["service_name"] = self.service_name
+        if self.country_name is not None: data["country_name"] = self.country_name
+        return data
+
+
+class CompactFSMStorage(BaseStorage):
+    def __init__(self, ttl: float = 3600, max_records: int = 200_000, max_names: int = 4096):
+        self.ttl = ttl; self.max_records = max_records
+        self.storage: "OrderedDict[Hashable, FSMRecord]" = OrderedDict()
+        self.expired = self.evicted = 0
+        self._states: Dict[str, str] = {}; self._names = LRUCache(max_names); self._bot_id: Optional[int] = None
+        self._tick = 0
+
+    def _now(self) -> int:
+        """পূর্ণ সেকেন্ডের ঘড়ি; একই সেকেন্ডে ছোঁয়া সব রেকর্ড একই int অবজেক্ট শেয়ার করে।"""
+        now = int(time.monotonic())
+        if now != self._tick: self._tick = now
+        return self._tick
+
+    def _intern_state(self, state: Optional[str]) -> Optional[str]:
+        return state if state is None else self._states.setdefault(state, state)
+
+    def _intern_name(self, value: Any) -> Any:
+        if not isinstance(value, str): return value
+        interned = self._names.get(value)
+        if interned is None: self._names.put(value, value); return value
+        return interned
+
+    def _key(self, key: StorageKey) -> Hashable:
+        if self._bot_id is None: self._bot_id = key.bot_id
+        if key.bot_id == self._bot_id and key.chat_id == key.user_id and key.thread_id is None and key.business_connection_id is None and key.destiny == DEFAULT_DESTINY:
+            return key.user_id
+        return key
+
+    def _get(self, key: StorageKey) -> Optional[FSMRecord]:
+        compact = self._key(key); record = self.storage.get(compact)
+        if record is None: return None
+        now = self._now()
+        if now - record.touched > self.ttl:
+            del self.storage[compact]; self.expired += 1; return None
+        record.touched = now; self.storage.move_to_end(compact)
+        return record
+
+    def _record(self, key: StorageKey) -> FSMRecord:
+        record = self._get(key)
+        if record is None:
+            record = self.storage[self._key(key)] = FSMRecord(self._now()); self._evict()
+        return record
+
+    def _evict(self) -> None:
+        storage = self.storage; deadline = self._now() - self.ttl
+        while storage:
+            compact, record = next(iter(storage.items()))
+            if record.touched < deadline: self.expired += 1
+            elif len(storage) > self.max_records: self.evicted += 1
+            else: break
+            del storage[compact]
+
+    def _drop_if_empty(self, key: StorageKey, record: FSMRecord) -> None:
+        if record.is_empty(): self.storage.pop(self._key(key), None)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        state = state.state if isinstance(state, State) else state
+        record = self._record(key) if state is not None else self._get(key)
+        if record is None: return
+        record.state = self._intern_state(state); self._drop_if_empty(key, record)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        record = self._get(key)
+        return None if record is None else record.state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict): raise DataNotDictLikeError(f"Data must be a dict or dict-like object, got {type(data).__name__}")
+        record = self._record(key) if data else self._get(key)
+        if record is None: return
+        extra = dict(data); record.service_name = self._intern_name(extra.pop("service_name", None)); record.country_name = self._intern_name(extra.pop("country_name", None))
+        record.extra = extra or None; self._drop_if_empty(key, record)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        record = self._get(key)
+        return {} if record is None else record.to_dict()
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default: Any = None) -> Any:
+        return (await self.get_data(storage_key)).get(dict_key, default)
+
+    async def close(self) -> None:
+        self.storage.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"records": len(self.storage), "expired": self.expired, "evicted": self.evicted}
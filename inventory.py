@@ -0,0 +1,212 @@
+"""প্রতিটি (সার্ভিস, দেশ) পুলের ইনক্রিমেন্টাল কাউন্টার: স্টক, আজ দেওয়া, ইমপোর্ট হার, শেষ হওয়ার আনুমানিক সময়।
+
+ইমপোর্ট, নম্বর দেওয়া বা পুল মোছার সময় হ্যান্ডলাররা যে মান আগেই জানে (স্টোরেজের ফেরত দেওয়া বাকি সংখ্যা)
+সেটাই এখানে লেখে — প্রতি ঘটনায় O(1), কোনো তালিকার len() বা স্টোরেজ স্ক্যান নেই। রিপোর্ট O(pools)।
+হারগুলো sliding window: window সেকেন্ডের ঘরে গোনা হয়, হার = চলতি ঘর + আগের ঘরের যতটুকু এখনো window-এর
+ভেতরে। দুটি সংখ্যাই যথেষ্ট, তাই একই হিসাব Redis-এ HINCRBY দিয়েও চলে।
+
+কম স্টকের সতর্কতা: নম্বর দেওয়ার পরে স্টক threshold-এর নিচে নামলে পুলটি একবার pending-এ ওঠে; আবার
+threshold ছাড়ানো পর্যন্ত (ইমপোর্টে) দ্বিতীয়বার ওঠে না। ওয়াচার pending একসাথে নিয়ে একটি মেসেজ পাঠায়।
+
+Inventory প্রসেসের মেমরিতে রাখে (একটি প্রসেসের জন্য); RedisInventory একই কাউন্টার Redis-এ রাখে, যাতে
+সব ওয়ার্কার প্রসেসের দেওয়া নম্বর একই রিপোর্ট ও সতর্কতায় আসে।
+"""
+import json
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+DAY = 86400
+
+
+def _today() -> int:
+    return int(time.time() // DAY)  # UTC দিন
+
+
+def window_rate(current: int, previous: int, window: float, now: float) -> float:
+    """প্রতি সেকেন্ডে হার: চলতি ঘর পুরো, আগের ঘরের যে অংশ এখনো শেষ window সেকেন্ডে পড়ে ততটুকু।"""
+    return (current + previous * (1 - now % window / window)) / window
+
+
+class WindowCount:
+    """চলতি ও আগের window-এর গণনা; add() ও rate() দুটোই O(1)।"""
+    __slots__ = ("slot", "current", "previous")
+
+    def __init__(self):
+        self.slot = 0; self.current = self.previous = 0
+
+    def _counts(self, window: float, now: float) -> Tuple[int, int, int]:
+        slot = int(now // window)
+        if slot == self.slot: return slot, self.current, self.previous
+        return slot, 0, self.current if slot == self.slot + 1 else 0
+
+    def add(self, amount: int, window: float, now: float) -> None:
+        self.slot, self.current, self.previous = self._counts(window, now); self.current += amount
+
+    def rate(self, window: float, now: float) -> float:
+        _, current, previous = self._counts(window, now)
+        return window_rate(current, previous, window, now)
+
+
+class PoolStats:
+    __slots__ = ("stock", "issued_today", "day", "imports", "issues", "alerted")
+
+    def __init__(self, stock: int = 0):
+        self.stock = stock; self.issued_today = 0; self.day = _today()
+        self.imports = WindowCount(); self.issues = WindowCount(); self.alerted = False
+
+
+class PoolReport(NamedTuple):
+    service: str
+    country: str
+    stock: int
+    issued_today: int
+    import_rate: float        # নম্বর/ঘণ্টা
+    issue_rate: float         # নম্বর/ঘণ্টা
+    eta: Optional[float]      # সেকেন্ড; বর্তমান হারে কেউ নিচ্ছে না হলে None
+
+
+def _pool_report(service: str, country: str, stock: int, issued_today: int, import_rate: float, issue_rate: float) -> PoolReport:
+    return PoolReport(service, country, stock, issued_today, import_rate * 3600, issue_rate * 3600, stock / issue_rate if issue_rate > 0 else None)
+
+
+class Inventory:
+    def __init__(self, threshold: int = 50, window: float = 3600):
+        self.threshold = threshold; self.window = window
+        self.pools: Dict[str, Dict[str, PoolStats]] = {}  # service -> country -> stats
+        self.pending: Set[Tuple[str, str]] = set()
+
+    def _pool(self, service: str, country: str) -> PoolStats:
+        countries = self.pools.setdefault(service, {}); pool = countries.get(country)
+        if pool is None: pool = countries[country] = PoolStats()
+        return pool
+
+    def _restocked(self, pool: PoolStats, service: str, country: str) -> None:
+        if pool.stock >= self.threshold: pool.alerted = False; self.pending.discard((service, country))
+
+    async def set_stock(self, service: str, country: str, stock: int) -> None:
+        pool = self._pool(service, country); pool.stock = stock; self._restocked(pool, service, country)
+
+    async def imported(self, service: str, country: str, added: int, stock: int) -> None:
+        pool = self._pool(service, country); pool.stock = stock
+        if added: pool.imports.add(added, self.window, time.time())
+        self._restocked(pool, service, country)
+
+    async def issued(self, service: str, country: str, count: int, remaining: int) -> None:
+        """নম্বর দেওয়ার পরে ডাকা হয়; স্টক threshold-এর নিচে নামলে পুলটি একবার pending-এ ওঠে।"""
+        pool = self._pool(service, country); pool.stock = remaining
+        if count:
+            today = _today()
+            if pool.day != today: pool.day = today; pool.issued_today = 0
+            pool.issued_today += count; pool.issues.add(count, self.window, time.time())
+        if remaining < self.threshold and not pool.alerted and (count or not remaining):
+            pool.alerted = True; self.pending.add((service, country))
+
+    async def remove_service(self, service: str) -> None:
+        for country in self.pools.pop(service, {}): self.pending.discard((service, country))
+
+    async def remove_country(self, service: str, country: str) -> None:
+        self.pools.get(service, {}).pop(country, None); self.pending.discard((service, country))
+
+    async def take_alerts(self) -> List[PoolReport]:
+        """জমে থাকা সতর্কতাগুলো একবারে নেয়; এর মধ্যে রিস্টক বা মুছে ফেলা পুল বাদ পড়ে যায়।"""
+        pending, self.pending = self.pending, set(); now = time.time(); today = _today()
+        return sorted(self._report(service, country, self.pools[service][country], now, today) for service, country in pending)
+
+    def _report(self, service: str, country: str, pool: PoolStats, now: float, today: int) -> PoolReport:
+        return _pool_report(service, country, pool.stock, pool.issued_today if pool.day == today else 0, pool.imports.rate(self.window, now), pool.issues.rate(self.window, now))
+
+    async def report(self) -> List[PoolReport]:
+        now = time.time(); today = _today()
+        return [self._report(service, country, pool, now, today) for service, countries in self.pools.items() for country, pool in countries.items()]
+
+
+class RedisInventory(Inventory):
+    """একই কাউন্টার Redis-এ (redis ব্যাকএন্ড, WORKERS > 1)। প্রতিটি ঘটনা একটি পাইপলাইন, গণনা HINCRBY।
+
+    কী-গুলো (পুল = json.dumps([service, country])):
+      {p}:inv:stock           HASH  পুল -> শেষ জানা স্টক
+      {p}:inv:w{n}            HASH  i:পুল / o:পুল -> n-তম window-এ ইমপোর্ট / দেওয়া; 2 window পরে মুছে যায়
+      {p}:inv:d{day}          HASH  পুল -> ঐ UTC দিনে দেওয়া; 2 দিন পরে মুছে যায়
+      {p}:inv:alerted         SET   সতর্কতায় উঠেছে, এখনো threshold ছাড়িয়ে রিস্টক হয়নি
+      {p}:inv:pending         SET   ওয়াচার এখনো পাঠায়নি
+    alerted-এ SADD যে ওয়ার্কারে 1 ফেরত দেয় শুধু সে pending-এ তোলে, তাই একই পুল একবারই সতর্ক হয়।
+    """
+
+    def __init__(self, client, prefix: str = "nb", threshold: int = 50, window: float = 3600):
+        super().__init__(threshold, window); self.client = client; self.prefix = prefix
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix, "inv") + tuple(str(part) for part in parts))
+
+    def _restock(self, pipe, pool: str, stock: int) -> None:
+        if stock >= self.threshold: pipe.srem(self._key("alerted"), pool); pipe.srem(self._key("pending"), pool)
+
+    def _count(self, pipe, key: str, field: str, amount: int, ttl: int) -> None:
+        pipe.hincrby(key, field, amount); pipe.expire(key, ttl)
+
+    async def set_stock(self, service: str, country: str, stock: int) -> None:
+        pool = json.dumps([service, country])
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._key("stock"), pool, stock); self._restock(pipe, pool, stock); await pipe.execute()
+
+    async def imported(self, service: str, country: str, added: int, stock: int) -> None:
+        pool = json.dumps([service, country])
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._key("stock"), pool, stock)
+            if added: self._count(pipe, self._key(f"w{int(time.time() // self.window)}"), f"i:{pool}", added, int(2 * self.window) + 60)
+            self._restock(pipe, pool, stock); await pipe.execute()
+
+    async def issued(self, service: str, country: str, count: int, remaining: int) -> None:
+        pool = json.dumps([service, country]); low = remaining < self.threshold and (count or not remaining)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(self._key("stock"), pool, remaining)
+            if count:
+                self._count(pipe, self._key(f"d{_today()}"), pool, count, 2 * DAY)
+                self._count(pipe, self._key(f"w{int(time.time() // self.window)}"), f"o:{pool}", count, int(2 * self.window) + 60)
+            if low: pipe.sadd(self._key("alerted"), pool)
+            results = await pipe.execute()
+        if low and results[-1]: await self.client.sadd(self._key("pending"), pool)
+
+    async def _drop(self, pools: List[str]) -> None:
+        if not pools: return
+        slot = int(time.time() // self.window); counts = [f"{kind}:{pool}" for pool in pools for kind in "io"]
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hdel(self._key("stock"), *pools); pipe.hdel(self._key(f"d{_today()}"), *pools)
+            pipe.hdel(self._key(f"w{slot}"), *counts); pipe.hdel(self._key(f"w{slot - 1}"), *counts)
+            pipe.srem(self._key("alerted"), *pools); pipe.srem(self._key("pending"), *pools); await pipe.execute()
+
+    async def remove_service(self, service: str) -> None:
+        await self._drop([pool for pool in await self.client.hkeys(self._key("stock")) if json.loads(pool)[0] == service])
+
+    async def remove_country(self, service: str, country: str) -> None:
+        await self._drop([json.dumps([service, country])])
+
+    async def take_alerts(self) -> List[PoolReport]:
+        count = await self.client.scard(self._key("pending"))
+        if not count: return []
+        # মাঝে অন্য ওয়ার্কার রিস্টক করে থাকলে (SREM-এর আগেই SADD) সেটিও বাদ
+        return sorted(row for row in await self._rows(await self.client.spop(self._key("pending"), count)) if row.stock < self.threshold)
+
+    async def report(self) -> List[PoolReport]:
+        return await self._rows(None)
+
+    async def _rows(self, pools: Optional[Iterable[str]]) -> List[PoolReport]:
+        now = time.time(); slot = int(now // self.window)
+        async with self.client.pipeline(transaction=False) as pipe:
+            pipe.hgetall(self._key("stock")); pipe.hgetall(self._key(f"w{slot}")); pipe.hgetall(self._key(f"w{slot - 1}")); pipe.hgetall(self._key(f"d{_today()}"))
+            stocks, current, previous, today = await pipe.execute()
+        rows = []
+        for pool in stocks if pools is None else pools:
+            if pool not in stocks: continue  # এর মধ্যে মুছে ফেলা পুল
+            rate = lambda kind: window_rate(int(current.get(f"{kind}:{pool}", 0)), int(previous.get(f"{kind}:{pool}", 0)), self.window, now)
+            rows.append(_pool_report(*json.loads(pool), int(stocks[pool]), int(today.get(pool, 0)), rate("i"), rate("o")))
+        return rows
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None: return "—"
+    minutes = int(seconds // 60)
+    if minutes < 60: return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 48: return f"{hours}h {minutes}m"
+    return f"{hours // 24}d {hours % 24}h"
@@ -0,0 +1,405 @@
+"""Redis-এর একটি ছোট লোকাল বিকল্প: বট যে কমান্ডগুলো ব্যবহার করে শুধু সেগুলো।
+
+MemoryRedis একই প্রসেসে redis.asyncio.Redis-এর জায়গায় বসানো যায়; serve() একে RESP
+প্রোটোকলে TCP-তে চালায়, ফলে আসল Redis ছাড়াই একাধিক ওয়ার্কার প্রসেস একই পুল শেয়ার করতে পারে।
+প্রতিটি কমান্ড ইভেন্ট লুপে একবারে চলে, তাই LPOP key count আসল Redis-এর মতোই অ্যাটমিক।
+
+Lua ইন্টারপ্রেটার নেই: বট যে স্ক্রিপ্টগুলো পাঠায় (storage.py-র ADMIT_LUA, ALLOCATE_LUA, ADD_ENTRY_LUA,
+REMOVE_COUNTRY_LUA, REMOVE_SERVICE_LUA, buckets.py-র
+BUCKET_LUA, redis-py Lock-এর release ও reacquire, যা চ্যাট লকে ব্যবহার হয়) তাদের SHA1 দিয়ে
+চিনে একই কাজের পাইথন সংস্করণ চালানো হয়। MemoryRedis-এর মেথডগুলো কখনো await-এ থামে না, তাই একেকটি
+স্ক্রিপ্টও মাঝে অন্য কমান্ড না ঢুকে একবারে চলে — আসল Redis-এর EVALSHA-র মতোই অ্যাটমিক।
+
+সার্ভার শুধু RESP2 বোঝে, তাই ক্লায়েন্টে protocol=2 দিতে হয়: REDIS_URL=redis://127.0.0.1:6379/0?protocol=2
+
+চালানো: python local_redis.py --port 6379
+"""
+import argparse
+import asyncio
+import fnmatch
+import hashlib
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+from number_index import normalize_number
+from storage import ADMIT_LUA, ALLOCATE_LUA, ADD_ENTRY_LUA, REMOVE_COUNTRY_LUA, REMOVE_SERVICE_LUA
+from buckets import BUCKET_LUA
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data: Dict[str, Any] = {}; self.expires: Dict[str, float] = {}  # key -> time.monotonic() ডেডলাইন
+
+    def _get(self, key: str, kind: type):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic(): self.data.pop(key, None); del self.expires[key]
+        value = self.data.get(key)
+        if value is not None and not isinstance(value, kind): raise TypeError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def _ensure(self, key: str, kind: type):
+        value = self._get(key, kind)
+        if value is None: value = self.data[key] = kind()
+        return value
+
+    def _drop_if_empty(self, key: str) -> None:
+        if not self.data.get(key): self.data.pop(key, None); self.expires.pop(key, None)
+
+    # --- keys ---
+    async def scan(self, cursor: int = 0, match: Optional[str] = None, count: Optional[int] = None, **kwargs) -> Tuple[int, List[str]]:
+        """একবারেই সব মিলে যাওয়া কী দেয় (cursor 0 = শেষ), যা SCAN-এর নিয়মেও বৈধ।"""
+        keys = [key for key in list(self.data) if (match is None or fnmatch.fnmatchcase(key, match)) and self._get(key, object) is not None]
+        return 0, keys
+
+    async def scan_iter(self, match: Optional[str] = None, count: Optional[int] = None, **kwargs) -> AsyncIterator[str]:
+        for key in (await self.scan(0, match, count))[1]: yield key
+
+    # --- strings ---
+    async def get(self, key: str) -> Optional[str]:
+        return self._get(key, str)
+
+    async def set(self, key: str, value: Any, ex: Any = None, px: Any = None, nx: bool = False) -> Optional[bool]:
+        if nx and self._get(key, object) is not None: return None
+        self.data[key] = value if isinstance(value, str) else value.decode() if isinstance(value, bytes) else str(value); self.expires.pop(key, None)
+        if ex is not None or px is not None: self.expires[key] = time.monotonic() + (float(ex) if ex is not None else int(px) / 1000)
+        return True
+
+    async def incr(self, key: str, amount: int = 1) -> int:
+        value = int(self._get(key, str) or 0) + int(amount); self.data[key] = str(value); return value
+
+    async def delete(self, *keys: str) -> int:
+        deleted = sum(self._get(key, object) is not None and self.data.pop(key) is not None for key in keys)
+        for key in keys: self.expires.pop(key, None)
+        return deleted
+
+    async def expire(self, key: str, seconds: Any) -> int:
+        if self._get(key, object) is None: return 0
+        self.expires[key] = time.monotonic() + int(seconds); return 1
+
+    # --- hashes ---
+    async def hget(self, key: str, field: str) -> Optional[str]:
+        return (self._get(key, dict) or {}).get(field)
+
+    async def hset(self, key: str, field: str, value: Any) -> int:
+        hash_ = self._ensure(key, dict); new = field not in hash_; hash_[field] = str(value); return int(new)
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        hash_ = self._ensure(key, dict); value = int(hash_.get(field, 0)) + int(amount); hash_[field] = str(value); return value
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        hash_ = self._get(key, dict)
+        if not hash_: return 0
+        removed = sum(hash_.pop(field, None) is not None for field in fields); self._drop_if_empty(key); return removed
+
+    async def hgetall(self, key: str) -> Dict[str, str]:
+        return dict(self._get(key, dict) or {})
+
+    async def hkeys(self, key: str) -> List[str]:
+        return list(self._get(key, dict) or ())
+
+    # --- sets ---
+    async def sadd(self, key: str, *members: str) -> int:
+        set_ = self._ensure(key, set); before = len(set_); set_.update(map(str, members)); return len(set_) - before
+
+    async def sismember(self, key: str, member: str) -> int:
+        return int(str(member) in (self._get(key, set) or ()))
+
+    async def scard(self, key: str) -> int:
+        return len(self._get(key, set) or ())
+
+    async def spop(self, key: str, count: Optional[int] = None):
+        set_ = self._get(key, set)
+        if not set_: return None if count is None else []
+        if count is None: value = set_.pop(); self._drop_if_empty(key); return value
+        popped = [set_.pop() for _ in range(min(int(count), len(set_)))]; self._drop_if_empty(key); return popped
+
+    async def srem(self, key: str, *members: str) -> int:
+        set_ = self._get(key, set)
+        if not set_: return 0
+        before = len(set_); set_.difference_update(map(str, members)); removed = before - len(set_); self._drop_if_empty(key); return removed
+
+    # --- lists ---
+    async def rpush(self, key: str, *values: str) -> int:
+        list_ = self._ensure(key, deque); list_.extend(values); return len(list_)
+
+    async def lpop(self, key: str, count: Optional[int] = None):
+        list_ = self._get(key, deque)
+        if not list_: return None
+        if count is None: value = list_.popleft(); self._drop_if_empty(key); return value
+        popped = [list_.popleft() for _ in range(min(int(count), len(list_)))]; self._drop_if_empty(key); return popped
+
+    async def lrange(self, key: str, start: int, end: int) -> List[str]:
+        items = list(self._get(key, deque) or ())
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    async def llen(self, key: str) -> int:
+        return len(self._get(key, deque) or ())
+
+    # --- sorted sets (member -> score) ---
+    async def zadd(self, key: str, mapping: Dict[str, float], nx: bool = False) -> int:
+        zset = self._ensure(key, dict); added = 0
+        for member, score in mapping.items():
+            if member in zset and nx: continue
+            added += member not in zset; zset[member] = float(score)
+        return added
+
+    async def zrem(self, key: str, *members: str) -> int:
+        zset = self._get(key, dict) or {}; removed = sum(zset.pop(member, None) is not None for member in members); self._drop_if_empty(key); return removed
+
+    async def zscore(self, key: str, member: str) -> Optional[float]:
+        return (self._get(key, dict) or {}).get(member)
+
+    async def zrange(self, key: str, start: int, end: int, withscores: bool = False) -> List:
+        items = sorted((self._get(key, dict) or {}).items(), key=lambda item: (item[1], item[0]))
+        items = items[start:] if end == -1 else items[start:end + 1]
+        return items if withscores else [member for member, _ in items]
+
+    # --- scripting ---
+    async def evalsha(self, sha: str, numkeys: int, *keys_and_args: Any) -> Any:
+        script = SCRIPTS.get(sha)
+        if script is None: raise ValueError("NOSCRIPT No matching script. Please use EVAL.")
+        numkeys = int(numkeys); return await script(self, list(keys_and_args[:numkeys]), [str(arg) for arg in keys_and_args[numkeys:]])
+
+    async def eval(self, source: str, numkeys: int, *keys_and_args: Any) -> Any:
+        return await self.evalsha(script_sha(source), numkeys, *keys_and_args)
+
+    async def script_load(self, source: str) -> str:
+        sha = script_sha(source)
+        if sha not in SCRIPTS: raise ValueError("local_redis cannot run this Lua script")
+        return sha
+
+    def register_script(self, source: str) -> "MemoryScript":
+        return MemoryScript(self, source)
+
+    def pipeline(self, transaction: bool = False) -> "MemoryPipeline":
+        return MemoryPipeline(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class MemoryScript:
+    """redis.asyncio-র Script-এর মতো: await script(keys=[...], args=[...])।"""
+
+    def __init__(self, client: MemoryRedis, source: str):
+        self._client = client; self.sha = script_sha(source)
+
+    async def __call__(self, keys: Sequence = (), args: Sequence = (), client: Optional[MemoryRedis] = None) -> Any:
+        return await (client or self._client).evalsha(self.sha, len(keys), *keys, *args)
+
+
+# --- পরিচিত Lua স্ক্রিপ্টের পাইথন সংস্করণ (SHA1 -> ফাংশন) ---
+def script_sha(source: str) -> str:
+    return hashlib.sha1(source.encode()).hexdigest()
+
+
+def _same_id(score: Optional[float], expected: str) -> bool:
+    return score is not None and int(score) == int(expected)
+
+
+async def _admit(db: MemoryRedis, keys: List[str], args: List[str]) -> List[int]:
+    if not _same_id(await db.zscore(keys[3], args[0]), args[1]): return [-1, 0, 0]
+    added = []; in_stock = issued = 0
+    for i in range(2, len(args), 2):
+        if await db.sismember(keys[0], args[i]): issued += 1
+        elif await db.sadd(keys[1], args[i]): added.append(args[i + 1])
+        else: in_stock += 1
+    if added: await db.rpush(keys[2], *added)
+    return [len(added), in_stock, issued]
+
+
+async def _allocate(db: MemoryRedis, keys: List[str], args: List[str]) -> List:
+    taken = await db.lpop(keys[0], int(args[0])) or []
+    for number in taken:
+        key = normalize_number(number); await db.srem(keys[1], key); await db.sadd(keys[2], key)
+    return [await db.llen(keys[0]), *taken]
+
+
+async def _add_entry(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    if len(keys) > 3 and not _same_id(await db.zscore(keys[3], args[1]), args[2]): return 0
+    if await db.zscore(keys[0], args[0]) is not None: return 0
+    await db.zadd(keys[0], {args[0]: await db.incr(keys[1])}); await db.incr(keys[2]); return 1
+
+
+async def _unstock(db: MemoryRedis, pool: str, stocked: str) -> None:
+    numbers = await db.lrange(pool, 0, -1)
+    if numbers: await db.srem(stocked, *(normalize_number(number) for number in numbers))
+    await db.delete(pool)
+
+
+async def _remove_country(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    cid = await db.zscore(keys[0], args[0])
+    if cid is None: return 0
+    await _unstock(db, args[1] + str(int(cid)), keys[1])
+    await db.zrem(keys[0], args[0]); await db.incr(keys[2]); return 1
+
+
+async def _remove_service(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    sid = await db.zscore(keys[0], args[0])
+    if sid is None: return 0
+    countries = args[1] + str(int(sid))
+    for _, cid in await db.zrange(countries, 0, -1, withscores=True): await _unstock(db, args[2] + str(int(cid)), keys[1])
+    await db.delete(countries); await db.zrem(keys[0], args[0]); await db.incr(keys[2]); return 1
+
+
+async def _bucket(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    now = time.time(); reserve = args[0] == "reserve"; levels = []; wait = 0.0
+    for i, key in enumerate(keys):
+        rate, capacity = float(args[2 * i + 1]), float(args[2 * i + 2]); state = await db.hgetall(key)
+        tokens = min(capacity, float(state.get("tokens", capacity)) + max(0.0, now - float(state.get("updated", now))) * rate)
+        if tokens < 1 and not reserve: return 0
+        levels.append(tokens - 1)
+        if tokens < 1: wait = max(wait, (1 - tokens) / rate)
+    for i, key in enumerate(keys):
+        rate, capacity = float(args[2 * i + 1]), float(args[2 * i + 2])
+        await db.hset(key, "tokens", levels[i]); await db.hset(key, "updated", now); await db.expire(key, math.ceil((capacity - levels[i]) / rate) + 1)
+    return math.ceil(wait * 1e6) if reserve else 1
+
+
+async def _release_lock(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    """redis-py Lock.LUA_RELEASE_SCRIPT: টোকেন মিললে তবেই লক মোছে।"""
+    if await db.get(keys[0]) != args[0]: return 0
+    await db.delete(keys[0]); return 1
+
+
+async def _reacquire_lock(db: MemoryRedis, keys: List[str], args: List[str]) -> int:
+    """redis-py Lock.LUA_REACQUIRE_SCRIPT: টোকেন মিললে মেয়াদ আবার ARGV[2] মিলিসেকেন্ডে তোলে।"""
+    if await db.get(keys[0]) != args[0]: return 0
+    db.expires[keys[0]] = time.monotonic() + int(args[1]) / 1000; return 1
+
+
+SCRIPTS: Dict[str, Callable[[MemoryRedis, List[str], List[str]], Awaitable[Any]]] = {script_sha(ADMIT_LUA): _admit, script_sha(ALLOCATE_LUA): _allocate, script_sha(BUCKET_LUA): _bucket,
+                                                                                    script_sha(ADD_ENTRY_LUA): _add_entry, script_sha(REMOVE_COUNTRY_LUA): _remove_country,
+                                                                                    script_sha(REMOVE_SERVICE_LUA): _remove_service}
+try:
+    from redis.asyncio.lock import Lock
+    SCRIPTS[script_sha(Lock.LUA_RELEASE_SCRIPT)] = _release_lock; SCRIPTS[script_sha(Lock.LUA_REACQUIRE_SCRIPT)] = _reacquire_lock
+except ImportError: pass  # redis প্যাকেজ না থাকলে কোনো ক্লায়েন্টও লক চাইবে না
+
+
+class MemoryPipeline:
+    """redis.asyncio পাইপলাইনের মতো: কমান্ড জমা রাখে, execute()-এ ক্রমানুসারে চালায়।"""
+
+    def __init__(self, client: MemoryRedis):
+        self._client = client; self._calls: List = []
+
+    def __getattr__(self, name: str):
+        method = getattr(self._client, name)
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs)); return self
+        return queue
+
+    async def execute(self) -> List:
+        calls, self._calls = self._calls, []
+        return [await method(*args, **kwargs) for method, args, kwargs in calls]
+
+    async def __aenter__(self) -> "MemoryPipeline":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self._calls = []
+
+
+# --- RESP সার্ভার ---
+def _encode(value: Any) -> bytes:
+    if value is None: return b"$-1\r\n"
+    if value is True: return b"+OK\r\n"
+    if isinstance(value, int): return b":%d\r\n" % value
+    if isinstance(value, float): value = repr(value) if value != int(value) else str(int(value))
+    if isinstance(value, str): value = value.encode()
+    if isinstance(value, bytes): return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, Exception):
+        message = str(value); code = message.split(" ", 1)[0]
+        return f"-{message if code.isupper() else 'ERR ' + message}\r\n".encode()
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+
+async def _dispatch(db: MemoryRedis, args: List[str]) -> Any:
+    cmd, rest = args[0].upper(), args[1:]
+    if cmd in ("PING",): return b"+PONG\r\n"
+    if cmd in ("CLIENT", "SELECT", "READONLY"): return True
+    if cmd == "SCAN":
+        options = [part.upper() for part in rest[1:]]; match = rest[1 + options.index("MATCH") + 1] if "MATCH" in options else None
+        cursor, keys = await db.scan(int(rest[0]), match); return [str(cursor), keys]
+    if cmd == "GET": return await db.get(rest[0])
+    if cmd == "SET":
+        options = [part.upper() for part in rest[2:]]; ex = px = None
+        if "EX" in options: ex = rest[2 + options.index("EX") + 1]
+        if "PX" in options: px = rest[2 + options.index("PX") + 1]
+        return await db.set(rest[0], rest[1], ex=ex, px=px, nx="NX" in options)
+    if cmd == "INCR": return await db.incr(rest[0])
+    if cmd == "INCRBY": return await db.incr(rest[0], rest[1])
+    if cmd == "DEL": return await db.delete(*rest)
+    if cmd == "HGET": return await db.hget(rest[0], rest[1])
+    if cmd == "HSET": return await db.hset(rest[0], rest[1], rest[2])
+    if cmd == "HINCRBY": return await db.hincrby(rest[0], rest[1], rest[2])
+    if cmd == "HDEL": return await db.hdel(rest[0], *rest[1:])
+    if cmd == "HGETALL": return [part for item in (await db.hgetall(rest[0])).items() for part in item]
+    if cmd == "HKEYS": return await db.hkeys(rest[0])
+    if cmd == "EXPIRE": return await db.expire(rest[0], rest[1])
+    if cmd == "SCARD": return await db.scard(rest[0])
+    if cmd == "SPOP": return await db.spop(rest[0], int(rest[1]) if len(rest) > 1 else None)
+    if cmd == "SADD": return await db.sadd(rest[0], *rest[1:])
+    if cmd == "SISMEMBER": return await db.sismember(rest[0], rest[1])
+    if cmd == "SREM": return await db.srem(rest[0], *rest[1:])
+    if cmd == "RPUSH": return await db.rpush(rest[0], *rest[1:])
+    if cmd == "LPOP": return await db.lpop(rest[0], int(rest[1]) if len(rest) > 1 else None)
+    if cmd == "LRANGE": return await db.lrange(rest[0], int(rest[1]), int(rest[2]))
+    if cmd == "LLEN": return await db.llen(rest[0])
+    if cmd == "EVALSHA": return await db.evalsha(*rest)
+    if cmd == "EVAL": return await db.eval(*rest)
+    if cmd == "SCRIPT" and rest[0].upper() == "LOAD": return await db.script_load(rest[1])
+    if cmd == "ZADD":
+        nx = rest[1].upper() == "NX"; pairs = rest[2:] if nx else rest[1:]
+        return await db.zadd(rest[0], {pairs[i + 1]: float(pairs[i]) for i in range(0, len(pairs), 2)}, nx=nx)
+    if cmd == "ZREM": return await db.zrem(rest[0], *rest[1:])
+    if cmd == "ZSCORE": return await db.zscore(rest[0], rest[1])
+    if cmd == "ZRANGE":
+        items = await db.zrange(rest[0], int(rest[1]), int(rest[2]), withscores=len(rest) > 3)
+        return [part for item in items for part in item] if len(rest) > 3 else items
+    raise ValueError(f"unknown command '{args[0]}'")
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[str]]:
+    header = await reader.readline()
+    if not header: return None
+    if not header.startswith(b"*"): return header.decode().split()  # inline কমান্ড (যেমন redis-cli PING)
+    args = []
+    for _ in range(int(header[1:])):
+        size = int((await reader.readline())[1:]); args.append((await reader.readexactly(size + 2))[:-2].decode())
+    return args
+
+
+async def serve(host: str = "127.0.0.1", port: int = 6379, db: Optional[MemoryRedis] = None) -> asyncio.AbstractServer:
+    """RESP সার্ভার চালু করে; সব কানেকশন একই MemoryRedis শেয়ার করে।"""
+    db = db or MemoryRedis()
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while (args := await _read_command(reader)) is not None:
+                try: reply = await _dispatch(db, args)
+                except Exception as e: reply = e
+                writer.write(reply if isinstance(reply, bytes) else _encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError): pass
+        finally: writer.close()
+
+    return await asyncio.start_server(handle, host, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    options = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        server = await serve(options.host, options.port)
+        logging.info(f"local_redis চালু: {options.host}:{options.port}")
+        async with server: await server.serve_forever()
+
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+"""Prometheus টেক্সট ফরম্যাটে মেট্রিক্স: ছোট Counter/Gauge/Histogram এবং ডিসপ্যাচার মিডলওয়্যার।
+
+প্রতিটি আপডেট শুধু একটি dict লুকআপ ও যোগ (হিস্টোগ্রামে একটি bisect), তাই প্রোডাকশনে চালু রাখা যায়।
+স্ক্র্যাপের সময়ের মান (FSM সাইজ, ক্যাশ স্ট্যাটস ইত্যাদি) add_collector() দিয়ে দেওয়া হুকে সেট হয়।
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable, Dict, List, Sequence, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra: parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name; self.documentation = documentation; self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], Any] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        """মান সরাসরি বসায়; কাউন্টারের ক্ষেত্রে অন্য জায়গায় গোনা মোট সংখ্যা কপি করতে।"""
+        self.values[labels] = value
+
+    def remove(self, *labels: str) -> None:
+        self.values.pop(tuple(labels), None)
+
+    def remove_matching(self, predicate: Callable[[Tuple[str, ...]], bool]) -> None:
+        for labels in [labels for labels in self.values if predicate(labels)]: del self.values[labels]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in self.values.items(): lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels: str) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames); self.buckets = tuple(buckets)
+
+    def observe(self, value: float, *labels: str) -> None:
+        state = self.values.get(labels)
+        if state is None: state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1; state[1] += value; state[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self.values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count; le = 'le="+Inf"' if bound == float("inf") else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[Metric] = []; self.collectors: List[Callable[[], None]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric); return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """স্ক্র্যাপের ঠিক আগে চালানো হয়; O(1) মান (সাইজ, কাউন্টার) গেজে কপি করার জন্য।"""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self.collectors: collector()
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """প্রতিটি হ্যান্ডলারের লেটেন্সি ও বেরিয়ে আসা এক্সেপশন গোনে (ইনার মিডলওয়্যার হিসেবে রেজিস্টার করতে হয়)।"""
+
+    def __init__(self, latency: Histogram, errors: Counter):
+        self.latency = latency; self.errors = errors
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        handler_object = data.get("handler"); name = handler_object.callback.__name__ if handler_object else "unknown"
+        start = time.perf_counter()
+        try: return await handler(event, data)
+        except Exception:
+            self.errors.inc(1, name); raise
+        finally: self.latency.observe(time.perf_counter() - start, name)
+
+
+async def watch_event_loop_lag(gauge: Gauge, interval: float = 1.0) -> None:
+    """interval সেকেন্ড ঘুমিয়ে দেখে কত দেরিতে জাগল; সেই বাড়তি সময়টাই ইভেন্ট লুপের ল্যাগ।"""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time(); await asyncio.sleep(interval)
+        gauge.set(max(0.0, loop.time() - start - interval))
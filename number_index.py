@@ -0,0 +1,64 @@
+import re
+from typing import Iterable, NamedTuple, Optional, Set
+
+MAX_DIGITS = 18  # "1" + 18 ডিজিট এখনও 64-বিটে ধরে; E.164 নম্বর সর্বোচ্চ 15 ডিজিট
+_NON_DIGITS = re.compile(r"[^0-9]+")
+
+
+def normalize_number(number: str) -> Optional[int]:
+    """নম্বরের শুধু ডিজিটগুলো নিয়ে একটি পূর্ণসংখ্যা কী বানায় (+, স্পেস, ড্যাশ বাদ)।
+
+    সামনে "1" বসানো হয় যাতে শুরুর শূন্য হারিয়ে না যায় ("0171" আর "171" আলাদা থাকে)।
+    কোনো ডিজিট না থাকলে বা খুব লম্বা হলে None। শুধু ASCII 0-9 গোনা হয়, যাতে Redis-এর Lua স্ক্রিপ্ট
+    (string.gsub(number, "%D", "")) সার্ভারে ঠিক একই কী বানায়।
+    """
+    digits = number[1:] if number[:1] == "+" else number
+    if not (digits.isascii() and digits.isdecimal()): digits = _NON_DIGITS.sub("", number)
+    if not digits or len(digits) > MAX_DIGITS: return None
+    return int("1" + digits)
+
+
+class ImportResult(NamedTuple):
+    """একটি ইমপোর্টের ফল: কতগুলো যোগ হলো আর কতগুলো কেন বাদ গেল।"""
+    added: int = 0
+    in_stock: int = 0   # কোনো সার্ভিস/দেশের স্টকে আগে থেকেই আছে (একই ফাইলে দুবার থাকলেও)
+    issued: int = 0     # আগে কোনো ইউজারকে দেওয়া হয়েছে
+    invalid: int = 0    # কোনো ডিজিট নেই বা খুব লম্বা
+
+    @property
+    def rejected(self) -> int:
+        return self.in_stock + self.issued + self.invalid
+
+    def merge(self, other: "ImportResult") -> "ImportResult":
+        return ImportResult(*(a + b for a, b in zip(self, other)))
+
+
+class NumberIndex:
+    """সব পুল মিলিয়ে গ্লোবাল ইনডেক্স: এখন স্টকে থাকা নম্বর এবং কখনো দেওয়া হয়েছে এমন নম্বরের ইতিহাস।
+
+    দুটোই normalize_number() কী-র set[int] — মেম্বারশিপ ও যোগ C-তে O(1), প্রতি নম্বরে ~৬৫ বাইট।
+    প্রতিটি পুলের আলাদা ইনডেক্স লাগে না: এই ইনডেক্স সব পুল মিলিয়ে এবং ফরম্যাট নির্বিশেষে ডুপ্লিকেট ধরে।
+    """
+    __slots__ = ("stocked", "issued")
+
+    def __init__(self):
+        self.stocked: Set[int] = set(); self.issued: Set[int] = set()
+
+    def admit(self, number: str) -> str:
+        """নম্বরটি স্টকে নেওয়া যায় কিনা দেখে; গেলে স্টকে চিহ্নিত করে "added", নাহলে ImportResult-এর কারণের নাম।"""
+        key = normalize_number(number)
+        if key is None: return "invalid"
+        if key in self.issued: return "issued"
+        if key in self.stocked: return "in_stock"
+        self.stocked.add(key); return "added"
+
+    def mark_issued(self, numbers: Iterable[str]) -> None:
+        for number in numbers:
+            key = normalize_number(number)
+            if key is not None: self.stocked.discard(key); self.issued.add(key)
+
+    def unstock(self, numbers: Iterable[str]) -> None:
+        """পুল মুছে ফেলা হলে তার (না-দেওয়া) নম্বরগুলো স্টক ইনডেক্স থেকে সরায়; ইতিহাস অপরিবর্তিত থাকে।"""
+        for number in numbers:
+            key = normalize_number(number)
+            if key is not None: self.stocked.discard(key)
@@ -0,0 +1,29 @@
+from collections import deque
+from typing import Deque, Iterable, Iterator, List
+
+
+class NumberPool:
+    """একটি [service][country] এর নম্বর স্টক: শুধু একটি deque-তে FIFO ক্রম।
+
+    ডুপ্লিকেট চেক এখানে হয় না — MemoryStorage-এর গ্লোবাল NumberIndex (set) আগেই বাদ দেয়, যা সব
+    পুল মিলিয়ে কাজ করে; পুলের নিজস্ব set সেটারই একটি অংশ হতো। ব্যাচ যোগ O(m), k টি নম্বর দেওয়া O(k)।
+    """
+    __slots__ = ("_queue",)
+
+    def __init__(self, numbers: Iterable[str] = ()):
+        self._queue: Deque[str] = deque(numbers)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._queue)
+
+    def extend(self, numbers: Iterable[str]) -> None:
+        """নম্বরগুলো শেষে যোগ করে; কলার আগেই ডুপ্লিকেট বাদ দেয়।"""
+        self._queue.extend(numbers)
+
+    def pop(self, k: int) -> List[str]:
+        """সামনে থেকে সর্বোচ্চ k টি নম্বর তুলে দেয় (FIFO)।"""
+        k = min(k, len(self._queue)); popleft = self._queue.popleft
+        return [popleft() for _ in range(k)]
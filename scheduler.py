@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncGenerator, Awaitable, Callable, Dict, List, Optional
+
+from aiogram.fsm.storage.base import BaseEventIsolation, DefaultKeyBuilder, KeyBuilder, StorageKey
+
+
+class UpdateScheduler(BaseEventIsolation):
+    """আপডেটগুলো একসাথে চালায়, তবে একই চ্যাটের আপডেট আসার ক্রমেই (Dispatcher(events_isolation=...))।
+
+    aiogram-এর FSM মিডলওয়্যার প্রতিটি আপডেটের FSM কী (চ্যাট + ইউজার) দিয়ে lock() নেয় এবং লক পাওয়ার পরেই
+    স্টেট পড়ে, তাই লাইনে দাঁড়ানো আপডেট আগেরটার বদলানো স্টেটই দেখে। প্রতিটি কী-র একটি asyncio.Lock
+    (অপেক্ষমাণরা FIFO ক্রমে জাগে)। তারপর shared থাকলে (যেমন RenewingRedisIsolation) প্রসেসগুলোর মধ্যে
+    একই কী-র লক, তারপর গ্লোবাল সেমাফোর — লাইনে দাঁড়িয়ে থাকা আপডেট অন্য চ্যাটের জায়গা আটকে রাখে না।
+    সর্বোচ্চ concurrency টি হ্যান্ডলার একসাথে চলে।
+
+    FSM কী নেই এমন আপডেট (যেমন poll) lock() পর্যন্ত আসে না; track-কে dp.update.outer_middleware হিসেবে
+    বসালে সেগুলোও গ্লোবাল সেমাফোরে দাঁড়ায় এবং গোনা হয়। expect_backlog(n) দিলে স্টার্টআপের পরের প্রথম n টি
+    আপডেট (টেলিগ্রাম ক্রমানুসারে দেয়) ব্যাকলগ হিসেবে ধরা হয়; সেগুলো শেষ হলে drain_seconds সেট হয় এবং
+    on_drained কল হয়।
+    """
+
+    def __init__(self, concurrency: int = 64, on_drained: Optional[Callable[[int, float], None]] = None, shared: Optional[BaseEventIsolation] = None):
+        self.concurrency = concurrency; self.semaphore = asyncio.Semaphore(concurrency); self.on_drained = on_drained; self.shared = shared
+        self.chats: Dict[StorageKey, List] = {}  # FSM কী -> [Lock, এই কী-র কতগুলো আপডেট চলছে/অপেক্ষায়]
+        self.pending = self.running = self.processed = 0  # pending = চলছে + অপেক্ষায়
+        self.backlog = 0; self.backlog_left = 0; self.backlog_started = 0.0; self.drain_seconds: Optional[float] = None
+
+    def expect_backlog(self, count: int) -> None:
+        self.backlog = self.backlog_left = count; self.backlog_started = time.monotonic(); self.drain_seconds = None
+        if not count: self._drained()
+
+    def _drained(self) -> None:
+        self.drain_seconds = time.monotonic() - self.backlog_started
+        if self.on_drained: self.on_drained(self.backlog, self.drain_seconds)
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        entry = self.chats.get(key); self.pending += 1
+        if entry is None: entry = self.chats[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                if self.shared is None:
+                    async with self._slot(): yield
+                else:
+                    async with self.shared.lock(key), self._slot(): yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]: del self.chats[key]
+            self._finished()
+
+    async def track(self, handler: Callable[[Any, Dict[str, Any]], Awaitable[Any]], event: Any, data: Dict[str, Any]) -> Any:
+        if "state" in data: return await handler(event, data)  # FSM কী আছে: lock()-এর ভেতরে, সেখানেই গোনা হয়
+        self.pending += 1
+        try:
+            async with self._slot(): return await handler(event, data)
+        finally: self._finished()
+
+    def _finished(self) -> None:
+        self.pending -= 1; self.processed += 1
+        if self.backlog_left:
+            self.backlog_left -= 1
+            if not self.backlog_left: self._drained()
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncGenerator[None, None]:
+        async with self.semaphore:
+            self.running += 1
+            try: yield
+            finally: self.running -= 1
+
+    async def close(self) -> None:
+        if self.shared is not None: await self.shared.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"running": self.running, "waiting": self.pending - self.running, "processed": self.processed}
+
+
+class RenewingRedisIsolation(BaseEventIsolation):
+    """RedisEventIsolation-এর মতো প্রতি FSM কী-তে একটি Redis লক, তবে হ্যান্ডলার চলাকালীন মেয়াদ বাড়ে।
+
+    লক timeout সেকেন্ডের; ধরে রাখা অবস্থায় প্রতি timeout/3 সেকেন্ডে reacquire() মেয়াদ আবার timeout-এ
+    তোলে। তাই বড় ফাইল ইমপোর্টের মতো লম্বা হ্যান্ডলারেও লক মাঝপথে ছেড়ে যায় না, আর প্রসেস মরে গেলে
+    timeout পরে লক নিজে থেকেই খোলে।
+    """
+
+    def __init__(self, redis, timeout: float = 60, sleep: float = 0.01, key_builder: Optional[KeyBuilder] = None):
+        self.redis = redis; self.timeout = timeout; self.sleep = sleep; self.key_builder = key_builder or DefaultKeyBuilder()
+
+    @asynccontextmanager
+    async def lock(self, key: StorageKey) -> AsyncGenerator[None, None]:
+        async with self.redis.lock(self.key_builder.build(key, "lock"), timeout=self.timeout, sleep=self.sleep) as lock:
+            renew = asyncio.create_task(self._renew(lock))
+            try: yield
+            finally: renew.cancel(); await asyncio.gather(renew, return_exceptions=True)
+
+    async def _renew(self, lock) -> None:
+        while True:
+            await asyncio.sleep(self.timeout / 3)
+            try: await lock.reacquire()
+            except Exception as e: logging.warning(f"Could not extend chat lock {lock.name}: {e}"); return
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,555 @@
+import asyncio
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+from number_index import NumberIndex, ImportResult, normalize_number
+from number_pool import NumberPool
+
+DEFAULT_NUM_LIMIT = 7
+T = TypeVar("T")
+
+
+class Storage:
+    """হ্যান্ডলারগুলো যে অপারেশনগুলো ব্যবহার করে তার সাধারণ ইন্টারফেস।
+
+    সব মেথড async, যাতে নেটওয়ার্ক-ভিত্তিক ব্যাকএন্ডও একই ইন্টারফেসে বসানো যায়।
+    """
+
+    async def list_services(self) -> List[str]:
+        raise NotImplementedError
+
+    async def has_service(self, service: str) -> bool:
+        raise NotImplementedError
+
+    async def add_service(self, service: str) -> bool:
+        """সার্ভিস যোগ করে; আগে থেকেই থাকলে False।"""
+        raise NotImplementedError
+
+    async def remove_service(self, service: str) -> bool:
+        """সার্ভিস (এবং এর সব দেশ ও নম্বর) মুছে ফেলে; না পেলে False।"""
+        raise NotImplementedError
+
+    async def list_countries(self, service: str) -> Optional[List[str]]:
+        """সার্ভিসের দেশগুলোর তালিকা; সার্ভিস না থাকলে None।"""
+        raise NotImplementedError
+
+    async def add_country(self, service: str, country: str) -> bool:
+        raise NotImplementedError
+
+    async def remove_country(self, service: str, country: str) -> bool:
+        raise NotImplementedError
+
+    async def add_numbers(self, service: str, country: str, numbers: List[str]) -> ImportResult:
+        """নম্বরগুলো দেশের পুলে যোগ করে (দেশ না থাকলে তৈরি করে; সার্ভিস না থাকলে KeyError)।
+
+        ডুপ্লিকেট চেক সব সার্ভিস/দেশ মিলিয়ে গ্লোবাল: অন্য কোনো পুলের স্টকে আছে বা আগে কাউকে দেওয়া
+        হয়েছে এমন নম্বর বাদ যায়। কতগুলো যোগ হলো আর কতগুলো কোন কারণে বাদ গেল তা ফেরত দেয়।
+        """
+        raise NotImplementedError
+
+    async def allocate(self, service: str, country: str, k: int) -> Optional[Tuple[List[str], int]]:
+        """পুলের সামনে থেকে সর্বোচ্চ k টি নম্বর অ্যাটমিকভাবে তুলে (নম্বর, বাকি সংখ্যা) ফেরত দেয়।
+
+        পুলটি নেই (সার্ভিস/দেশ মুছে ফেলা হয়েছে) হলে None — খালি পুলের ([], 0) থেকে আলাদা।
+        """
+        raise NotImplementedError
+
+    async def count(self, service: str, country: str) -> int:
+        raise NotImplementedError
+
+    async def get_num_limit(self) -> int:
+        raise NotImplementedError
+
+    async def set_num_limit(self, limit: int) -> None:
+        raise NotImplementedError
+
+    async def catalog_version(self) -> int:
+        """সার্ভিস/দেশ তালিকা বদলালে বাড়ে; অন্য প্রসেসের পরিবর্তন ধরতে কীবোর্ড ক্যাশ এটি ব্যবহার করে।"""
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStorage(Storage):
+    """ডিফল্ট ইন-মেমরি ব্যাকএন্ড: {"services": {service: {country: NumberPool}}, "settings": {...}}।
+
+    self.index সব পুল মিলিয়ে স্টকে থাকা ও দেওয়া হয়ে যাওয়া নম্বরের কমপ্যাক্ট গ্লোবাল ইনডেক্স।
+    """
+
+    def __init__(self, data: Optional[Dict] = None):
+        self.data: Dict = data if data is not None else {"services": {}, "settings": {"num_limit": DEFAULT_NUM_LIMIT}}
+        self.version = 0; self.index = NumberIndex()
+
+    async def list_services(self) -> List[str]:
+        return list(self.data["services"])
+
+    async def has_service(self, service: str) -> bool:
+        return service in self.data["services"]
+
+    async def add_service(self, service: str) -> bool:
+        if service in self.data["services"]: return False
+        self.data["services"][service] = {}; self.version += 1; return True
+
+    async def remove_service(self, service: str) -> bool:
+        countries = self.data["services"].pop(service, None)
+        if countries is None: return False
+        for pool in countries.values(): self.index.unstock(pool)
+        self.version += 1; return True
+
+    async def list_countries(self, service: str) -> Optional[List[str]]:
+        countries = self.data["services"].get(service)
+        return None if countries is None else list(countries)
+
+    async def add_country(self, service: str, country: str) -> bool:
+        countries = self.data["services"][service]
+        if country in countries: return False
+        countries[country] = NumberPool(); self.version += 1; return True
+
+    async def remove_country(self, service: str, country: str) -> bool:
+        pool = self.data["services"].get(service, {}).pop(country, None)
+        if pool is None: return False
+        self.index.unstock(pool); self.version += 1; return True
+
+    async def add_numbers(self, service: str, country: str, numbers: List[str]) -> ImportResult:
+        countries = self.data["services"][service]
+        if country not in countries: countries[country] = NumberPool(); self.version += 1
+        admit = self.index.admit; fresh = []; rejected = {"in_stock": 0, "issued": 0, "invalid": 0}
+        for num in numbers:
+            reason = admit(num)
+            if reason == "added": fresh.append(num)
+            else: rejected[reason] += 1
+        countries[country].extend(fresh)
+        return ImportResult(len(fresh), **rejected)
+
+    async def allocate(self, service: str, country: str, k: int) -> Optional[Tuple[List[str], int]]:
+        pool = self.data["services"].get(service, {}).get(country)
+        if pool is None: return None
+        taken = pool.pop(k); self.index.mark_issued(taken)
+        return taken, len(pool)
+
+    async def count(self, service: str, country: str) -> int:
+        pool = self.data["services"].get(service, {}).get(country)
+        return 0 if pool is None else len(pool)
+
+    async def get_num_limit(self) -> int:
+        return self.data["settings"]["num_limit"]
+
+    async def set_num_limit(self, limit: int) -> None:
+        self.data["settings"]["num_limit"] = limit
+
+    async def catalog_version(self) -> int:
+        return self.version
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS countries (
+    id INTEGER PRIMARY KEY,
+    service_id INTEGER NOT NULL REFERENCES services(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    stock INTEGER NOT NULL DEFAULT 0,
+    UNIQUE (service_id, name)
+);
+CREATE TABLE IF NOT EXISTS numbers (
+    id INTEGER PRIMARY KEY,
+    country_id INTEGER NOT NULL REFERENCES countries(id) ON DELETE CASCADE,
+    number TEXT NOT NULL,
+    UNIQUE (country_id, number)
+);
+CREATE INDEX IF NOT EXISTS numbers_alloc ON numbers (country_id, id);
+CREATE TABLE IF NOT EXISTS number_index (
+    key INTEGER PRIMARY KEY,
+    issued INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SQLiteStorage(Storage):
+    """স্থায়ী SQLite (WAL) ব্যাকএন্ড, রিস্টার্ট বা ডিপ্লয়ের পরেও স্টক থেকে যায়।
+
+    numbers.id বাড়তে থাকা রোআইডি, তাই (country_id, id) ইনডেক্সেই FIFO অ্যালোকেশন হয়।
+    অ্যালোকেশন BEGIN IMMEDIATE ট্রানজ্যাকশনে চলে, তাই একাধিক প্রসেস একই ফাইল খুললেও
+    একটি নম্বর দুবার দেওয়া হয় না। countries.stock একই ট্রানজ্যাকশনে আপডেট হয়, গোনার জন্য স্ক্যান লাগে না।
+    number_index গ্লোবাল ডুপ্লিকেট ইনডেক্স: normalize_number() কী রোআইডি হিসেবে, issued=1 মানে আগে দেওয়া হয়েছে।
+
+    sqlite3 সিঙ্ক্রোনাস, তাই সব লেখা (ইমপোর্ট, অ্যালোকেশন, মুছে ফেলা...) আলাদা writer কানেকশনে
+    asyncio.to_thread দিয়ে চলে — ৫০ হাজার লাইনের ইমপোর্ট ব্যাচেও ইভেন্ট লুপ আটকে থাকে না, আর অন্য
+    প্রসেসের লেখার জন্য busy_timeout-এর অপেক্ষাও থ্রেডেই হয়। writer একটাই, তাই লেখাগুলো একটার পর একটা চলে।
+    পড়াগুলো (count, list_services, list_countries, get_num_limit, catalog_version) ইচ্ছে করেই সরাসরি conn-এ
+    ইভেন্ট লুপে চলে: প্রতিটি প্রাইমারি/ইউনিক ইনডেক্সে এক সারি বা শ-খানেক সারির তালিকা, ২ লাখ নম্বরের
+    ডাটাবেসে মেপে ৬-৪০µs — asyncio.to_thread-এর নিজের খরচই (~৬৬µs) এর চেয়ে বেশি। WAL-এ পাঠক লেখকের
+    অপেক্ষা করে না (অটো-চেকপয়েন্ট PASSIVE), তাই busy_timeout-এ আটকানোর ভয়ও নেই। পুরো টেবিল স্ক্যান
+    করে এমন পড়া এখানে যোগ করলে সেটা _write-এর মতো থ্রেডে পাঠাতে হবে।
+    """
+    LOOKUP_CHUNK = 500  # একটি IN (...) কোয়েরিতে কতগুলো কী (SQLite-এর প্যারামিটার সীমার নিচে)
+    BACKFILL_BATCH = 10000  # ইনডেক্স ভরার সময় একবারে কতগুলো সারি মেমরিতে আসে
+
+    def __init__(self, path: str):
+        self.conn = self._connect(path)
+        self.conn.executescript(SCHEMA)
+        self.writer = self._connect(path, check_same_thread=False); self._write_lock = threading.Lock()
+        self._transaction(self._backfill_index)
+
+    @staticmethod
+    def _connect(path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=check_same_thread)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    def _transaction(self, work: Callable[..., T], *args) -> T:
+        """work(writer, *args)-কে একটি BEGIN IMMEDIATE ট্রানজ্যাকশনে চালায়; ব্যর্থ হলে ROLLBACK।"""
+        with self._write_lock:
+            conn = self.writer; conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(conn, *args); conn.execute("COMMIT"); return result
+            except BaseException:
+                conn.execute("ROLLBACK"); raise
+
+    async def _write(self, work: Callable[..., T], *args) -> T:
+        return await asyncio.to_thread(self._transaction, work, *args)
+
+    def _backfill_index(self, conn: sqlite3.Connection) -> None:
+        """ইনডেক্স টেবিলের আগের ডাটাবেসে একবার চলে: স্টকের নম্বরগুলো দিয়ে ইনডেক্স ভরে দেয়।
+
+        নম্বরগুলো BACKFILL_BATCH করে পড়া হয়, তাই বড় টেবিলেও পুরোটা একসাথে মেমরিতে আসে না।
+        """
+        if conn.execute("SELECT 1 FROM number_index LIMIT 1").fetchone() or not conn.execute("SELECT 1 FROM numbers LIMIT 1").fetchone(): return
+        cursor = conn.execute("SELECT number FROM numbers")
+        while rows := cursor.fetchmany(self.BACKFILL_BATCH):
+            keys = (normalize_number(num) for (num,) in rows)
+            conn.executemany("INSERT OR IGNORE INTO number_index (key) VALUES (?)", ((key,) for key in keys if key is not None))
+
+    @staticmethod
+    def _unstock(conn: sqlite3.Connection, where: str, params: tuple) -> None:
+        """মুছে ফেলা পুলের না-দেওয়া নম্বরগুলো ইনডেক্স থেকে সরায় (ইতিহাস অর্থাৎ issued=1 থাকে)।"""
+        keys = (normalize_number(num) for (num,) in conn.execute(f"SELECT number FROM numbers WHERE {where}", params).fetchall())
+        conn.executemany("DELETE FROM number_index WHERE key = ? AND issued = 0", ((key,) for key in keys if key is not None))
+
+    @staticmethod
+    def _country_id(conn: sqlite3.Connection, service: str, country: str) -> Optional[int]:
+        row = conn.execute(
+            "SELECT c.id FROM countries c JOIN services s ON s.id = c.service_id WHERE s.name = ? AND c.name = ?",
+            (service, country),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _bump_version(conn: sqlite3.Connection) -> None:
+        conn.execute(
+            "INSERT INTO settings (key, value) VALUES ('catalog_version', '1') "
+            "ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    async def list_services(self) -> List[str]:
+        return [name for (name,) in self.conn.execute("SELECT name FROM services ORDER BY id")]
+
+    async def has_service(self, service: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM services WHERE name = ?", (service,)).fetchone() is not None
+
+    def _add_service(self, conn: sqlite3.Connection, service: str) -> bool:
+        if conn.execute("INSERT OR IGNORE INTO services (name) VALUES (?)", (service,)).rowcount == 0: return False
+        self._bump_version(conn); return True
+
+    async def add_service(self, service: str) -> bool:
+        return await self._write(self._add_service, service)
+
+    def _remove_service(self, conn: sqlite3.Connection, service: str) -> bool:
+        self._unstock(conn, "country_id IN (SELECT c.id FROM countries c JOIN services s ON s.id = c.service_id WHERE s.name = ?)", (service,))
+        removed = conn.execute("DELETE FROM services WHERE name = ?", (service,)).rowcount > 0
+        if removed: self._bump_version(conn)
+        return removed
+
+    async def remove_service(self, service: str) -> bool:
+        return await self._write(self._remove_service, service)
+
+    async def list_countries(self, service: str) -> Optional[List[str]]:
+        row = self.conn.execute("SELECT id FROM services WHERE name = ?", (service,)).fetchone()
+        if row is None: return None
+        return [name for (name,) in self.conn.execute("SELECT name FROM countries WHERE service_id = ? ORDER BY id", row)]
+
+    def _add_country(self, conn: sqlite3.Connection, service: str, country: str) -> bool:
+        if conn.execute(
+            "INSERT OR IGNORE INTO countries (service_id, name) SELECT id, ? FROM services WHERE name = ?",
+            (country, service),
+        ).rowcount == 0: return False
+        self._bump_version(conn); return True
+
+    async def add_country(self, service: str, country: str) -> bool:
+        return await self._write(self._add_country, service, country)
+
+    def _remove_country(self, conn: sqlite3.Connection, service: str, country: str) -> bool:
+        country_id = self._country_id(conn, service, country)
+        if country_id is None: return False
+        self._unstock(conn, "country_id = ?", (country_id,))
+        conn.execute("DELETE FROM countries WHERE id = ?", (country_id,)); self._bump_version(conn)
+        return True
+
+    async def remove_country(self, service: str, country: str) -> bool:
+        return await self._write(self._remove_country, service, country)
+
+    def _lookup(self, conn: sqlite3.Connection, keys: List[int]) -> Dict[int, int]:
+        """ইনডেক্সে আগে থেকেই থাকা কী -> issued ফ্ল্যাগ।"""
+        found: Dict[int, int] = {}
+        for start in range(0, len(keys), self.LOOKUP_CHUNK):
+            chunk = keys[start:start + self.LOOKUP_CHUNK]
+            found.update(conn.execute(f"SELECT key, issued FROM number_index WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+        return found
+
+    def _add_numbers(self, conn: sqlite3.Connection, service: str, country: str, numbers: List[str]) -> ImportResult:
+        country_id = self._country_id(conn, service, country)
+        if country_id is None:
+            if not self._add_country(conn, service, country): raise KeyError(service)  # ট্রানজ্যাকশন ROLLBACK হয়
+            country_id = self._country_id(conn, service, country)
+        keys = [normalize_number(num) for num in numbers]
+        known = self._lookup(conn, [key for key in keys if key is not None])
+        fresh = []; in_stock = issued = invalid = 0
+        for num, key in zip(numbers, keys):
+            if key is None: invalid += 1
+            elif key not in known: known[key] = 0; fresh.append((key, num))
+            elif known[key]: issued += 1
+            else: in_stock += 1
+        conn.executemany("INSERT INTO number_index (key) VALUES (?)", ((key,) for key, _ in fresh))
+        conn.executemany("INSERT OR IGNORE INTO numbers (country_id, number) VALUES (?, ?)", ((country_id, num) for _, num in fresh))
+        conn.execute("UPDATE countries SET stock = stock + ? WHERE id = ?", (len(fresh), country_id))
+        return ImportResult(len(fresh), in_stock, issued, invalid)
+
+    async def add_numbers(self, service: str, country: str, numbers: List[str]) -> ImportResult:
+        return await self._write(self._add_numbers, service, country, numbers)
+
+    def _allocate(self, conn: sqlite3.Connection, service: str, country: str, k: int) -> Optional[Tuple[List[str], int]]:
+        country_id = self._country_id(conn, service, country)
+        if country_id is None: return None
+        rows = conn.execute("SELECT id, number FROM numbers WHERE country_id = ? ORDER BY id LIMIT ?", (country_id, k)).fetchall()
+        if rows:
+            conn.execute("DELETE FROM numbers WHERE country_id = ? AND id <= ?", (country_id, rows[-1][0]))
+            conn.execute("UPDATE countries SET stock = stock - ? WHERE id = ?", (len(rows), country_id))
+            keys = (normalize_number(num) for _, num in rows)
+            conn.executemany("UPDATE number_index SET issued = 1 WHERE key = ?", ((key,) for key in keys if key is not None))
+        (remaining,) = conn.execute("SELECT stock FROM countries WHERE id = ?", (country_id,)).fetchone()
+        return [num for _, num in rows], remaining
+
+    async def allocate(self, service: str, country: str, k: int) -> Optional[Tuple[List[str], int]]:
+        return await self._write(self._allocate, service, country, k)
+
+    async def count(self, service: str, country: str) -> int:
+        row = self.conn.execute(
+            "SELECT c.stock FROM countries c JOIN services s ON s.id = c.service_id WHERE s.name = ? AND c.name = ?",
+            (service, country),
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+    async def get_num_limit(self) -> int:
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'num_limit'").fetchone()
+        return DEFAULT_NUM_LIMIT if row is None else int(row[0])
+
+    async def set_num_limit(self, limit: int) -> None:
+        await self._write(lambda conn: conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('num_limit', ?)", (str(limit),)))
+
+    async def catalog_version(self) -> int:
+        row = self.conn.execute("SELECT value FROM settings WHERE key = 'catalog_version'").fetchone()
+        return 0 if row is None else int(row[0])
+
+    async def close(self) -> None:
+        self.conn.close(); self.writer.close()
+
+
+# ইমপোর্ট: issued-এ নেই এবং stocked-এ নতুন এমন নম্বরই পুলে RPUSH হয়। KEYS = issued, stocked, pool, countries:{sid}
+# ARGV = দেশ, cid, key1, number1, key2, number2, ...; দেশটি (ঐ cid-সহ) আর না থাকলে কিছু না লিখে {-1, 0, 0}
+# ফেরত: {added, in_stock, issued}
+ADMIT_LUA = """
+local cid = redis.call('ZSCORE', KEYS[4], ARGV[1])
+if not cid or tonumber(cid) ~= tonumber(ARGV[2]) then return {-1, 0, 0} end
+local added, in_stock, issued = {}, 0, 0
+for i = 3, #ARGV, 2 do
+  if redis.call('SISMEMBER', KEYS[1], ARGV[i]) == 1 then issued = issued + 1
+  elseif redis.call('SADD', KEYS[2], ARGV[i]) == 1 then added[#added + 1] = ARGV[i + 1]
+  else in_stock = in_stock + 1 end
+end
+for i = 1, #added, 1000 do redis.call('RPUSH', KEYS[3], unpack(added, i, math.min(i + 999, #added))) end
+return {#added, in_stock, issued}
+"""
+# অ্যালোকেশন: LPOP এবং প্রতিটি নম্বরের কী stocked থেকে issued-এ সরানো। ফেরত: {বাকি সংখ্যা, নম্বর...}
+ALLOCATE_LUA = """
+local taken = redis.call('LPOP', KEYS[1], ARGV[1]) or {}
+for _, number in ipairs(taken) do
+  local key = '1' .. string.gsub(number, '%D', '')
+  redis.call('SREM', KEYS[2], key); redis.call('SADD', KEYS[3], key)
+end
+table.insert(taken, 1, redis.call('LLEN', KEYS[1]))
+return taken
+"""
+# সার্ভিস/দেশ যোগ: নাম নতুন হলেই seq থেকে আইডি নেয়। KEYS = নামের ZSET, seq, catalog_version[, services]
+# ARGV = নাম[, সার্ভিস, sid] — দেশ যোগের সময় সার্ভিসটি (ঐ sid-সহ) এখনো আছে কিনা দেখা হয়। ফেরত: 1 যোগ হলো, 0 হলো না
+ADD_ENTRY_LUA = """
+if KEYS[4] then
+  local sid = redis.call('ZSCORE', KEYS[4], ARGV[2])
+  if not sid or tonumber(sid) ~= tonumber(ARGV[3]) then return 0 end
+end
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) then return 0 end
+redis.call('ZADD', KEYS[1], redis.call('INCR', KEYS[2]), ARGV[1]); redis.call('INCR', KEYS[3])
+return 1
+"""
+# মুছে ফেলা পুলের না-দেওয়া নম্বরগুলো stocked থেকে সরিয়ে পুল মোছে; নিচের দুটি স্ক্রিপ্টে ব্যবহার হয়
+_UNSTOCK_LUA = """
+local function unstock(pool, stocked)
+  local numbers = redis.call('LRANGE', pool, 0, -1)
+  for i = 1, #numbers, 1000 do
+    local keys = {}
+    for j = i, math.min(i + 999, #numbers) do keys[#keys + 1] = '1' .. string.gsub(numbers[j], '%D', '') end
+    redis.call('SREM', stocked, unpack(keys))
+  end
+  redis.call('DEL', pool)
+end
+"""
+# দেশ মোছা। KEYS = countries:{sid}, stocked, catalog_version; ARGV = দেশ, পুল কী-র প্রিফিক্স। ফেরত: 1 মুছল, 0 পাওয়া যায়নি
+REMOVE_COUNTRY_LUA = _UNSTOCK_LUA + """
+local cid = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not cid then return 0 end
+unstock(ARGV[2] .. cid, KEYS[2])
+redis.call('ZREM', KEYS[1], ARGV[1]); redis.call('INCR', KEYS[3])
+return 1
+"""
+# সার্ভিস মোছা। KEYS = services, stocked, catalog_version; ARGV = সার্ভিস, দেশ-ZSET কী-র প্রিফিক্স, পুল কী-র প্রিফিক্স
+REMOVE_SERVICE_LUA = _UNSTOCK_LUA + """
+local sid = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if not sid then return 0 end
+local countries = redis.call('ZRANGE', ARGV[2] .. sid, 0, -1, 'WITHSCORES')
+for i = 2, #countries, 2 do unstock(ARGV[3] .. countries[i], KEYS[2]) end
+redis.call('DEL', ARGV[2] .. sid); redis.call('ZREM', KEYS[1], ARGV[1]); redis.call('INCR', KEYS[3])
+return 1
+"""
+ADMIT_BATCH = 5000  # প্রতি স্ক্রিপ্ট কলে সর্বোচ্চ কতটি নম্বর, যাতে সার্ভার একবারে বেশিক্ষণ আটকে না থাকে
+
+
+class RedisStorage(Storage):
+    """Redis (বা local_redis স্টান্ড-ইন) ব্যাকএন্ড, একাধিক ওয়ার্কার প্রসেস একই স্টক শেয়ার করতে পারে।
+
+    কী-গুলো:
+      {p}:services              ZSET  সার্ভিসের নাম -> আইডি (আইডি ক্রমেই তালিকা দেখানো হয়)
+      {p}:countries:{sid}       ZSET  দেশের নাম -> আইডি
+      {p}:pool:{cid}            LIST  FIFO নম্বর স্টক
+      {p}:stocked               SET   সব পুল মিলিয়ে স্টকে থাকা নম্বরের normalize_number() কী
+      {p}:issued                SET   আগে দেওয়া হয়ে গেছে এমন নম্বরের কী (ইতিহাস)
+      {p}:seq, {p}:catalog_version, {p}:settings
+
+    অ্যালোকেশন (LPOP + stocked থেকে issued-এ সরানো), ইমপোর্ট (issued চেক + stocked-এ SADD + RPUSH),
+    সার্ভিস/দেশ যোগ এবং মোছা (পুলের নম্বর stocked থেকে সরানো + পুল মোছা) — প্রতিটি একেকটি Lua স্ক্রিপ্ট,
+    সার্ভারে অ্যাটমিক। তাই কয়েকটি প্রসেস একসাথে নিলেও একটি নম্বর একবারই দেওয়া হয়, দেওয়ার মাঝপথে কেউ
+    একই নম্বর আবার ইমপোর্ট করলে সেটা "issued" হিসেবে বাদ যায়, আর মুছে ফেলা পুলে কোনো ইমপোর্ট ঢোকে না।
+    """
+
+    def __init__(self, client, prefix: str = "nb"):
+        self.client = client; self.prefix = prefix
+        self._admit = client.register_script(ADMIT_LUA); self._allocate = client.register_script(ALLOCATE_LUA)
+        self._add_entry = client.register_script(ADD_ENTRY_LUA)
+        self._remove_country = client.register_script(REMOVE_COUNTRY_LUA); self._remove_service = client.register_script(REMOVE_SERVICE_LUA)
+
+    def _key(self, *parts) -> str:
+        return ":".join((self.prefix,) + tuple(str(part) for part in parts))
+
+    async def _service_id(self, service: str) -> Optional[int]:
+        sid = await self.client.zscore(self._key("services"), service)
+        return None if sid is None else int(sid)
+
+    async def _country_id(self, service: str, country: str) -> Optional[int]:
+        sid = await self._service_id(service)
+        if sid is None: return None
+        cid = await self.client.zscore(self._key("countries", sid), country)
+        return None if cid is None else int(cid)
+
+    async def list_services(self) -> List[str]:
+        return list(await self.client.zrange(self._key("services"), 0, -1))
+
+    async def has_service(self, service: str) -> bool:
+        return await self._service_id(service) is not None
+
+    async def add_service(self, service: str) -> bool:
+        keys = [self._key("services"), self._key("seq"), self._key("catalog_version")]
+        return bool(await self._add_entry(keys=keys, args=[service]))
+
+    async def remove_service(self, service: str) -> bool:
+        keys = [self._key("services"), self._key("stocked"), self._key("catalog_version")]
+        return bool(await self._remove_service(keys=keys, args=[service, self._key("countries", ""), self._key("pool", "")]))
+
+    async def list_countries(self, service: str) -> Optional[List[str]]:
+        sid = await self._service_id(service)
+        if sid is None: return None
+        return list(await self.client.zrange(self._key("countries", sid), 0, -1))
+
+    async def add_country(self, service: str, country: str) -> bool:
+        sid = await self._service_id(service)
+        if sid is None: return False
+        keys = [self._key("countries", sid), self._key("seq"), self._key("catalog_version"), self._key("services")]
+        return bool(await self._add_entry(keys=keys, args=[country, service, sid]))
+
+    async def remove_country(self, service: str, country: str) -> bool:
+        sid = await self._service_id(service)
+        if sid is None: return False
+        keys = [self._key("countries", sid), self._key("stocked"), self._key("catalog_version")]
+        return bool(await self._remove_country(keys=keys, args=[country, self._key("pool", "")]))
+
+    async def add_numbers(self, service: str, country: str, numbers: List[str]) -> ImportResult:
+        sid = await self._service_id(service)
+        if sid is None: raise KeyError(service)
+        cid = await self._country_id(service, country)
+        if cid is None:
+            await self.add_country(service, country); cid = await self._country_id(service, country)
+            if cid is None: raise KeyError(service)  # এর মধ্যেই অন্য প্রসেস সার্ভিসটি মুছে ফেলেছে
+        candidates = []; invalid = 0
+        for num in numbers:
+            key = normalize_number(num)
+            if key is None: invalid += 1
+            else: candidates.append((key, num))
+        result = ImportResult(invalid=invalid)
+        keys = [self._key("issued"), self._key("stocked"), self._key("pool", cid), self._key("countries", sid)]
+        for start in range(0, len(candidates), ADMIT_BATCH):
+            args = [country, cid, *(part for candidate in candidates[start:start + ADMIT_BATCH] for part in candidate)]
+            counts = [int(count) for count in await self._admit(keys=keys, args=args)]
+            if counts[0] < 0: raise KeyError(country)  # ইমপোর্টের মাঝপথে দেশ/সার্ভিস মুছে ফেলা হয়েছে
+            result = result.merge(ImportResult(*counts))
+        return result
+
+    async def allocate(self, service: str, country: str, k: int) -> Optional[Tuple[List[str], int]]:
+        cid = await self._country_id(service, country)
+        if cid is None: return None
+        remaining, *taken = await self._allocate(keys=[self._key("pool", cid), self._key("stocked"), self._key("issued")], args=[k])
+        return taken, int(remaining)
+
+    async def count(self, service: str, country: str) -> int:
+        cid = await self._country_id(service, country)
+        return 0 if cid is None else await self.client.llen(self._key("pool", cid))
+
+    async def get_num_limit(self) -> int:
+        value = await self.client.hget(self._key("settings"), "num_limit")
+        return DEFAULT_NUM_LIMIT if value is None else int(value)
+
+    async def set_num_limit(self, limit: int) -> None:
+        await self.client.hset(self._key("settings"), "num_limit", limit)
+
+    async def catalog_version(self) -> int:
+        return int(await self.client.get(self._key("catalog_version")) or 0)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def create_storage(backend: str, sqlite_path: str = "numbers.db", data: Optional[Dict] = None, redis_url: str = "") -> Storage:
+    """STORAGE_BACKEND এনভায়রনমেন্ট ভ্যালু অনুযায়ী ব্যাকএন্ড তৈরি করে।"""
+    if backend == "memory": return MemoryStorage(data)
+    if backend == "sqlite": return SQLiteStorage(sqlite_path)
+    if backend == "redis":
+        from redis.asyncio import Redis  # ঐচ্ছিক ডিপেন্ডেন্সি: pip install redis
+        return RedisStorage(Redis.from_url(redis_url, decode_responses=True))
+    raise ValueError(f"Unknown storage backend: {backend!r}")
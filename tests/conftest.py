@@ -0,0 +1,66 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import pytest
+import pytest_asyncio
+from redis.asyncio import Redis
+
+import local_redis
+
+
+@pytest_asyncio.fixture
+async def redis_url():
+    """এই প্রসেসের ইভেন্ট লুপেই একটি খালি local_redis সার্ভার (TCP), প্রতিটি টেস্টে নতুন।"""
+    server = await local_redis.serve("127.0.0.1", 0)
+    try: yield f"redis://127.0.0.1:{server.sockets[0].getsockname()[1]}/0?protocol=2"
+    finally: server.close(); await server.wait_closed()
+
+
+@pytest_asyncio.fixture
+async def connect(redis_url):
+    """connect() প্রতিবার নতুন ক্লায়েন্ট দেয় — যেন আলাদা ওয়ার্কার প্রসেসের কানেকশন; টেস্ট শেষে সব বন্ধ হয়।"""
+    clients = []
+
+    def new_client() -> Redis:
+        client = Redis.from_url(redis_url, decode_responses=True); clients.append(client); return client
+
+    yield new_client
+    for client in clients: await client.aclose()
+
+
+@pytest.fixture
+def redis_process_url():
+    """আলাদা প্রসেসে local_redis, যাতে ওয়ার্কার প্রসেসগুলো আসল মাল্টি-প্রসেস সেটআপের মতো TCP দিয়ে একই পুল শেয়ার করে।"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0)); port = sock.getsockname()[1]
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, "local_redis.py"), "--port", str(port)], stderr=subprocess.DEVNULL)
+    try:
+        for _ in range(100):
+            try: socket.create_connection(("127.0.0.1", port), timeout=0.1).close(); break
+            except OSError: time.sleep(0.05)
+        yield f"redis://127.0.0.1:{port}/0?protocol=2"
+    finally:
+        server.terminate(); server.wait()
+
+
+@pytest.fixture(scope="session")
+def nbot():
+    """Nbot মডিউল, নকল টোকেন ও অ্যাডমিন দিয়ে ইমপোর্ট করা; টেস্টে টেলিগ্রামে কিছু যায় না।"""
+    for key, value in (("BOT_TOKEN", "123456:TEST"), ("ADMIN_ID", "1"), ("ADMIN_USERNAME", "admin")): os.environ.setdefault(key, value)
+    import Nbot
+    return Nbot
+
+
+@pytest.fixture
+def bot_db(nbot, monkeypatch):
+    """Nbot-এর db-র জায়গায় খালি MemoryStorage; ক্যাটালগ ও কীবোর্ড ক্যাশও নতুন, যাতে টেস্টগুলো একে অপরকে না ছোঁয়।"""
+    from cache import LRUCache
+    from storage import MemoryStorage
+    db = MemoryStorage(); monkeypatch.setattr(nbot, "db", db); monkeypatch.setattr(nbot, "catalog", None); monkeypatch.setattr(nbot, "catalog_checked", float("-inf"))
+    monkeypatch.setattr(nbot, "keyboard_cache", LRUCache(nbot.KEYBOARD_CACHE_SIZE))
+    return db
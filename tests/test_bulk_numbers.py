@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+NUMBERS = [f"+8801{i:09d}" for i in range(40)]
+
+
+def test_numbers_document_txt_and_csv(nbot, monkeypatch):
+    document = nbot.build_numbers_document(NUMBERS[:3], "WhatsApp", "Côte d'Ivoire")
+    assert document.filename == "WhatsApp_Côte_d_Ivoire_3.txt"  # নামের অক্ষর/সংখ্যা থাকে, বাকি সব _
+    assert document.data.decode() == "+8801000000000\n+8801000000001\n+8801000000002\n"
+    monkeypatch.setattr(nbot, "BULK_FORMAT", "csv")
+    document = nbot.build_numbers_document(NUMBERS[:2], "WhatsApp", 'Big, "Bad" Land')
+    assert document.filename.endswith("_2.csv")
+    assert document.data.decode().splitlines() == ["service,country,number", 'WhatsApp,"Big, ""Bad"" Land",+8801000000000', 'WhatsApp,"Big, ""Bad"" Land",+8801000000001']
+
+
+def test_rendered_length_counts_like_telegram(nbot):
+    assert nbot.rendered_length("<b>a&amp;b</b>\n<code>1</code>") == 5  # ট্যাগ বাদ, &amp; একটি অক্ষর
+    assert nbot.rendered_length("📞 দেশ") == 6  # ইমোজি UTF-16-এ দুই ইউনিট
+
+
+def fake_message():
+    sent = []
+
+    async def record(kind, *args, **kwargs): sent.append((kind, args, kwargs))
+
+    message = SimpleNamespace(document=None, sent=sent)
+    for kind in ("edit_text", "edit_reply_markup", "delete", "answer", "answer_document"):
+        setattr(message, kind, lambda *args, _kind=kind, **kwargs: record(_kind, *args, **kwargs))
+    return message
+
+
+async def numbers_page(nbot, db, country: str, limit: int, numbers=NUMBERS):
+    await db.add_service("WhatsApp"); await db.add_numbers("WhatsApp", country, numbers); await db.set_num_limit(limit)
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=7, user_id=7))
+    await state.update_data(service_name="WhatsApp", country_name=country)
+    message = fake_message(); await nbot.show_numbers_page(message, state, edit=True)
+    return [kind for kind, _, _ in message.sent], message.sent[-1]
+
+
+@pytest.mark.asyncio
+async def test_more_than_threshold_is_sent_as_document(nbot, bot_db):
+    kinds, (_, args, kwargs) = await numbers_page(nbot, bot_db, "BD", 30)
+    assert kinds == ["edit_reply_markup", "answer_document"]  # আগের মেসেজের বাটন সরে, নম্বর ফাইলে
+    assert args[0].data.decode().splitlines() == NUMBERS[:30] and "(30 টি নম্বর)" in kwargs["caption"]
+    assert kwargs["reply_markup"].inline_keyboard[0][0].text == "🔄 Refresh (Get Next 30)"
+
+
+@pytest.mark.asyncio
+async def test_message_over_telegram_limit_is_sent_as_document(nbot, bot_db):
+    kinds, _ = await numbers_page(nbot, bot_db, "BD", 20)
+    assert kinds == ["edit_text"]  # ছোট নাম: ২০টি নম্বর মেসেজেই ধরে
+    kinds, (_, args, _) = await numbers_page(nbot, bot_db, "Long Country " * 12, 20, [f"+8802{i:09d}" for i in range(40)])
+    assert kinds == ["edit_reply_markup", "answer_document"] and len(args[0].data.decode().splitlines()) == 20
@@ -0,0 +1,20 @@
+from cache import LRUCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1); cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" নতুন করে ব্যবহৃত, তাই "b" সবচেয়ে পুরনো
+    cache.put("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    cache.put("a", 10)  # আছে এমন কী: মান বদলায়, কিছু বাদ যায় না
+    assert len(cache) == 2 and cache.get("a") == 10
+    assert cache.stats() == {"size": 2, "hits": 4, "misses": 1, "evictions": 1}
+
+
+def test_stored_none_counts_as_a_miss():
+    cache = LRUCache(maxsize=2)
+    cache.put("empty", None); cache.put("b", 2)
+    assert cache.get("empty") is None and cache.stats()["misses"] == 1  # None রাখা আর না থাকা একই
+    cache.put("c", 3)  # মিস হওয়া get ক্রম বদলায় না, তাই "empty"-ই আগে বাদ যায়
+    assert cache.get("b") == 2 and len(cache) == 2 and cache.evictions == 1
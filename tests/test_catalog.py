@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from catalog import Catalog, PrefixIndex
+
+SERVICES = ["WhatsApp", "Telegram", "Google Voice", "whatnot", "Viber"]
+
+
+def test_prefix_index_matches_word_starts_in_id_order():
+    index = PrefixIndex(SERVICES)
+    assert index.search("wha") == [0, 3]  # casefold, ফল আইডি-ক্রমে
+    assert index.search("voi") == [2] and index.search("Google V") == [2]  # যেকোনো শব্দের শুরু থেকে
+    assert index.search("app") == [] and index.search("x") == []  # শব্দের মাঝখান থেকে নয়
+
+
+def test_catalog_ids_are_bounds_checked():
+    current = Catalog(3, SERVICES, [["Bangladesh", "Brazil"], [], [], [], []])
+    assert current.service_id("Telegram") == 1 and current.service_id("Signal") is None
+    assert current.service(4) == "Viber" and current.service(5) is None and current.service(-1) is None
+    assert current.country(0, 1) == "Brazil" and current.country(0, 2) is None and current.country(9, 0) is None
+    assert current.search_countries(0, "b") == [0, 1] and current.search_countries(0, "bra") == [1]
+
+
+def button_rows(markup):
+    return [[button.text for button in row] for row in markup.inline_keyboard]
+
+
+def test_picker_pages_are_clamped(nbot, monkeypatch):
+    monkeypatch.setattr(nbot, "PICKER_PAGE_SIZE", 2); monkeypatch.setattr(nbot, "PICKER_COLUMNS", 2)
+    current = Catalog(1, SERVICES, [[] for _ in SERVICES])
+    assert button_rows(nbot.build_services_keyboard(current, "select_for_get", 0))[:2] == [["WhatsApp", "Telegram"], ["◀️", "1/3 🔍", "▶️"]]
+    assert button_rows(nbot.build_services_keyboard(current, "select_for_get", 99))[:2] == [["Viber"], ["◀️", "3/3 🔍", "▶️"]]
+    assert button_rows(nbot.build_services_keyboard(current, "select_for_get", -5))[0] == ["WhatsApp", "Telegram"]
+    matches = nbot.build_services_keyboard(current, "select_for_get", 0, current.search_services("wha"))
+    assert button_rows(matches) == [["WhatsApp", "whatnot"], ["🔙 Cancel"]]  # এক পেজ, তাই পেজ সারি নেই
+    assert button_rows(nbot.build_services_keyboard(current, "select_for_get", 0, []))[0] == ["🚫 কোনো সার্ভিস পাওয়া যায়নি"]
+
+
+def fake_query():
+    sent = {}
+
+    async def answer(text=None, show_alert=False): sent["answer"] = text
+
+    async def edit_reply_markup(reply_markup): sent["markup"] = reply_markup
+
+    return SimpleNamespace(answer=answer, message=SimpleNamespace(edit_reply_markup=edit_reply_markup)), sent
+
+
+@pytest.mark.asyncio
+async def test_catalog_version_is_read_at_most_once_per_interval(nbot, bot_db, monkeypatch):
+    monkeypatch.setattr(nbot, "CATALOG_CHECK_INTERVAL", 3600)
+    await bot_db.add_service("WhatsApp"); assert button_rows(await nbot.get_services_keyboard("select_for_get"))[0] == ["WhatsApp"]
+    await bot_db.add_service("Telegram")  # অন্য ওয়ার্কারের পরিবর্তন: ইন্টারভাল না পেরোলে দেখা যায় না
+    assert button_rows(await nbot.get_services_keyboard("select_for_get"))[0] == ["WhatsApp"]
+    nbot.catalog_changed()  # এই প্রসেসের পরিবর্তন: সাথে সাথে
+    assert button_rows(await nbot.get_services_keyboard("select_for_get"))[0] == ["WhatsApp", "Telegram"]
+    await bot_db.add_service("Viber"); current = await bot_db.catalog_version(); query, sent = fake_query()
+    # নতুন ভার্সনের কীবোর্ড থেকে ট্যাপ: পিছিয়ে থাকা স্ন্যাপশট আবার পড়া হয়, "তালিকা আপডেট" দেখাতে হয় না
+    assert await nbot.picked_service(query, nbot.ServiceCallback(action="select_for_get", version=current, service_id=2)) == "Viber" and sent == {}
+
+
+@pytest.mark.asyncio
+async def test_stale_callback_version_shows_the_current_list(nbot, bot_db):
+    await bot_db.add_service("WhatsApp"); old = await nbot.get_catalog()
+    await bot_db.add_service("Telegram"); nbot.catalog_changed()  # ক্যাটালগ বদলেছে, পুরনো কীবোর্ডের আইডি আর বিশ্বাসযোগ্য নয়
+    query, sent = fake_query()
+    picked = await nbot.picked_service(query, nbot.ServiceCallback(action="select_for_get", version=old.version, service_id=0))
+    assert picked is None and sent["answer"].startswith("তালিকাটি আপডেট হয়েছে")
+    assert button_rows(sent["markup"])[0] == ["WhatsApp", "Telegram"]
+    current = await nbot.get_catalog()
+    assert await nbot.picked_service(query, nbot.ServiceCallback(action="select_for_get", version=current.version, service_id=1)) == "Telegram"
+
+
+@pytest.mark.asyncio
+async def test_search_query_does_not_follow_into_the_next_picker(nbot, bot_db, monkeypatch):
+    monkeypatch.setattr(nbot, "PICKER_PAGE_SIZE", 1)
+    await bot_db.add_service("WhatsApp"); await bot_db.add_service("Telegram")
+    for country in ("Bangladesh", "Brazil", "Wales"): await bot_db.add_country("WhatsApp", country)
+    state = FSMContext(storage=MemoryStorage(), key=StorageKey(bot_id=1, chat_id=7, user_id=7))
+    await state.set_state(nbot.UserStates.get_number_select_service)
+    await state.update_data(picker_query="wha", picker_state=await state.get_state())  # সার্ভিস পিকারে সার্চ
+    await state.update_data(service_name="WhatsApp"); await state.set_state(nbot.UserStates.get_number_select_country)
+    query, sent = fake_query()
+    await nbot.handle_picker_page(query, nbot.PageCallback(page=1, search=True), state)  # সার্ভিস সার্চের পুরনো পেজ বাটন
+    assert button_rows(sent["markup"])[:2] == [["Brazil"], ["◀️", "2/3 🔍", "▶️"]]  # সব দেশের তালিকা, "wha" দিয়ে নয়
@@ -0,0 +1,38 @@
+import pytest
+
+
+def fake_download(monkeypatch, nbot, chunks):
+    """bot.session.stream_content-এর জায়গায় নির্দিষ্ট বাইট-চাঙ্কগুলো দেয়; কী timeout পেল তাও রাখে।"""
+    seen = {}
+
+    async def stream_content(url, timeout, chunk_size, raise_for_status):
+        seen["timeout"] = timeout
+        for chunk in chunks: yield chunk
+
+    monkeypatch.setattr(nbot.bot.session, "stream_content", stream_content)
+    return seen
+
+
+async def read_lines(nbot, path="numbers.txt"):
+    return [line async for batch in nbot.stream_file_lines(path) for line in batch]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunks, expected", [
+    ([b"+88017", b"1\n+88018\n"], ["+880171", "+88018"]),  # লাইন চাঙ্কের মাঝে ভাঙা
+    (["০১৭\n১৮\n".encode()[:2], "০১৭\n১৮\n".encode()[2:]], ["০১৭", "১৮"]),  # মাল্টিবাইট অক্ষর চাঙ্কের মাঝে ভাঙা
+    ([b"+1 555\r", b"\n+1 556\r\n"], ["+1 555", "+1 556"]),  # "\r\n" চাঙ্কের সীমানায় ভাঙা, ফাঁকা লাইন নয়
+    ([b"+1 555\r", b"+1 556\r"], ["+1 555", "+1 556"]),  # শুধু "\r" দিয়ে লাইন, জোড়া লাগে না
+    ([b"+1 555\n+1 5", b"56"], ["+1 555", "+1 556"]),  # শেষ লাইনে নিউলাইন নেই
+    ([b"\n+1 555\n\n", b"\n"], ["", "+1 555", "", ""]),  # আসল ফাঁকা লাইন থেকে যায়
+])
+async def test_stream_file_lines_rejoins_chunks(monkeypatch, nbot, chunks, expected):
+    fake_download(monkeypatch, nbot, chunks)
+    assert await read_lines(nbot) == expected
+
+
+@pytest.mark.asyncio
+async def test_stream_file_lines_limits_each_read_not_the_download(monkeypatch, nbot):
+    seen = fake_download(monkeypatch, nbot, [b"+1 555\n"])
+    await read_lines(nbot)
+    assert seen["timeout"].total is None and seen["timeout"].sock_read == nbot.IMPORT_READ_TIMEOUT
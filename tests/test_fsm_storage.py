@@ -0,0 +1,44 @@
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+
+from fsm_storage import CompactFSMStorage
+
+
+def key(uid: int) -> StorageKey:
+    return StorageKey(bot_id=1, chat_id=uid, user_id=uid)
+
+
+def frozen_clock(monkeypatch, storage: CompactFSMStorage) -> list:
+    """storage-এর ঘড়ি হাতে চালানোর জন্য; clock[0] বাড়ালেই সময় এগোয়।"""
+    clock = [1000]; monkeypatch.setattr(storage, "_now", lambda: clock[0]); return clock
+
+
+@pytest.mark.asyncio
+async def test_idle_records_expire_after_ttl(monkeypatch):
+    storage = CompactFSMStorage(ttl=60); clock = frozen_clock(monkeypatch, storage)
+    await storage.set_state(key(1), "S:a"); await storage.set_state(key(2), "S:a")
+    clock[0] += 40; assert await storage.get_state(key(2)) == "S:a"  # পড়লেও মেয়াদ নতুন করে শুরু হয়
+    clock[0] += 30
+    assert await storage.get_state(key(1)) is None and await storage.get_state(key(2)) == "S:a"
+    clock[0] += 61; await storage.set_state(key(3), "S:b")  # লেখার সময় সামনের মেয়াদোত্তীর্ণ রেকর্ড মোছে
+    assert list(storage.storage) == [3] and storage.stats() == {"records": 1, "expired": 2, "evicted": 0}
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_records_are_evicted(monkeypatch):
+    storage = CompactFSMStorage(max_records=3); frozen_clock(monkeypatch, storage)
+    for uid in (1, 2, 3): await storage.set_data(key(uid), {"service_name": "WhatsApp"})
+    await storage.get_data(key(1))  # 1 সবচেয়ে নতুন ব্যবহৃত, 2 সবচেয়ে পুরনো
+    await storage.set_state(key(4), "S:a")
+    assert list(storage.storage) == [3, 1, 4] and storage.evicted == 1
+    assert await storage.get_data(key(2)) == {} and await storage.get_data(key(1)) == {"service_name": "WhatsApp"}
+    assert await storage.get_state(key(5)) is None and len(storage.storage) == 3  # পড়লে রেকর্ড তৈরি হয় না
+
+
+@pytest.mark.asyncio
+async def test_only_state_and_catalog_names_are_interned():
+    storage = CompactFSMStorage(max_names=2)
+    for uid in range(1, 4): await storage.set_data(key(uid), {"service_name": "".join(["Whats", "App"]), "country_name": f"C{uid}", "picker_query": f"query {uid}"})
+    assert storage.storage[1].service_name is storage.storage[3].service_name  # একটিই str অবজেক্ট
+    assert len(storage._names) == 2 and storage._states == {}  # নামের টেবিল সীমিত, picker_query নেই
+    assert await storage.get_data(key(1)) == {"service_name": "WhatsApp", "country_name": "C1", "picker_query": "query 1"}
@@ -0,0 +1,34 @@
+import pytest
+
+from inventory import Inventory, RedisInventory
+
+
+@pytest.mark.asyncio
+async def test_redis_inventory_is_shared_between_workers(connect):
+    # দুটি ওয়ার্কার প্রসেসের মতো আলাদা ক্লায়েন্ট ও আলাদা RedisInventory
+    workers = [RedisInventory(connect(), threshold=50, window=3600) for _ in range(2)]
+    await workers[0].imported("WhatsApp", "BD", 100, 100); await workers[1].set_stock("WhatsApp", "US", 500)
+    stock = 100
+    for step in range(10):
+        stock -= 7; await workers[step % 2].issued("WhatsApp", "BD", 7, stock)
+    reports = [{(row.service, row.country): row for row in await worker.report()} for worker in workers]
+    alerts = [await worker.take_alerts() for worker in workers]
+    await workers[1].issued("WhatsApp", "BD", 7, stock - 7)  # আগেই সতর্ক করা হয়েছে, রিস্টক না হওয়া পর্যন্ত আর না
+    again = await workers[0].take_alerts()
+    await workers[1].remove_country("WhatsApp", "BD"); left = await workers[0].report()
+    assert reports[0] == reports[1]
+    bd = reports[0][("WhatsApp", "BD")]
+    assert (bd.stock, bd.issued_today, round(bd.import_rate), round(bd.issue_rate)) == (30, 70, 100, 70)
+    assert [[row.country for row in taken] for taken in alerts] == [["BD"], []] and again == []
+    assert [row.country for row in left] == ["US"]
+
+
+@pytest.mark.asyncio
+async def test_alert_again_only_after_restock():
+    inventory = Inventory(threshold=10, window=3600)
+    await inventory.imported("WhatsApp", "BD", 20, 20); await inventory.issued("WhatsApp", "BD", 15, 5)
+    assert [row.stock for row in await inventory.take_alerts()] == [5]
+    await inventory.issued("WhatsApp", "BD", 1, 4); assert await inventory.take_alerts() == []
+    await inventory.imported("WhatsApp", "BD", 20, 24); await inventory.issued("WhatsApp", "BD", 20, 4)
+    row, = await inventory.take_alerts()
+    assert (row.stock, row.issued_today, round(row.issue_rate)) == (4, 36, 36)
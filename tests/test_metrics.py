@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.dispatcher.middlewares.manager import MiddlewareManager
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.redis import RedisStorage as RedisFSMStorage
+from aiogram.types import User
+
+from metrics import Registry
+
+
+def test_prometheus_text_format():
+    registry = Registry()
+    requests = registry.counter("app_requests_total", "Requests.", ["path"])
+    up = registry.gauge("app_up", "Is up.")
+    latency = registry.histogram("app_seconds", "Latency.", ["handler"], buckets=(0.1, 1))
+    registry.add_collector(lambda: up.set(1))  # স্ক্র্যাপের ঠিক আগে চলে
+    requests.inc(2, 'a"b\\c\nd'); requests.inc(1.5, "/x")
+    for value in (0.05, 0.1, 0.5, 3): latency.observe(value, "start")
+    assert registry.render() == "\n".join([
+        "# HELP app_requests_total Requests.", "# TYPE app_requests_total counter",
+        'app_requests_total{path="a\\"b\\\\c\\nd"} 2', 'app_requests_total{path="/x"} 1.5',
+        "# HELP app_up Is up.", "# TYPE app_up gauge", "app_up 1",
+        "# HELP app_seconds Latency.", "# TYPE app_seconds histogram",
+        'app_seconds_bucket{handler="start",le="0.1"} 2', 'app_seconds_bucket{handler="start",le="1"} 3', 'app_seconds_bucket{handler="start",le="+Inf"} 4',
+        'app_seconds_sum{handler="start"} 3.65', 'app_seconds_count{handler="start"} 4',
+    ]) + "\n"
+
+
+@pytest.mark.asyncio
+async def test_throttled_updates_are_not_recorded_as_handler_latency(nbot):
+    async def throttled_probe(event, **data): return "handled"
+
+    # Nbot-এ যে ক্রমে মিডলওয়্যার রেজিস্টার হয়েছে সেই ক্রমেই চেইন
+    chain = MiddlewareManager.wrap_middlewares(list(nbot.dp.message.middleware), throttled_probe)
+    data = {"event_from_user": User(id=987654, is_bot=False, first_name="u"), "handler": SimpleNamespace(callback=throttled_probe, flags={"throttle": "metrics_probe"})}
+    results = [await chain(object(), dict(data)) for _ in range(int(nbot.THROTTLE_BURST) + 2)]
+    assert results.count("handled") == nbot.THROTTLE_BURST
+    assert nbot.HANDLER_SECONDS.values[("throttled_probe",)][2] == nbot.THROTTLE_BURST  # থ্রটল হওয়া দুটি লেটেন্সিতে নেই
+    assert nbot.throttling.stats()["metrics_probe"] == 2
+
+
+@pytest.mark.asyncio
+async def test_fsm_records_are_counted_in_redis(nbot, connect, monkeypatch):
+    storage = RedisFSMStorage(connect())
+    for uid in (1, 2, 3): await storage.set_state(StorageKey(bot_id=1, chat_id=uid, user_id=uid), "S:a")
+    await storage.set_data(StorageKey(bot_id=1, chat_id=4, user_id=4), {"service_name": "WhatsApp"})  # স্টেট ছাড়া ডেটা গোনা হয় না
+    monkeypatch.setattr(nbot, "FSM_COUNT_INTERVAL", 3600)
+    task = asyncio.create_task(nbot.count_fsm_records(storage))
+    for _ in range(100):
+        if nbot.FSM_RECORDS.values.get(()) == 3: break
+        await asyncio.sleep(0.01)
+    task.cancel(); await asyncio.gather(task, return_exceptions=True)
+    assert nbot.FSM_RECORDS.values[()] == 3
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+import local_redis
+from storage import RedisStorage
+
+NUMBERS = [f"+8801{i:09d}" for i in range(300)]
+
+
+@pytest.mark.asyncio
+async def test_reimport_during_allocation_never_issues_twice(connect):
+    users = RedisStorage(connect()); admin = RedisStorage(connect())
+    await admin.add_service("WhatsApp"); await admin.add_country("WhatsApp", "BD")
+    assert (await admin.add_numbers("WhatsApp", "BD", NUMBERS)).added == len(NUMBERS)
+    issued = []; done = asyncio.Event()
+
+    async def allocate():
+        while True:
+            taken, remaining = await users.allocate("WhatsApp", "BD", 3); issued.extend(taken)
+            if not taken and not remaining: done.set(); return
+
+    async def reimport():
+        # অ্যাডমিন একই ফাইল বারবার আপলোড করছে, অ্যালোকেশনের মাঝপথে
+        while not done.is_set(): await admin.add_numbers("WhatsApp", "BD", NUMBERS)
+
+    await asyncio.gather(*(allocate() for _ in range(4)), reimport())
+    result = await admin.add_numbers("WhatsApp", "BD", NUMBERS)
+    assert sorted(issued) == sorted(NUMBERS)  # প্রতিটি নম্বর ঠিক একবার
+    assert result.issued == len(NUMBERS) and result.added == 0
+
+
+@pytest.mark.asyncio
+async def test_scripts_on_in_process_client():
+    db = RedisStorage(local_redis.MemoryRedis())
+    await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD")
+    assert tuple(await db.add_numbers("WhatsApp", "BD", ["+1 555", "1555", "x", "+1 556"])) == (2, 1, 0, 1)
+    assert await db.allocate("WhatsApp", "BD", 1) == (["+1 555"], 1)
+    assert tuple(await db.add_numbers("WhatsApp", "BD", ["1-555", "+1 556"])) == (0, 1, 1, 0)
+
+
+@pytest.mark.asyncio
+async def test_remove_during_import_strands_nothing(connect):
+    admin = RedisStorage(connect()); other = RedisStorage(connect())
+    await admin.add_service("WhatsApp"); await admin.add_country("WhatsApp", "BD")
+
+    async def reimport():
+        for _ in range(20):
+            try: await admin.add_numbers("WhatsApp", "BD", NUMBERS)
+            except KeyError: pass  # দেশ মুছে ফেলা হয়েছে
+
+    async def churn():
+        for _ in range(20):
+            await other.remove_country("WhatsApp", "BD"); await other.add_country("WhatsApp", "BD"); await asyncio.sleep(0)
+
+    await asyncio.gather(reimport(), churn())
+    await other.remove_service("WhatsApp")
+    client = connect(); last_id = int(await client.get("nb:seq"))
+    assert await client.scard("nb:stocked") == 0
+    assert not any([await client.llen(f"nb:pool:{i}") for i in range(1, last_id + 1)])  # মুছে ফেলা পুলে কিছু ঢোকেনি
+    await admin.add_service("WhatsApp"); await admin.add_country("WhatsApp", "BD")
+    assert (await admin.add_numbers("WhatsApp", "BD", NUMBERS)).added == len(NUMBERS)  # কোনো নম্বর stocked-এ আটকে নেই
+
+
+@pytest.mark.asyncio
+async def test_catalog_edits_on_in_process_client():
+    client = local_redis.MemoryRedis(); db = RedisStorage(client)
+    assert await db.add_service("WhatsApp") and not await db.add_service("WhatsApp")
+    assert await client.get("nb:seq") == "1"  # আগে থেকে থাকা নাম আইডি খরচ করে না
+    with pytest.raises(KeyError): await db.add_numbers("Telegram", "BD", ["+1 555"])
+    assert not await db.add_country("Telegram", "BD") and await client.get("nb:seq") == "1"
+    await db.add_numbers("WhatsApp", "BD", ["+1 555", "+1 556"]); await db.allocate("WhatsApp", "BD", 1)
+    assert await db.remove_service("WhatsApp") and not await db.remove_service("WhatsApp")
+    assert await client.scard("nb:stocked") == 0 and await client.scard("nb:issued") == 1
+    assert await db.list_services() == []
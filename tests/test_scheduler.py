@@ -0,0 +1,82 @@
+import asyncio
+import datetime
+
+import pytest
+from aiogram import Bot, Dispatcher, F
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.types import Chat, Message, Update, User
+
+from scheduler import RenewingRedisIsolation, UpdateScheduler
+
+
+@pytest.mark.asyncio
+async def test_shared_lock_serialises_a_chat_across_workers(connect):
+    # দুটি শিডিউলার = দুটি ওয়ার্কার প্রসেস; প্রসেসের ভেতরের লক আলাদা, শুধু Redis লক শেয়ার করা
+    workers = [UpdateScheduler(concurrency=8, shared=RenewingRedisIsolation(connect(), timeout=10, sleep=0.005)) for _ in range(2)]
+    key = StorageKey(bot_id=1, chat_id=42, user_id=42); inside = []; overlaps = 0
+
+    async def update(scheduler: UpdateScheduler, n: int):
+        nonlocal overlaps
+        async with scheduler.lock(key):
+            overlaps += bool(inside); inside.append(n); await asyncio.sleep(0.002); inside.remove(n)
+
+    await asyncio.gather(*(update(workers[n % 2], n) for n in range(40)))
+    assert overlaps == 0 and all(scheduler.stats()["processed"] == 20 for scheduler in workers)
+
+
+@pytest.mark.asyncio
+async def test_lock_is_extended_while_a_long_handler_runs(connect):
+    workers = [RenewingRedisIsolation(connect(), timeout=0.3, sleep=0.01) for _ in range(2)]
+    key = StorageKey(bot_id=1, chat_id=42, user_id=42); order = []
+
+    async def import_file():
+        async with workers[0].lock(key): order.append("import"); await asyncio.sleep(1); order.append("import done")
+
+    async def next_update():
+        await asyncio.sleep(0.05)
+        async with workers[1].lock(key): order.append("next")
+
+    # হ্যান্ডলার লকের timeout-এর তিনগুণের বেশি চলে; তবুও অন্য ওয়ার্কার ঢোকে না, আর ছাড়ার সময় LockNotOwnedError হয় না
+    await asyncio.gather(import_file(), next_update())
+    assert order == ["import", "import done", "next"]
+
+
+def message(update_id: int, text: str) -> Update:
+    user = User(id=7, is_bot=False, first_name="u")
+    return Update(update_id=update_id, message=Message(message_id=update_id, date=datetime.datetime.now(), chat=Chat(id=7, type="private"), from_user=user, text=text))
+
+
+@pytest.mark.asyncio
+async def test_queued_update_sees_state_set_by_previous_update():
+    dp = Dispatcher(storage=MemoryStorage(), events_isolation=UpdateScheduler(concurrency=8)); bot = Bot("123456:TEST"); routed = []
+
+    @dp.message(F.text == "next")
+    async def next_step(msg: Message, raw_state):
+        routed.append(raw_state)
+
+    @dp.message(F.text == "go")
+    async def go(msg: Message, state: FSMContext):
+        await asyncio.sleep(0.01); await state.set_state("Flow:second")
+
+    # দ্বিতীয় আপডেট প্রথমটি চলার সময়েই আসে; লক পাওয়ার পরে স্টেট পড়া হয় বলে সে নতুন স্টেট দেখে
+    await asyncio.gather(dp.feed_update(bot, message(1, "go")), dp.feed_update(bot, message(2, "next")))
+    await bot.session.close()
+    assert routed == ["Flow:second"]
+
+
+@pytest.mark.asyncio
+async def test_backlog_counts_updates_without_fsm_key():
+    scheduler = UpdateScheduler(concurrency=8); drained = []; scheduler.on_drained = lambda count, seconds: drained.append(count)
+    dp = Dispatcher(storage=MemoryStorage(), events_isolation=scheduler); dp.update.outer_middleware(scheduler.track); bot = Bot("123456:TEST")
+
+    async def on_poll(event, data):
+        assert scheduler.stats()["running"] == 1  # চ্যাট-লক নেই, তবু গ্লোবাল সেমাফোরের ভেতরে
+
+    scheduler.expect_backlog(3)
+    await dp.feed_update(bot, message(1, "hi"))  # FSM কী আছে: lock()-এ একবারই গোনা হয়
+    await scheduler.track(on_poll, object(), {})  # poll-এর মতো আপডেট: চ্যাট বা ইউজার নেই, তাই FSM কী-ও নেই
+    assert drained == [] and scheduler.stats() == {"running": 0, "waiting": 0, "processed": 2}
+    await dp.feed_update(bot, message(3, "hi")); await bot.session.close()
+    assert drained == [3]
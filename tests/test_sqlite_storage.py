@@ -0,0 +1,76 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from storage import SQLiteStorage
+
+NUMBERS = [f"+8801{i:09d}" for i in range(300)]
+
+
+@pytest.mark.asyncio
+async def test_stock_and_history_survive_restart(tmp_path):
+    path = str(tmp_path / "numbers.db")
+    db = SQLiteStorage(path)
+    await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD")
+    await db.add_numbers("WhatsApp", "BD", NUMBERS); await db.set_num_limit(12)
+    assert await db.allocate("WhatsApp", "BD", 5) == (NUMBERS[:5], 295)
+    await db.close()
+    db = SQLiteStorage(path)  # রিস্টার্ট
+    assert await db.list_services() == ["WhatsApp"] and await db.list_countries("WhatsApp") == ["BD"]
+    assert (await db.count("WhatsApp", "BD"), await db.get_num_limit()) == (295, 12)
+    assert await db.allocate("WhatsApp", "BD", 2) == (NUMBERS[5:7], 293)  # FIFO আগের জায়গা থেকেই চলে
+    assert tuple(await db.add_numbers("WhatsApp", "BD", NUMBERS[:10])) == (0, 3, 7, 0)
+    await db.close()
+
+
+
+@pytest.mark.asyncio
+async def test_two_connections_never_issue_a_number_twice(tmp_path):
+    path = str(tmp_path / "numbers.db")
+    # একই ফাইলে দুটি SQLiteStorage = দুটি প্রসেস; লেখাগুলো থ্রেডে চলে, তাই সত্যিই একসাথে BEGIN IMMEDIATE চায়
+    workers = [SQLiteStorage(path) for _ in range(2)]
+    await workers[0].add_service("WhatsApp"); await workers[0].add_country("WhatsApp", "BD")
+    await workers[0].add_numbers("WhatsApp", "BD", NUMBERS)
+    issued = []
+
+    async def drain(db: SQLiteStorage):
+        while True:
+            taken, _ = await db.allocate("WhatsApp", "BD", 7); issued.extend(taken)
+            if not taken: return
+
+    await asyncio.gather(*(drain(workers[n % 2]) for n in range(8)))
+    for db in workers: await db.close()
+    assert sorted(issued) == NUMBERS  # প্রতিটি নম্বর ঠিক একবার
+
+
+
+@pytest.mark.asyncio
+async def test_index_backfill_and_unstock_on_removal(tmp_path, monkeypatch):
+    monkeypatch.setattr(SQLiteStorage, "BACKFILL_BATCH", 3)  # কয়েকটি ব্যাচে ভরা হয়
+    path = str(tmp_path / "numbers.db")
+    db = SQLiteStorage(path)
+    await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD"); await db.add_country("WhatsApp", "US")
+    await db.add_numbers("WhatsApp", "BD", NUMBERS[:10]); await db.close()
+    with sqlite3.connect(path) as conn: conn.execute("DELETE FROM number_index")  # ইনডেক্স টেবিলের আগের ডাটাবেস
+    db = SQLiteStorage(path)
+    assert tuple(await db.add_numbers("WhatsApp", "US", NUMBERS[:10])) == (0, 10, 0, 0)  # স্টক থেকে ইনডেক্স ভরেছে
+    await db.allocate("WhatsApp", "BD", 4)
+    assert await db.remove_country("WhatsApp", "BD")
+    # মুছে ফেলা পুলের না-দেওয়া নম্বর আবার নেওয়া যায়, দেওয়া নম্বর ইতিহাসে থেকে যায়
+    assert tuple(await db.add_numbers("WhatsApp", "US", NUMBERS[:10])) == (6, 0, 4, 0)
+    assert await db.remove_service("WhatsApp") and not await db.remove_service("WhatsApp")
+    await db.add_service("Telegram")
+    assert tuple(await db.add_numbers("Telegram", "US", NUMBERS[:10])) == (6, 0, 4, 0)
+    await db.close()
+
+
+@pytest.mark.asyncio
+async def test_import_into_missing_service_fails_cleanly(tmp_path):
+    db = SQLiteStorage(str(tmp_path / "numbers.db"))
+    with pytest.raises(KeyError): await db.add_numbers("WhatsApp", "BD", NUMBERS[:3])
+    assert await db.catalog_version() == 0 and await db.list_services() == []
+    await db.add_service("WhatsApp")
+    assert tuple(await db.add_numbers("WhatsApp", "BD", NUMBERS[:3])) == (3, 0, 0, 0)  # দেশ নিজে থেকেই তৈরি হয়
+    assert await db.list_countries("WhatsApp") == ["BD"]
+    await db.close()
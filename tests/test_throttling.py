@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.types import User
+
+from buckets import RedisBuckets
+from throttling import RateGovernor, ThrottlingMiddleware
+
+
+@pytest.mark.asyncio
+async def test_redis_buckets_are_shared_between_workers(connect):
+    # দুটি ওয়ার্কার প্রসেসের মতো আলাদা ক্লায়েন্ট, আলাদা মিডলওয়্যার, একই বাকেট
+    clients = [connect() for _ in range(2)]
+    throttles = [ThrottlingMiddleware(rate=0.01, burst=3, shared=RedisBuckets(client)) for client in clients]
+    governors = [RateGovernor(global_rate=10, chat_rate=100, chat_burst=100, shared=RedisBuckets(client)) for client in clients]
+    handled = []
+
+    async def handler(event, data):
+        handled.append(event)
+
+    data = {"event_from_user": User(id=7, is_bot=False, first_name="u"), "handler": SimpleNamespace(flags={"throttle": "get_number"})}
+    for step in range(8): await throttles[step % 2](handler, step, data)
+    delays = [await governors[step % 2]._delay(chat_id=step) for step in range(20)]
+    assert handled == [0, 1, 2]  # burst 3 দুই ওয়ার্কার মিলিয়ে, প্রতি ওয়ার্কারে আলাদা নয়
+    assert delays[:10] == [0.0] * 10  # গ্লোবাল বাকেটের 10 টোকেন
+    assert 0.9 <= delays[-1] <= 1.05  # পরের 10টি 10/s হারে, কোন ওয়ার্কার পাঠাচ্ছে তা নির্বিশেষে
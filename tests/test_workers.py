@@ -0,0 +1,48 @@
+import asyncio
+import multiprocessing
+
+from redis.asyncio import Redis
+
+from storage import RedisStorage
+
+TOTAL = 5_000
+TAKE = 7
+WORKERS = 4
+
+
+async def seed(url: str) -> None:
+    db = RedisStorage(Redis.from_url(url, decode_responses=True))
+    await db.add_service("WhatsApp"); await db.add_country("WhatsApp", "BD")
+    assert (await db.add_numbers("WhatsApp", "BD", [f"+880{i:09d}" for i in range(TOTAL)])).added == TOTAL
+    await db.close()
+
+
+async def drain(url: str) -> list:
+    db = RedisStorage(Redis.from_url(url, decode_responses=True)); issued = []
+
+    async def handler():
+        while True:
+            numbers, _ = await db.allocate("WhatsApp", "BD", TAKE)
+            if not numbers: return
+            issued.extend(numbers); await asyncio.sleep(0)
+
+    await asyncio.gather(*(handler() for _ in range(4)))
+    await db.close()
+    return issued
+
+
+def worker(url: str, start, results) -> None:
+    start.wait(); results.put(asyncio.run(drain(url)))
+
+
+def test_workers_issue_every_number_exactly_once(redis_process_url):
+    asyncio.run(seed(redis_process_url))
+    context = multiprocessing.get_context("spawn"); start = context.Event(); results = context.Queue()
+    procs = [context.Process(target=worker, args=(redis_process_url, start, results)) for _ in range(WORKERS)]
+    for proc in procs: proc.start()
+    start.set()
+    per_worker = [results.get(timeout=60) for _ in procs]
+    for proc in procs: proc.join(timeout=10)
+    issued = [num for numbers in per_worker for num in numbers]
+    assert sorted(issued) == [f"+880{i:09d}" for i in range(TOTAL)]
+    assert all(per_worker)  # সব ওয়ার্কারই কিছু না কিছু পেয়েছে, অর্থাৎ সত্যিই একসাথে চলেছে
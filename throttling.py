@@ -0,0 +1,81 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import BaseMiddleware
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.flags import get_flag
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import CallbackQuery, TelegramObject
+
+from buckets import RedisBuckets, TokenBucket
+from cache import LRUCache
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """প্রতি (ইউজার, অ্যাকশন) এর জন্য টোকেন বাকেট।
+
+    শুধু flags={"throttle": "<action>"} দেওয়া হ্যান্ডলারে কাজ করে। সীমা ছাড়ালে হ্যান্ডলার চলে না:
+    কলব্যাক হলে শুধু query.answer() দিয়ে জানানো হয়, মেসেজ হলে চুপচাপ বাদ দেওয়া হয়।
+    shared দিলে বাকেট Redis-এ থাকে, তাই কয়েকটি ওয়ার্কারেও একজন ইউজার মোট rate-ই পায়।
+    """
+
+    def __init__(self, rate: float = 1.0, burst: float = 3, max_users: int = 100_000, shared: Optional[RedisBuckets] = None):
+        self.rate = rate; self.burst = burst; self.shared = shared
+        self.buckets = LRUCache(max_users)
+        self.throttled: Dict[str, int] = {}
+
+    async def __call__(self, handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]], event: TelegramObject, data: Dict[str, Any]) -> Any:
+        action = get_flag(data, "throttle"); user = data.get("event_from_user")
+        if action is None or user is None: return await handler(event, data)
+        if await self._try_acquire(user.id, action): return await handler(event, data)
+        self.throttled[action] = self.throttled.get(action, 0) + 1
+        if isinstance(event, CallbackQuery): await event.answer("⏳ একটু ধীরে! কয়েক সেকেন্ড পর আবার চেষ্টা করুন।")
+        return None
+
+    async def _try_acquire(self, user_id: int, action: str) -> bool:
+        if self.shared is not None: return await self.shared.try_acquire(f"throttle:{user_id}:{action}", self.rate, self.burst)
+        key = (user_id, action); bucket = self.buckets.get(key)
+        if bucket is None: bucket = TokenBucket(self.rate, self.burst); self.buckets.put(key, bucket)
+        return bucket.try_acquire()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self.throttled)
+
+
+class RateGovernor(BaseRequestMiddleware):
+    """বট থেকে টেলিগ্রামে যাওয়া অনুরোধের গতি নিয়ন্ত্রণ।
+
+    chat_id আছে এমন প্রতিটি অনুরোধ (send/edit/delete...) আগে গ্লোবাল বাকেট ও ওই চ্যাটের বাকেট থেকে
+    টোকেন বুক করে, দরকার হলে অপেক্ষা করে (deferred)। তবুও 429 (RetryAfter) এলে retry_after সেকেন্ড
+    ঘুমিয়ে আবার পাঠায়, সর্বোচ্চ max_retries বার। shared দিলে গ্লোবাল ও চ্যাট বাকেট Redis-এ থাকে, তাই
+    সব ওয়ার্কার মিলিয়েও global_rate ছাড়ায় না।
+    """
+
+    def __init__(self, global_rate: float = 30.0, chat_rate: float = 1.0, chat_burst: float = 3, max_retries: int = 3, max_chats: int = 100_000, shared: Optional[RedisBuckets] = None):
+        self.global_rate = global_rate; self.global_bucket = TokenBucket(global_rate, global_rate); self.shared = shared
+        self.chat_rate = chat_rate; self.chat_burst = chat_burst; self.max_retries = max_retries
+        self.chat_buckets = LRUCache(max_chats)
+        self.deferred = self.retried = self.failed = 0
+
+    async def _delay(self, chat_id: Any) -> float:
+        if self.shared is not None:
+            return await self.shared.reserve([("global", self.global_rate, self.global_rate), (f"chat:{chat_id}", self.chat_rate, self.chat_burst)])
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None: bucket = TokenBucket(self.chat_rate, self.chat_burst); self.chat_buckets.put(chat_id, bucket)
+        return max(self.global_bucket.reserve(), bucket.reserve())
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot, method):
+        chat_id = getattr(method, "chat_id", None)
+        if chat_id is not None:
+            delay = await self._delay(chat_id)
+            if delay > 0: self.deferred += 1; await asyncio.sleep(delay)
+        for attempt in range(self.max_retries + 1):
+            try: return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries: self.failed += 1; raise
+                self.retried += 1; logging.warning(f"Flood control on {type(method).__name__}, retrying in {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+
+    def stats(self) -> Dict[str, int]:
+        return {"deferred": self.deferred, "retried": self.retried, "failed": self.failed}